@@ -0,0 +1,26 @@
+"""Add composite index on interactions (from_profile_id, to_profile_id)
+
+Revision ID: 3c1d2e7a9b40
+Revises: 9fe6a4588c80
+Create Date: 2026-10-18 12:40:08.114520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d2e7a9b40'
+down_revision: Union[str, None] = '9fe6a4588c80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_interactions_from_to', 'interactions', ['from_profile_id', 'to_profile_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_interactions_from_to', table_name='interactions')
@@ -0,0 +1,119 @@
+"""Partition interactions and messages by month, add interaction_rollups
+
+Revision ID: 5d8e2b7f4c91
+Revises: e91f7c3b5a02
+Create Date: 2026-10-18 18:20:44.201937
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2b7f4c91'
+down_revision: Union[str, None] = 'e91f7c3b5a02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# Per table: foreign keys and indexes to recreate on the partitioned parent
+PARTITIONED = {
+    'interactions': {
+        'foreign_keys': [('from_profile_id', 'profiles'), ('to_profile_id', 'profiles')],
+        'indexes': [('ix_interactions_from_to_type', ['from_profile_id', 'to_profile_id', 'type']),
+                    ('ix_interactions_to_type', ['to_profile_id', 'type'])],
+    },
+    'messages': {
+        'foreign_keys': [('match_id', 'matches'), ('sender_id', 'profiles')],
+        'indexes': [('ix_messages_match_created', ['match_id', 'created_at'])],
+    },
+}
+
+
+def _add_months(moment, months):
+    month_index = moment.year * 12 + moment.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _partition_table(table, spec):
+    """Swap a plain table for a monthly range-partitioned one with the same rows"""
+    bind = op.get_bind()
+    old = f'{table}_unpartitioned'
+
+    op.execute(f'UPDATE {table} SET created_at = now() WHERE created_at IS NULL')
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+    op.execute(f'ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)')
+    for column, referenced in spec['foreign_keys']:
+        op.execute(f'ALTER TABLE {table} ADD FOREIGN KEY ({column}) REFERENCES {referenced} (id)')
+
+    now = datetime.utcnow()
+    oldest = bind.execute(sa.text(f'SELECT min(created_at) FROM {old}')).scalar() or now
+    month = datetime(oldest.year, oldest.month, 1)
+    last = _add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        # Same naming as app.services.retention_service.partition_name
+        name = f'{table}_y{month.year}m{month.month:02d}'
+        op.execute(f"CREATE TABLE {name} PARTITION OF {table} "
+                   f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')")
+        month = _add_months(month, 1)
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old}')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    for name, columns in spec['indexes']:
+        op.create_index(name, table, columns, unique=False)
+
+
+def _unpartition_table(table, spec):
+    """Copy rows back into a plain table with a single-column primary key"""
+    old = f'{table}_partitioned'
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+    for name, _ in spec['indexes']:
+        op.drop_index(name, table_name=old)
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)')
+    op.execute(f'ALTER TABLE {table} ALTER COLUMN created_at DROP NOT NULL')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+    for column, referenced in spec['foreign_keys']:
+        op.execute(f'ALTER TABLE {table} ADD FOREIGN KEY ({column}) REFERENCES {referenced} (id)')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old} CASCADE')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    for name, columns in spec['indexes']:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade() -> None:
+    op.create_table('interaction_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('profile_id', sa.Integer(), nullable=False),
+    sa.Column('period_start', sa.DateTime(), nullable=False),
+    sa.Column('total_views', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('likes_received', sa.Integer(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['profile_id'], ['profiles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('profile_id', 'period_start', name='uq_interaction_rollups_profile_period')
+    )
+
+    # Declarative partitioning is PostgreSQL-only; other databases keep plain tables
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, spec in PARTITIONED.items():
+            _partition_table(table, spec)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, spec in PARTITIONED.items():
+            _unpartition_table(table, spec)
+
+    op.drop_table('interaction_rollups')
@@ -0,0 +1,26 @@
+"""Add ratings (combined_rating, profile_id) index for keyset pagination
+
+Revision ID: 7b5e0f3a2c18
+Revises: 3c1d2e7a9b40
+Create Date: 2026-10-18 14:05:51.630274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b5e0f3a2c18'
+down_revision: Union[str, None] = '3c1d2e7a9b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ratings_combined_rating_profile_id', 'ratings', ['combined_rating', 'profile_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ratings_combined_rating_profile_id', table_name='ratings')
@@ -0,0 +1,50 @@
+"""Add profile_stats counters table
+
+Revision ID: 9fe6a4588c80
+Revises: 447035678cd1
+Create Date: 2026-10-18 10:12:31.402518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9fe6a4588c80'
+down_revision: Union[str, None] = '447035678cd1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('profile_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('profile_id', sa.Integer(), nullable=True),
+    sa.Column('likes_received', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('total_views', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('matches_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('initiated_chats', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['profile_id'], ['profiles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('profile_id')
+    )
+
+    # Backfill counters for existing profiles from the raw tables
+    op.execute("""
+        INSERT INTO profile_stats (profile_id, likes_received, total_views, matches_count, initiated_chats, updated_at)
+        SELECT p.id,
+               (SELECT COUNT(*) FROM interactions i WHERE i.to_profile_id = p.id AND i.type = 'like'),
+               (SELECT COUNT(*) FROM interactions i WHERE i.to_profile_id = p.id),
+               (SELECT COUNT(*) FROM matches m WHERE m.profile_id_1 = p.id OR m.profile_id_2 = p.id),
+               (SELECT COUNT(*) FROM matches m
+                 WHERE (m.profile_id_1 = p.id OR m.profile_id_2 = p.id) AND m.initiated_chat),
+               CURRENT_TIMESTAMP
+        FROM profiles p
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('profile_stats')
@@ -0,0 +1,38 @@
+"""Add photo ingestion status and Telegram file unique id
+
+Revision ID: a3f9c6d21e87
+Revises: 5d8e2b7f4c91
+Create Date: 2026-10-18 21:04:12.518364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c6d21e87'
+down_revision: Union[str, None] = '5d8e2b7f4c91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.alter_column('s3_path', existing_type=sa.String(length=255), nullable=True)
+        batch_op.add_column(sa.Column('telegram_file_unique_id', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('status', sa.String(length=20), nullable=False, server_default='ready'))
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ux_photos_profile_file_unique_id', ['profile_id', 'telegram_file_unique_id'],
+                              unique=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM photos WHERE s3_path IS NULL")
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.drop_index('ux_photos_profile_file_unique_id')
+        batch_op.drop_column('attempts')
+        batch_op.drop_column('status')
+        batch_op.drop_column('telegram_file_unique_id')
+        batch_op.alter_column('s3_path', existing_type=sa.String(length=255), nullable=False)
@@ -0,0 +1,38 @@
+"""Add hot-path indexes on interactions, matches, messages and photos
+
+Revision ID: c42a9d81e6f5
+Revises: 7b5e0f3a2c18
+Create Date: 2026-10-18 15:22:37.908113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c42a9d81e6f5'
+down_revision: Union[str, None] = '7b5e0f3a2c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_interactions_from_to_type', 'interactions', ['from_profile_id', 'to_profile_id', 'type'], unique=False)
+    op.drop_index('ix_interactions_from_to', table_name='interactions')
+    op.create_index('ix_interactions_to_type', 'interactions', ['to_profile_id', 'type'], unique=False)
+    op.create_index('ix_matches_profile_id_1', 'matches', ['profile_id_1'], unique=False)
+    op.create_index('ix_matches_profile_id_2', 'matches', ['profile_id_2'], unique=False)
+    op.create_index('ix_messages_match_created', 'messages', ['match_id', 'created_at'], unique=False)
+    op.create_index('ix_photos_profile_id', 'photos', ['profile_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photos_profile_id', table_name='photos')
+    op.drop_index('ix_messages_match_created', table_name='messages')
+    op.drop_index('ix_matches_profile_id_2', table_name='matches')
+    op.drop_index('ix_matches_profile_id_1', table_name='matches')
+    op.drop_index('ix_interactions_to_type', table_name='interactions')
+    op.create_index('ix_interactions_from_to', 'interactions', ['from_profile_id', 'to_profile_id'], unique=False)
+    op.drop_index('ix_interactions_from_to_type', table_name='interactions')
@@ -0,0 +1,33 @@
+"""Add resized photo variants
+
+Revision ID: d6b1e8f3a5c2
+Revises: a3f9c6d21e87
+Create Date: 2026-10-18 22:37:45.170924
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6b1e8f3a5c2'
+down_revision: Union[str, None] = 'a3f9c6d21e87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('photos', sa.Column('medium_s3_path', sa.String(length=255), nullable=True))
+    op.add_column('photos', sa.Column('small_s3_path', sa.String(length=255), nullable=True))
+    op.add_column('photos', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('photos', sa.Column('height', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('photos') as batch_op:
+        batch_op.drop_column('height')
+        batch_op.drop_column('width')
+        batch_op.drop_column('small_s3_path')
+        batch_op.drop_column('medium_s3_path')
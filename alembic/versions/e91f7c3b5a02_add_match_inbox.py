@@ -0,0 +1,68 @@
+"""Add match_inbox projection table
+
+Revision ID: e91f7c3b5a02
+Revises: c42a9d81e6f5
+Create Date: 2026-10-18 16:48:12.447305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91f7c3b5a02'
+down_revision: Union[str, None] = 'c42a9d81e6f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_SIDE = """
+    INSERT INTO match_inbox (profile_id, match_id, other_profile_id, status, last_message_snippet,
+                             last_message_sender_id, last_message_at, last_activity_at, unread_count)
+    SELECT m.{owner}, m.id, m.{other}, m.status,
+           (SELECT substr(msg.content, 1, 100) FROM messages msg WHERE msg.match_id = m.id
+            ORDER BY msg.created_at DESC, msg.id DESC LIMIT 1),
+           (SELECT msg.sender_id FROM messages msg WHERE msg.match_id = m.id
+            ORDER BY msg.created_at DESC, msg.id DESC LIMIT 1),
+           (SELECT max(msg.created_at) FROM messages msg WHERE msg.match_id = m.id),
+           coalesce((SELECT max(msg.created_at) FROM messages msg WHERE msg.match_id = m.id), m.created_at),
+           (SELECT count(*) FROM messages msg WHERE msg.match_id = m.id
+            AND msg.sender_id != m.{owner} AND NOT msg."read")
+    FROM matches m
+    WHERE m.{owner} IS NOT NULL AND m.{other} IS NOT NULL {extra}
+"""
+
+
+def upgrade() -> None:
+    op.create_table('match_inbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('profile_id', sa.Integer(), nullable=False),
+    sa.Column('match_id', sa.Integer(), nullable=False),
+    sa.Column('other_profile_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('last_message_snippet', sa.String(length=100), nullable=True),
+    sa.Column('last_message_sender_id', sa.Integer(), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=True),
+    sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+    sa.Column('unread_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['match_id'], ['matches.id'], ),
+    sa.ForeignKeyConstraint(['other_profile_id'], ['profiles.id'], ),
+    sa.ForeignKeyConstraint(['profile_id'], ['profiles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('profile_id', 'match_id', name='uq_match_inbox_profile_match')
+    )
+    op.create_index('ix_match_inbox_profile_status_activity', 'match_inbox',
+                    ['profile_id', 'status', 'last_activity_at'], unique=False)
+    op.create_index('ix_match_inbox_match_id', 'match_inbox', ['match_id'], unique=False)
+
+    op.execute(BACKFILL_SIDE.format(owner='profile_id_1', other='profile_id_2', extra=''))
+    op.execute(BACKFILL_SIDE.format(owner='profile_id_2', other='profile_id_1',
+                                    extra='AND m.profile_id_1 != m.profile_id_2'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_match_inbox_match_id', table_name='match_inbox')
+    op.drop_index('ix_match_inbox_profile_status_activity', table_name='match_inbox')
+    op.drop_table('match_inbox')
@@ -0,0 +1,32 @@
+"""Add seen_profiles for viewers whose old skips were compacted
+
+Revision ID: f4c8a2d6e913
+Revises: d6b1e8f3a5c2
+Create Date: 2026-10-19 10:12:31.508214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8a2d6e913'
+down_revision: Union[str, None] = 'd6b1e8f3a5c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('seen_profiles',
+    sa.Column('viewer_profile_id', sa.Integer(), nullable=False),
+    sa.Column('profile_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['viewer_profile_id'], ['profiles.id'], ),
+    sa.ForeignKeyConstraint(['profile_id'], ['profiles.id'], ),
+    sa.PrimaryKeyConstraint('viewer_profile_id', 'profile_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('seen_profiles')
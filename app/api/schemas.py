@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class UserCreate(BaseModel):
     telegram_id: int = Field(..., description="Telegram ID пользователя")
@@ -42,6 +42,14 @@ class ProfileResponse(BaseModel):
     created_at: str
     updated_at: str
 
+class PhotoResponse(BaseModel):
+    id: int
+    is_main: bool
+    status: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    variants: Dict[str, str] = Field(default_factory=dict, description="URL по варианту: main/medium/small")
+
 class InteractionCreate(BaseModel):
     to_profile_id: int = Field(..., description="ID профиля, с которым взаимодействуют")
     type: str = Field(..., description="Тип взаимодействия: like/pass")
@@ -66,4 +74,29 @@ class RatingResponse(BaseModel):
     primary_rating: float
     behavioral_rating: float
     combined_rating: float
-    last_calculated: str
\ No newline at end of file
+    last_calculated: str
+
+class CandidateProfile(BaseModel):
+    id: int
+    name: str
+    age: int
+    gender: str
+    bio: Optional[str]
+    location: str
+    interests: Optional[str]
+    photo_count: int
+    combined_rating: float
+
+class CandidatePageResponse(BaseModel):
+    profiles: List[CandidateProfile]
+    next_cursor: Optional[str]
+
+class MessageCreate(BaseModel):
+    sender_profile_id: int = Field(..., description="ID профиля отправителя")
+    content: str = Field(..., min_length=1, max_length=4000, description="Текст сообщения")
+
+class MessageResponse(BaseModel):
+    id: int
+    match_id: int
+    sender_profile_id: int
+    created_at: str
\ No newline at end of file
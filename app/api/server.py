@@ -1,11 +1,18 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import List, Optional
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import *
+from app.models.database import configure_engine, pool_status, read_replica
 from app.api.schemas import *
-from app.services.user_service import UserService
-from app.services.profile_service import ProfileService
+from app.services.user_service import AsyncUserService
+from app.services.profile_service import AsyncProfileService, get_profile_service
+from app.services.stats_service import StatsService
+from app.services.rating_service import RatingService
+from app.services.matching_service import AsyncMatchingService, get_matching_service
+from app.core.profile_cache import profile_cache
 from app.core.config import *
 import logging
 
@@ -36,6 +43,11 @@ def get_db():
     finally:
         session.close()
 
+async def get_async_db():
+    from app.models.database import AsyncSession as DB_AsyncSession
+    async with DB_AsyncSession() as session:
+        yield session
+
 @app.get("/", tags=["Health"])
 async def root():
     return {"message": "Dating Bot API работает", "version": "1.0.0"}
@@ -45,9 +57,9 @@ async def health_check():
     return {"status": "healthy", "service": "dating-bot-api"}
 
 @app.post("/users", response_model=UserResponse, tags=["Users"])
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        user = UserService.get_or_create_user(
+        user = await AsyncUserService.get_or_create_user(
             session=db, 
             telegram_id=user_data.telegram_id,
             telegram_username=user_data.username
@@ -65,9 +77,9 @@ async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Ошибка создания пользователя: {str(e)}")
 
 @app.get("/users/{telegram_id}", response_model=UserResponse, tags=["Users"])
-async def get_user(telegram_id: int, db: Session = Depends(get_db)):
+async def get_user(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        user = db.query(User).filter_by(telegram_id=telegram_id).first()
+        user = await db.scalar(select(User).where(User.telegram_id == telegram_id))
         if not user:
             raise HTTPException(status_code=404, detail="Пользователь не найден")
         
@@ -85,13 +97,13 @@ async def get_user(telegram_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Ошибка получения пользователя: {str(e)}")
 
 @app.post("/users/{telegram_id}/profile", response_model=ProfileResponse, tags=["Profiles"])
-async def create_profile(telegram_id: int, profile_data: ProfileCreate, db: Session = Depends(get_db)):
+def create_profile(telegram_id: int, profile_data: ProfileCreate, db: Session = Depends(get_db)):
     try:
         user = db.query(User).filter_by(telegram_id=telegram_id).first()
         if not user:
             raise HTTPException(status_code=404, detail="Пользователь не найден")
         
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
         profile = profile_service.create_profile(
             session=db,
             user_id=user.id,
@@ -126,9 +138,9 @@ async def create_profile(telegram_id: int, profile_data: ProfileCreate, db: Sess
         raise HTTPException(status_code=500, detail=f"Ошибка создания профиля: {str(e)}")
 
 @app.get("/users/{telegram_id}/profile", tags=["Profiles"])
-async def get_user_profile(telegram_id: int, db: Session = Depends(get_db)):
+async def get_user_profile(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        profile_data = UserService.get_user_profile(session=db, telegram_id=telegram_id)
+        profile_data = await AsyncUserService.get_user_profile(session=db, telegram_id=telegram_id)
         
         if not profile_data:
             raise HTTPException(status_code=404, detail="Пользователь не найден")
@@ -144,7 +156,7 @@ async def get_user_profile(telegram_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Ошибка получения профиля: {str(e)}")
 
 @app.post("/profiles/{profile_id}/interactions", response_model=InteractionResponse, tags=["Matching"])
-async def create_interaction(profile_id: int, interaction_data: InteractionCreate, db: Session = Depends(get_db)):
+def create_interaction(profile_id: int, interaction_data: InteractionCreate, db: Session = Depends(get_db)):
     try:
         profile = db.query(Profile).filter_by(id=profile_id).first()
         if not profile:
@@ -157,8 +169,19 @@ async def create_interaction(profile_id: int, interaction_data: InteractionCreat
         )
         
         db.add(interaction)
+        StatsService.increment(
+            db,
+            interaction_data.to_profile_id,
+            total_views=1,
+            likes_received=1 if interaction_data.type == "like" else 0
+        )
         db.commit()
         db.refresh(interaction)
+        matching_service = get_matching_service()
+        matching_service.seen_filter.add(profile_id, [interaction_data.to_profile_id])
+        RatingService.schedule_rating_refresh(
+            db, matching_service.redis_client, [interaction_data.to_profile_id]
+        )
         
         return InteractionResponse(
             id=interaction.id,
@@ -175,16 +198,16 @@ async def create_interaction(profile_id: int, interaction_data: InteractionCreat
         raise HTTPException(status_code=500, detail=f"Ошибка создания взаимодействия: {str(e)}")
 
 @app.get("/profiles/{profile_id}/matches", response_model=List[MatchResponse], tags=["Matching"])
-async def get_profile_matches(profile_id: int, db: Session = Depends(get_db)):
+async def get_profile_matches(profile_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        profile = db.query(Profile).filter_by(id=profile_id).first()
+        profile = await db.get(Profile, profile_id)
         if not profile:
             raise HTTPException(status_code=404, detail="Профиль не найден")
         
-        matches = db.query(Match).filter(
+        matches = (await db.scalars(select(Match).where(
             (Match.profile_id_1 == profile_id) | 
             (Match.profile_id_2 == profile_id)
-        ).all()
+        ))).all()
         
         return [
             MatchResponse(
@@ -203,10 +226,67 @@ async def get_profile_matches(profile_id: int, db: Session = Depends(get_db)):
         logger.error(f"Error getting matches: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка получения совпадений: {str(e)}")
 
+@app.get("/profiles/{profile_id}/candidates", response_model=CandidatePageResponse, tags=["Matching"])
+async def get_profile_candidates(profile_id: int, limit: int = Query(20, ge=1, le=100),
+                                 cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    try:
+        profile = await db.get(Profile, profile_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Профиль не найден")
+
+        page = await db.run_sync(RatingService.get_ranked_page, profile_id, limit, cursor)
+
+        return CandidatePageResponse(
+            profiles=[
+                CandidateProfile(
+                    id=candidate["id"],
+                    name=candidate["name"],
+                    age=candidate["age"],
+                    gender=candidate["gender"],
+                    bio=candidate["bio"],
+                    location=candidate["location"],
+                    interests=candidate["interests"],
+                    photo_count=candidate["photo_count"] or 0,
+                    combined_rating=candidate["rating"]["combined"]
+                )
+                for candidate in page["profiles"]
+            ],
+            next_cursor=page["next_cursor"]
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Некорректный курсор: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error getting candidates: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка получения анкет: {str(e)}")
+
+@app.post("/matches/{match_id}/messages", response_model=MessageResponse, tags=["Matching"])
+async def send_match_message(match_id: int, message_data: MessageCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        result = await AsyncMatchingService().send_message(db, match_id, message_data.sender_profile_id,
+                                                           message_data.content)
+        if not result["success"]:
+            if result["error"] == "Match not found":
+                raise HTTPException(status_code=404, detail="Совпадение не найдено")
+            raise HTTPException(status_code=500, detail=f"Ошибка отправки сообщения: {result['error']}")
+
+        return MessageResponse(
+            id=result["message_id"],
+            match_id=match_id,
+            sender_profile_id=message_data.sender_profile_id,
+            created_at=result["created_at"].isoformat()
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error sending message: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка отправки сообщения: {str(e)}")
+
 @app.get("/profiles/{profile_id}/rating", response_model=RatingResponse, tags=["Rating"])
-async def get_profile_rating(profile_id: int, db: Session = Depends(get_db)):
+async def get_profile_rating(profile_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        rating = db.query(Rating).filter_by(profile_id=profile_id).first()
+        rating = await db.scalar(select(Rating).where(Rating.profile_id == profile_id))
         if not rating:
             raise HTTPException(status_code=404, detail="Рейтинг не найден")
         
@@ -222,19 +302,49 @@ async def get_profile_rating(profile_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Ошибка получения рейтинга: {str(e)}")
 
 @app.get("/stats", tags=["Statistics"])
-async def get_system_stats(db: Session = Depends(get_db)):
+async def get_system_stats(db: AsyncSession = Depends(get_async_db)):
     try:
-        return {
-            "total_users": db.query(User).count(),
-            "total_profiles": db.query(Profile).count(),
-            "total_interactions": db.query(Interaction).count(),
-            "total_matches": db.query(Match).count(),
-            "profiles_with_photos": db.query(Profile).filter(Profile.photo_count > 0).count()
-        }
+        with read_replica(db):
+            return {
+                "total_users": await db.scalar(select(func.count(User.id))),
+                "total_profiles": await db.scalar(select(func.count(Profile.id))),
+                "total_interactions": await db.scalar(select(func.count(Interaction.id))),
+                "total_matches": await db.scalar(select(func.count(Match.id))),
+                "profiles_with_photos": await db.scalar(
+                    select(func.count(Profile.id)).where(Profile.photo_count > 0)
+                )
+            }
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         raise HTTPException(status_code=500, detail=f"Ошибка получения статистики: {str(e)}")
 
+@app.get("/profiles/{profile_id}/photos", response_model=List[PhotoResponse], tags=["Profiles"])
+async def get_profile_photos(profile_id: int, db: AsyncSession = Depends(get_async_db)):
+    profile = await db.get(Profile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    photos = await AsyncProfileService(get_profile_service()).get_photos(db, profile_id)
+    return [PhotoResponse(**photo) for photo in photos]
+
+@app.get("/photos/{photo_id}/status", tags=["Profiles"])
+async def get_photo_status(photo_id: int, db: AsyncSession = Depends(get_async_db)):
+    status = await AsyncProfileService(get_profile_service()).get_photo_status(db, photo_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Фото не найдено")
+    return status
+
+@app.get("/stats/db-pool", tags=["Statistics"])
+async def get_db_pool_stats():
+    return pool_status()
+
+@app.get("/stats/profile-cache", tags=["Statistics"])
+async def get_profile_cache_stats():
+    return profile_cache.stats()
+
+@app.on_event("startup")
+async def startup_event():
+    configure_engine("api")
+
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("API сервер корректно завершает работу...")
@@ -0,0 +1,130 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Tuple
+from . import config
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# First byte of every encoded value; bump it when the header layout changes
+FORMAT_VERSION = 1
+
+
+class CodecError(ValueError):
+    pass
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _serializers() -> Dict[str, Tuple[int, Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    serializers = {"json": (1, _json_dumps, json.loads)}
+    if msgpack is not None:
+        serializers["msgpack"] = (
+            2,
+            lambda value: msgpack.packb(value, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False)
+        )
+    if orjson is not None:
+        serializers["orjson"] = (
+            3,
+            lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS),
+            orjson.loads
+        )
+    return serializers
+
+
+def _compressors() -> Dict[str, Tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    compressors = {"none": (0, bytes, bytes)}
+    if zstandard is not None:
+        compressors["zstd"] = (
+            1,
+            lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data)
+        )
+    if lz4_frame is not None:
+        compressors["lz4"] = (2, lz4_frame.compress, lz4_frame.decompress)
+    return compressors
+
+
+SERIALIZERS = _serializers()
+COMPRESSORS = _compressors()
+
+
+class Codec:
+    """
+    Encodes cached values as a version byte, a format byte (serializer id in
+    the high nibble, compression id in the low one) and the payload. Values are
+    decoded by their own header, so any codec reads what any other one wrote.
+    """
+
+    def __init__(self, serializer: str = config.REDIS_CODEC,
+                 compression: str = config.REDIS_COMPRESSION,
+                 compression_threshold: int = config.REDIS_COMPRESSION_THRESHOLD):
+        if serializer not in SERIALIZERS:
+            logger.warning(f"Serializer {serializer} is not available, falling back to json")
+            serializer = "json"
+        if compression not in COMPRESSORS:
+            logger.warning(f"Compression {compression} is not available, storing values uncompressed")
+            compression = "none"
+        self.serializer = serializer
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self._serializer_id, self._dumps, _ = SERIALIZERS[serializer]
+        self._compression_id, self._compress, _ = COMPRESSORS[compression]
+
+    def encode(self, value: Any) -> bytes:
+        payload = self._dumps(value)
+        compression_id = 0
+        if self._compression_id and len(payload) >= self.compression_threshold:
+            payload = self._compress(payload)
+            compression_id = self._compression_id
+        return bytes((FORMAT_VERSION, self._serializer_id << 4 | compression_id)) + payload
+
+    def decode(self, data: bytes) -> Any:
+        if not data:
+            raise CodecError("Empty value")
+        if data[0] != FORMAT_VERSION:
+            return self._decode_legacy(data)
+        if len(data) < 2:
+            raise CodecError("Truncated header")
+
+        serializer_id, compression_id = data[1] >> 4, data[1] & 0x0F
+        loads = self._by_id(SERIALIZERS, serializer_id, "serializer")[2]
+        decompress = self._by_id(COMPRESSORS, compression_id, "compression")[2]
+        return loads(decompress(data[2:]))
+
+    @staticmethod
+    def _by_id(registry: Dict[str, Tuple], format_id: int, kind: str) -> Tuple:
+        for entry in registry.values():
+            if entry[0] == format_id:
+                return entry
+        raise CodecError(f"Unknown or unavailable {kind} {format_id}")
+
+    @staticmethod
+    def _decode_legacy(data: bytes) -> Any:
+        """Values written before the header existed: plain json is still read, pickle is not"""
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise CodecError(f"Unsupported format version {data[0]}")
@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_FILE_TIMEOUT = float(os.getenv("TELEGRAM_FILE_TIMEOUT", "30"))
 
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
@@ -11,11 +13,22 @@ DB_NAME = os.getenv("DB_NAME", "dating_bot")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Comma-separated read replica URLs; read-only service methods are routed there when set
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
 REDIS_CACHE_TTL = 3600
+# One pool per process shared by every RedisClient; callers wait up to REDIS_POOL_TIMEOUT for a free connection
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+# Cached values: msgpack, orjson or json, compressed with zstd, lz4 or none above the threshold in bytes
+REDIS_CODEC = os.getenv("REDIS_CODEC", "orjson")
+REDIS_COMPRESSION = os.getenv("REDIS_COMPRESSION", "lz4")
+REDIS_COMPRESSION_THRESHOLD = int(os.getenv("REDIS_COMPRESSION_THRESHOLD", "1024"))
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
 RABBITMQ_PORT = os.getenv("RABBITMQ_PORT", "5672")
@@ -28,6 +41,58 @@ S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "minioadmin")
 S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "minioadmin")
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "dating-bot")
 S3_SECURE = os.getenv("S3_SECURE", "False").lower() == "true"
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", "3"))
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "10"))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "20"))
+# Photo ingestion task: retries back off exponentially from the base delay in seconds
+PHOTO_INGEST_MAX_RETRIES = int(os.getenv("PHOTO_INGEST_MAX_RETRIES", "5"))
+PHOTO_INGEST_RETRY_DELAY = int(os.getenv("PHOTO_INGEST_RETRY_DELAY", "10"))
+# Stored photo variants: longer side in pixels, encoded as progressive jpeg or webp
+PHOTO_VARIANTS = {
+    "main": int(os.getenv("PHOTO_MAIN_SIZE", "1280")),
+    "medium": int(os.getenv("PHOTO_MEDIUM_SIZE", "640")),
+    "small": int(os.getenv("PHOTO_SMALL_SIZE", "200")),
+}
+PHOTO_FORMAT = os.getenv("PHOTO_FORMAT", "jpeg")
+PHOTO_QUALITY = int(os.getenv("PHOTO_QUALITY", "85"))
+
+# Worker threads for service calls that still block (Redis, S3); each holds at most one DB connection
+BOT_EXECUTOR_WORKERS = int(os.getenv("BOT_EXECUTOR_WORKERS", "16"))
+
+# Connection pool per process role; PROCESS_ROLE is set by each service's entrypoint.
+# The bot holds up to 30 connections: 14 in its async pool and one per executor worker.
+PROCESS_ROLE = os.getenv("PROCESS_ROLE", "bot")
+DB_POOL_PROFILES = {
+    "bot": {
+        "pool_size": int(os.getenv("BOT_DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("BOT_DB_MAX_OVERFLOW", "4")),
+        "pool_timeout": int(os.getenv("BOT_DB_POOL_TIMEOUT", "10")),
+        "statement_timeout_ms": int(os.getenv("BOT_DB_STATEMENT_TIMEOUT_MS", "5000")),
+    },
+    "bot_executor": {
+        "pool_size": BOT_EXECUTOR_WORKERS,
+        "max_overflow": 0,
+        "pool_timeout": int(os.getenv("BOT_DB_POOL_TIMEOUT", "10")),
+        "statement_timeout_ms": int(os.getenv("BOT_DB_STATEMENT_TIMEOUT_MS", "5000")),
+    },
+    "api": {
+        "pool_size": int(os.getenv("API_DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("API_DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("API_DB_POOL_TIMEOUT", "10")),
+        "statement_timeout_ms": int(os.getenv("API_DB_STATEMENT_TIMEOUT_MS", "5000")),
+    },
+    "celery": {
+        "pool_size": int(os.getenv("CELERY_DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("CELERY_DB_MAX_OVERFLOW", "5")),
+        "pool_timeout": int(os.getenv("CELERY_DB_POOL_TIMEOUT", "30")),
+        "statement_timeout_ms": int(os.getenv("CELERY_DB_STATEMENT_TIMEOUT_MS", "300000")),
+    },
+}
+# Profile of the synchronous engine for roles whose async engine carries the main traffic
+DB_SYNC_POOL_ROLES = {"bot": "bot_executor"}
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+DB_POOL_SLOW_CHECKOUT_MS = int(os.getenv("DB_POOL_SLOW_CHECKOUT_MS", "100"))
 
 CELERY_BROKER_URL = RABBITMQ_URL
 CELERY_RESULT_BACKEND = REDIS_URL
@@ -35,8 +100,40 @@ CELERY_RESULT_BACKEND = REDIS_URL
 PRIMARY_RATING_WEIGHT = 0.4
 BEHAVIORAL_RATING_WEIGHT = 0.6
 RATING_RECALCULATION_INTERVAL = 3600
+RATING_BULK_CHUNK_SIZE = int(os.getenv("RATING_BULK_CHUNK_SIZE", "1000"))
+RATING_DIRTY_REFRESH_INTERVAL = int(os.getenv("RATING_DIRTY_REFRESH_INTERVAL", "60"))
+RATING_DIRTY_BATCH_SIZE = int(os.getenv("RATING_DIRTY_BATCH_SIZE", "500"))
+RATING_DIRTY_MAX_BATCHES = int(os.getenv("RATING_DIRTY_MAX_BATCHES", "20"))
+RATING_SHARD_SIZE = int(os.getenv("RATING_SHARD_SIZE", "5000"))
+RATING_SHARD_CONCURRENCY = int(os.getenv("RATING_SHARD_CONCURRENCY", "4"))
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = os.getenv("LOG_FILE", "dating_bot.log")
 
-PROFILES_PRELOAD_COUNT = 10
\ No newline at end of file
+# Updates the bot handles at once; handlers await the database instead of blocking each other
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "64"))
+BOT_EXECUTOR_MAX_QUEUE = int(os.getenv("BOT_EXECUTOR_MAX_QUEUE", "256"))
+BOT_EXECUTOR_SLOW_QUEUE_MS = int(os.getenv("BOT_EXECUTOR_SLOW_QUEUE_MS", "200"))
+
+PROFILES_PRELOAD_COUNT = 10
+PROFILE_SUMMARY_TTL = int(os.getenv("PROFILE_SUMMARY_TTL", "300"))
+# Per-process copy in front of Redis; bounds how stale another process can see a summary
+PROFILE_SUMMARY_LOCAL_TTL = float(os.getenv("PROFILE_SUMMARY_LOCAL_TTL", "5"))
+PROFILE_SUMMARY_LOCAL_SIZE = int(os.getenv("PROFILE_SUMMARY_LOCAL_SIZE", "10000"))
+DECK_SIZE = int(os.getenv("DECK_SIZE", "30"))
+DECK_LOW_WATER = int(os.getenv("DECK_LOW_WATER", "10"))
+DECK_TTL = 86400
+DECK_REFILL_LOCK_TTL = 60
+
+MATCH_ARCHIVE_AFTER_DAYS = 30
+MATCH_ARCHIVE_BATCH_SIZE = int(os.getenv("MATCH_ARCHIVE_BATCH_SIZE", "1000"))
+
+INTERACTION_RETENTION_MONTHS = int(os.getenv("INTERACTION_RETENTION_MONTHS", "12"))
+PARTITION_MONTHS_AHEAD = 3
+
+CANDIDATE_POOL_MIN_AGE = 18
+CANDIDATE_POOL_MAX_AGE = 100
+CANDIDATE_POOL_UNION_TTL = 30
+CANDIDATE_POOL_MAX_SCAN = int(os.getenv("CANDIDATE_POOL_MAX_SCAN", "1000"))
+SEEN_FILTER_BITS = int(os.getenv("SEEN_FILTER_BITS", "131072"))
+SEEN_FILTER_HASHES = 7
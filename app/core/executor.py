@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app.core import config
+
+logger = logging.getLogger(__name__)
+
+
+class BlockingExecutor:
+    """
+    Runs synchronous service calls from async handlers in a bounded thread pool.
+    Each call gets the session of its worker thread, which is closed after
+    the call, and callers wait once max_workers + max_queue calls are in flight.
+    In the bot the sessions use the bot_executor pool: one connection per worker.
+    """
+
+    def __init__(self, session_factory: Optional[sessionmaker] = None,
+                 max_workers: int = config.BOT_EXECUTOR_WORKERS,
+                 max_queue: int = config.BOT_EXECUTOR_MAX_QUEUE):
+        if session_factory is None:
+            from app.models.database import Session
+            session_factory = Session
+        self.sessions = scoped_session(session_factory)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="blocking")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.started = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await func(session, *args, **kwargs) executed on a worker thread"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+
+        async with self._slots:
+            submitted = time.perf_counter()
+            with self._lock:
+                self.queued += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queued)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._call, submitted, func, args, kwargs)
+
+    def _call(self, submitted: float, func: Callable[..., Any], args, kwargs) -> Any:
+        waited = time.perf_counter() - submitted
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.started += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        if waited * 1000 >= config.BOT_EXECUTOR_SLOW_QUEUE_MS:
+            logger.warning(f"{func.__qualname__} waited {waited * 1000:.0f} ms for a worker thread")
+
+        try:
+            return func(self.sessions(), *args, **kwargs)
+        finally:
+            self.sessions.remove()
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "wait_avg_ms": self.wait_total / self.started * 1000 if self.started else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        logger.info(f"Blocking executor stopped: {self.stats()}")
@@ -0,0 +1,73 @@
+import io
+import logging
+from typing import Any, Dict, Optional
+from PIL import Image, ImageOps, UnidentifiedImageError
+from . import config
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+
+
+class ImageProcessingError(ValueError):
+    pass
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    """Re-encode without EXIF or other metadata"""
+    output = io.BytesIO()
+    if image_format == "webp":
+        image.save(output, "WEBP", quality=quality, method=4)
+    else:
+        image.save(output, "JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGB image; transparent areas become white rather than black"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def process_photo(data: bytes, variants: Optional[Dict[str, int]] = None,
+                  image_format: str = config.PHOTO_FORMAT,
+                  quality: int = config.PHOTO_QUALITY) -> Dict[str, Dict[str, Any]]:
+    """
+    Decode an uploaded photo once and build its variants, largest first, each
+    bounded by its size in pixels on the longer side and never upscaled.
+    Orientation from EXIF is applied to the pixels before the metadata is dropped.
+    Returns {variant: {"data", "width", "height", "content_type", "extension"}}.
+    """
+    variants = variants or config.PHOTO_VARIANTS
+    if image_format not in CONTENT_TYPES:
+        raise ImageProcessingError(f"Unsupported photo format {image_format}")
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        # JPEG can be decoded at 1/2, 1/4 or 1/8 scale when the largest variant allows it
+        largest = max(variants.values())
+        image.draft("RGB", (largest, largest))
+        image = _flatten(ImageOps.exif_transpose(image))
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageProcessingError(f"Cannot decode photo: {e}")
+
+    result = {}
+    # Each variant is scaled down from the previous one instead of the original
+    for name, size in sorted(variants.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+        result[name] = {
+            "data": _encode(image, image_format, quality),
+            "width": image.width,
+            "height": image.height,
+            "content_type": CONTENT_TYPES[image_format],
+            "extension": EXTENSIONS[image_format],
+        }
+
+    logger.debug(f"Processed photo of {len(data)} bytes into "
+                 + ", ".join(f"{name} {variant['width']}x{variant['height']}" for name, variant in result.items()))
+    return result
@@ -0,0 +1,128 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from . import config
+from .redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileSummaryCache:
+    """
+    Cache-aside store for UserService.get_user_profile keyed by telegram_id:
+    a short-TTL LRU per process in front of Redis. Writers call invalidate()
+    after committing; other processes see the change once their local copy expires.
+    """
+
+    def __init__(self, redis_client: Optional[RedisClient] = None,
+                 local_ttl: float = config.PROFILE_SUMMARY_LOCAL_TTL,
+                 local_size: int = config.PROFILE_SUMMARY_LOCAL_SIZE):
+        self._redis_client = redis_client
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self._local: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def redis_client(self) -> RedisClient:
+        if self._redis_client is None:
+            self._redis_client = RedisClient()
+        return self._redis_client
+
+    @redis_client.setter
+    def redis_client(self, redis_client: RedisClient):
+        self._redis_client = redis_client
+
+    def reset_stats(self):
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        return self.lookup(telegram_id)[0]
+
+    def lookup(self, telegram_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        """The cached summary, or None and the generation to pass to set() with the loaded one"""
+        summary = self.get_local(telegram_id)
+        if summary is not None:
+            return summary, None
+        return self.get_shared(telegram_id)
+
+    def get_local(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """This process's copy; never touches Redis, so it is safe on the event loop"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(telegram_id)
+            if entry and entry[0] > now:
+                self._local.move_to_end(telegram_id)
+                self.local_hits += 1
+                return copy.deepcopy(entry[1])
+        return None
+
+    def get_shared(self, telegram_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+        summary, generation = self.redis_client.get_cached_user_profile(telegram_id)
+        if summary:
+            self._store_local(telegram_id, copy.deepcopy(summary))
+            with self._lock:
+                self.redis_hits += 1
+            return summary, generation
+
+        with self._lock:
+            self.misses += 1
+        return None, generation
+
+    def set(self, telegram_id: int, summary: Dict[str, Any], generation: Optional[int] = None):
+        """
+        Store a summary. With the generation returned by lookup() it is dropped
+        instead if the user was invalidated while the caller was loading it.
+        The local copy goes in first so an invalidation racing with this call removes it.
+        """
+        self._store_local(telegram_id, copy.deepcopy(summary))
+        if not self.redis_client.cache_user_profile(telegram_id, summary, generation):
+            with self._lock:
+                self._local.pop(telegram_id, None)
+
+    def invalidate(self, telegram_id: int):
+        self.redis_client.delete_cached_user_profile(telegram_id)
+        self.drop_local(telegram_id)
+
+    def drop_local(self, telegram_id: int):
+        """
+        Forget this process's copy; for writers that delete the Redis entry in
+        their own batch, which must happen first
+        """
+        with self._lock:
+            self._local.pop(telegram_id, None)
+            self.invalidations += 1
+        logger.debug(f"Invalidated profile summary of user {telegram_id}")
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.local_hits + self.redis_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+                "local_size": len(self._local),
+            }
+
+    def _store_local(self, telegram_id: int, summary: Dict[str, Any]):
+        with self._lock:
+            self._local[telegram_id] = (time.monotonic() + self.local_ttl, summary)
+            self._local.move_to_end(telegram_id)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+profile_cache = ProfileSummaryCache()
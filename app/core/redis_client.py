@@ -1,22 +1,59 @@
 import redis
-import pickle
-import json
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from . import config
+from .codec import Codec
 import logging
 
 logger = logging.getLogger(__name__)
 
+DIRTY_PROFILES_KEY = "ratings:dirty"
+
+_pools: Dict[str, redis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(url: str = config.REDIS_URL) -> redis.ConnectionPool:
+    """
+    Process-wide connection pool for a Redis URL, created on first use.
+    redis-py resets a pool by itself when it is used after a fork.
+    """
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = redis.BlockingConnectionPool.from_url(
+                url,
+                max_connections=config.REDIS_MAX_CONNECTIONS,
+                timeout=config.REDIS_POOL_TIMEOUT,
+                socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=config.REDIS_SOCKET_TIMEOUT,
+                socket_keepalive=True,
+                health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL
+            )
+            _pools[url] = pool
+            logger.info(f"Redis connection pool created for {url} "
+                        f"with up to {config.REDIS_MAX_CONNECTIONS} connections")
+        return pool
+
+
+def close_connection_pools():
+    """Disconnect and forget all pools, e.g. on shutdown"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.disconnect()
+        _pools.clear()
+
+
 class RedisClient:
-    def __init__(self):
-        self.client = redis.Redis.from_url(config.REDIS_URL, decode_responses=False)
-        logger.info(f"Redis client initialized with URL: {config.REDIS_URL}")
+    def __init__(self, codec: Optional[Codec] = None, url: str = config.REDIS_URL):
+        self.client = redis.Redis(connection_pool=get_connection_pool(url))
+        self.codec = codec or Codec()
 
     def set_profile_list(self, user_id: int, profiles: List[Dict[str, Any]], ttl: int = config.REDIS_CACHE_TTL):
         """Cache a list of profiles for a user"""
         key = f"profiles:{user_id}"
         try:
-            self.client.set(key, pickle.dumps(profiles), ex=ttl)
+            self.client.set(key, self.codec.encode(profiles), ex=ttl)
             logger.debug(f"Cached {len(profiles)} profiles for user {user_id}")
             return True
         except Exception as e:
@@ -29,7 +66,7 @@ class RedisClient:
         try:
             data = self.client.get(key)
             if data:
-                profiles = pickle.loads(data)
+                profiles = self.codec.decode(data)
                 logger.debug(f"Retrieved {len(profiles)} cached profiles for user {user_id}")
                 return profiles
             return []
@@ -38,21 +75,40 @@ class RedisClient:
             return []
 
     def delete_profile_list(self, user_id: int):
-        """Delete cached profile list for a user"""
-        key = f"profiles:{user_id}"
+        """Delete cached profile list and swipe deck for a user"""
+        return self.invalidate(user_ids=[user_id])
+
+    def invalidate(self, profile_ids: Iterable[int] = (), user_ids: Iterable[int] = (),
+                   telegram_ids: Iterable[int] = ()) -> bool:
+        """
+        Drop cached profiles, users' profile lists and swipe decks, and profile
+        summaries of Telegram users in a single DEL round trip
+        """
+        keys = [f"profile:{profile_id}" for profile_id in profile_ids]
+        for user_id in user_ids:
+            keys += [f"profiles:{user_id}", f"deck:{user_id}", f"deck:{user_id}:cursor"]
+        keys += [f"user_profile:{telegram_id}" for telegram_id in telegram_ids]
+        if not keys:
+            return True
         try:
-            self.client.delete(key)
-            logger.debug(f"Deleted cached profiles for user {user_id}")
+            pipe = self.client.pipeline(transaction=False)
+            pipe.delete(*keys)
+            # A summary loaded before this point must not be cached by a late reader
+            for telegram_id in telegram_ids:
+                pipe.incr(f"user_profile:{telegram_id}:gen")
+                pipe.expire(f"user_profile:{telegram_id}:gen", config.PROFILE_SUMMARY_TTL)
+            pipe.execute()
+            logger.debug(f"Invalidated {len(keys)} cache keys")
             return True
         except Exception as e:
-            logger.error(f"Error deleting cached profiles for user {user_id}: {e}")
+            logger.error(f"Error invalidating cache keys {keys}: {e}")
             return False
 
     def cache_profile(self, profile_id: int, profile_data: Dict[str, Any], ttl: int = config.REDIS_CACHE_TTL):
         """Cache a single profile"""
         key = f"profile:{profile_id}"
         try:
-            self.client.set(key, json.dumps(profile_data), ex=ttl)
+            self.client.set(key, self.codec.encode(profile_data), ex=ttl)
             logger.debug(f"Cached profile {profile_id}")
             return True
         except Exception as e:
@@ -65,10 +121,184 @@ class RedisClient:
         try:
             data = self.client.get(key)
             if data:
-                profile = json.loads(data)
+                profile = self.codec.decode(data)
                 logger.debug(f"Retrieved cached profile {profile_id}")
                 return profile
             return {}
         except Exception as e:
             logger.error(f"Error retrieving cached profile {profile_id}: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+    def cache_profiles(self, profiles: Dict[int, Dict[str, Any]], ttl: int = config.REDIS_CACHE_TTL) -> bool:
+        """Cache several profiles with one pipelined round trip"""
+        if not profiles:
+            return True
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for profile_id, profile_data in profiles.items():
+                pipe.set(f"profile:{profile_id}", self.codec.encode(profile_data), ex=ttl)
+            pipe.execute()
+            logger.debug(f"Cached {len(profiles)} profiles")
+            return True
+        except Exception as e:
+            logger.error(f"Error caching profiles {list(profiles)}: {e}")
+            return False
+
+    def get_cached_profiles(self, profile_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Get cached profiles by id with a single MGET; missing ids are left out"""
+        if not profile_ids:
+            return {}
+        try:
+            values = self.client.mget([f"profile:{profile_id}" for profile_id in profile_ids])
+        except Exception as e:
+            logger.error(f"Error retrieving cached profiles {profile_ids}: {e}")
+            return {}
+
+        profiles = {}
+        for profile_id, data in zip(profile_ids, values):
+            if not data:
+                continue
+            try:
+                profiles[profile_id] = self.codec.decode(data)
+            except Exception as e:
+                logger.error(f"Error decoding cached profile {profile_id}: {e}")
+        return profiles
+
+    def cache_user_profile(self, telegram_id: int, profile_data: Dict[str, Any],
+                           generation: Optional[int] = None, ttl: int = config.PROFILE_SUMMARY_TTL) -> bool:
+        """
+        Cache the profile summary of a Telegram user. With a generation from
+        get_cached_user_profile the summary is only stored if the user was not
+        invalidated since, so a reader that loaded before a write cannot cache stale data.
+        """
+        key = f"user_profile:{telegram_id}"
+        try:
+            if generation is None:
+                self.client.set(key, self.codec.encode(profile_data), ex=ttl)
+                return True
+            with self.client.pipeline() as pipe:
+                pipe.watch(f"{key}:gen")
+                if int(pipe.get(f"{key}:gen") or 0) != generation:
+                    return False
+                pipe.multi()
+                pipe.set(key, self.codec.encode(profile_data), ex=ttl)
+                pipe.execute()
+            return True
+        except redis.WatchError:
+            logger.debug(f"Profile summary of user {telegram_id} was invalidated while loading")
+            return False
+        except Exception as e:
+            logger.error(f"Error caching profile summary of user {telegram_id}: {e}")
+            return False
+
+    def get_cached_user_profile(self, telegram_id: int) -> Tuple[Dict[str, Any], Optional[int]]:
+        """
+        Get the cached profile summary of a Telegram user and the current
+        invalidation generation to pass to cache_user_profile, in one MGET
+        """
+        key = f"user_profile:{telegram_id}"
+        try:
+            data, generation = self.client.mget([key, f"{key}:gen"])
+            return (self.codec.decode(data) if data else {}), int(generation or 0)
+        except Exception as e:
+            logger.error(f"Error retrieving profile summary of user {telegram_id}: {e}")
+            return {}, None
+
+    def delete_cached_user_profile(self, telegram_id: int) -> bool:
+        return self.invalidate(telegram_ids=[telegram_id])
+
+    def mark_profiles_dirty(self, profile_ids: List[int]) -> bool:
+        """Add profiles to the set of profiles whose ratings need recalculation"""
+        if not profile_ids:
+            return True
+        try:
+            self.client.sadd(DIRTY_PROFILES_KEY, *profile_ids)
+            logger.debug(f"Marked profiles {profile_ids} as dirty")
+            return True
+        except Exception as e:
+            logger.error(f"Error marking profiles {profile_ids} as dirty: {e}")
+            return False
+
+    def pop_dirty_profiles(self, count: int) -> List[int]:
+        """Atomically take up to count profiles from the dirty set"""
+        try:
+            members = self.client.spop(DIRTY_PROFILES_KEY, count) or []
+            return [int(member) for member in members]
+        except Exception as e:
+            logger.error(f"Error popping dirty profiles: {e}")
+            return []
+
+    def push_deck(self, user_id: int, profile_ids: List[int], ttl: int = config.DECK_TTL) -> bool:
+        """Append profiles to the end of a user's swipe deck"""
+        if not profile_ids:
+            return True
+        key = f"deck:{user_id}"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.rpush(key, *profile_ids)
+            pipe.expire(key, ttl)
+            pipe.execute()
+            logger.debug(f"Pushed {len(profile_ids)} profiles to deck of user {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error pushing profiles to deck of user {user_id}: {e}")
+            return False
+
+    def pop_deck(self, user_id: int) -> Tuple[Optional[int], int]:
+        """Take the next profile from a user's swipe deck; returns (profile_id, remaining)"""
+        key = f"deck:{user_id}"
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.lpop(key)
+            pipe.llen(key)
+            profile_id, remaining = pipe.execute()
+            return (int(profile_id) if profile_id is not None else None), remaining
+        except Exception as e:
+            logger.error(f"Error popping from deck of user {user_id}: {e}")
+            return None, 0
+
+    def get_deck(self, user_id: int) -> List[int]:
+        """Get the profiles queued in a user's swipe deck"""
+        try:
+            return [int(member) for member in self.client.lrange(f"deck:{user_id}", 0, -1)]
+        except Exception as e:
+            logger.error(f"Error reading deck of user {user_id}: {e}")
+            return []
+
+    def get_deck_cursor(self, user_id: int) -> Optional[str]:
+        """Get the ranking cursor the next deck refill continues from"""
+        try:
+            cursor = self.client.get(f"deck:{user_id}:cursor")
+            return cursor.decode() if cursor else None
+        except Exception as e:
+            logger.error(f"Error reading deck cursor of user {user_id}: {e}")
+            return None
+
+    def set_deck_cursor(self, user_id: int, cursor: Optional[str], ttl: int = config.DECK_TTL) -> bool:
+        """Store the ranking cursor for a user's deck; None restarts from the top"""
+        key = f"deck:{user_id}:cursor"
+        try:
+            if cursor:
+                self.client.set(key, cursor, ex=ttl)
+            else:
+                self.client.delete(key)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing deck cursor of user {user_id}: {e}")
+            return False
+
+    def acquire_deck_refill_lock(self, user_id: int, ttl: int = config.DECK_REFILL_LOCK_TTL) -> bool:
+        """Take the refill lock for a user's deck so only one refill is queued at a time"""
+        try:
+            return bool(self.client.set(f"deck:{user_id}:refill", 1, nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(f"Error acquiring deck refill lock for user {user_id}: {e}")
+            return False
+
+    def release_deck_refill_lock(self, user_id: int) -> bool:
+        try:
+            self.client.delete(f"deck:{user_id}:refill")
+            return True
+        except Exception as e:
+            logger.error(f"Error releasing deck refill lock for user {user_id}: {e}")
+            return False
@@ -2,40 +2,75 @@ import boto3
 from botocore.client import Config
 from . import config
 import logging
+import threading
 import uuid
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
 class S3Client:
+    """
+    Object storage for photos. The boto3 client is built on first use and the
+    bucket is checked once per process, before the first upload, so reads and
+    URL building never wait on S3.
+    """
+
     def __init__(self):
-        self.s3 = boto3.client(
-            's3',
-            endpoint_url=f"{'https' if config.S3_SECURE else 'http'}://{config.S3_ENDPOINT}",
-            aws_access_key_id=config.S3_ACCESS_KEY,
-            aws_secret_access_key=config.S3_SECRET_KEY,
-            config=Config(signature_version='s3v4'),
-            region_name='us-east-1'
-        )
         self.bucket_name = config.S3_BUCKET_NAME
-        self._ensure_bucket_exists()
-        logger.info(f"S3 client initialized with endpoint: {config.S3_ENDPOINT}")
+        self._s3 = None
+        self._bucket_ready = False
+        self._lock = threading.RLock()
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            with self._lock:
+                if self._s3 is None:
+                    self._s3 = boto3.client(
+                        's3',
+                        endpoint_url=f"{'https' if config.S3_SECURE else 'http'}://{config.S3_ENDPOINT}",
+                        aws_access_key_id=config.S3_ACCESS_KEY,
+                        aws_secret_access_key=config.S3_SECRET_KEY,
+                        config=Config(
+                            signature_version='s3v4',
+                            connect_timeout=config.S3_CONNECT_TIMEOUT,
+                            read_timeout=config.S3_READ_TIMEOUT,
+                            max_pool_connections=config.S3_MAX_POOL_CONNECTIONS
+                        ),
+                        region_name='us-east-1'
+                    )
+                    logger.info(f"S3 client initialized with endpoint: {config.S3_ENDPOINT}")
+        return self._s3
+
+    def ensure_bucket(self):
+        """Create the bucket if it doesn't exist; only the first call per process talks to S3"""
+        if self._bucket_ready:
+            return
+        with self._lock:
+            if self._bucket_ready:
+                return
+            self._bucket_ready = self._ensure_bucket_exists()
 
-    def _ensure_bucket_exists(self):
+    def _ensure_bucket_exists(self) -> bool:
         """Create the bucket if it doesn't exist"""
         try:
             self.s3.head_bucket(Bucket=self.bucket_name)
-        except:
+            return True
+        except Exception:
             try:
                 self.s3.create_bucket(Bucket=self.bucket_name)
                 logger.info(f"Created S3 bucket: {self.bucket_name}")
+                return True
             except Exception as e:
                 logger.error(f"Error creating S3 bucket: {e}")
+                return False
 
     def upload_photo(self, photo_data: bytes, content_type: str = 'image/jpeg') -> Optional[str]:
         """Upload a photo to S3 and return the path"""
         try:
+            self.ensure_bucket()
             file_name = f"photos/{str(uuid.uuid4())}.jpg"
             self.s3.put_object(
                 Bucket=self.bucket_name,
@@ -49,6 +84,33 @@ class S3Client:
             logger.error(f"Error uploading photo to S3: {e}")
             return None
 
+    def upload_photo_variants(self, variants: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, str]]:
+        """
+        Upload the variants of one photo under photos/<uuid>/<variant>.<ext> and
+        return their paths; on failure the variants already stored are removed
+        """
+        prefix = f"photos/{uuid.uuid4()}"
+        paths = {}
+        try:
+            self.ensure_bucket()
+            for name, variant in variants.items():
+                key = f"{prefix}/{name}.{variant['extension']}"
+                self.s3.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=variant["data"],
+                    ContentType=variant["content_type"],
+                    CacheControl="public, max-age=31536000, immutable"
+                )
+                paths[name] = key
+            logger.info(f"Uploaded photo variants to S3: {prefix}")
+            return paths
+        except Exception as e:
+            logger.error(f"Error uploading photo variants to S3: {e}")
+            for key in paths.values():
+                self.delete_photo(key)
+            return None
+
     def get_photo_url(self, file_path: str) -> Optional[str]:
         """Generate a pre-signed URL for a photo"""
         try:
@@ -74,4 +136,10 @@ class S3Client:
             return True
         except Exception as e:
             logger.error(f"Error deleting photo from S3: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+@lru_cache(maxsize=None)
+def get_s3_client() -> S3Client:
+    """Process-wide S3Client; constructing it does not touch the network"""
+    return S3Client()
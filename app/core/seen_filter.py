@@ -0,0 +1,119 @@
+import hashlib
+from typing import Iterable, List, Optional, Set
+from .redis_client import RedisClient
+from . import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SeenFilter:
+    """
+    Per-profile Bloom filter of already interacted profile ids, stored as a Redis bitmap.
+    Memory per viewer is fixed by SEEN_FILTER_BITS regardless of history length;
+    a hit only means "maybe seen" and must be confirmed against the database.
+    """
+
+    def __init__(self, redis_client: RedisClient, size_bits: int = config.SEEN_FILTER_BITS,
+                 hash_count: int = config.SEEN_FILTER_HASHES):
+        self.redis_client = redis_client
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+
+    @staticmethod
+    def _key(profile_id: int) -> str:
+        return f"seen:{profile_id}"
+
+    @staticmethod
+    def _ready_key(profile_id: int) -> str:
+        return f"seen:{profile_id}:ready"
+
+    def _positions(self, item: int) -> List[int]:
+        """Bit positions for an item using double hashing over one blake2b digest"""
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size_bits for i in range(self.hash_count)]
+
+    def add(self, profile_id: int, seen_ids: Iterable[int]) -> bool:
+        """
+        Record that profile_id has interacted with seen_ids. If that fails the filter
+        is marked as not built, so the next read rebuilds it instead of missing the ids.
+        """
+        try:
+            pipe = self.redis_client.client.pipeline(transaction=False)
+            for seen_id in seen_ids:
+                for position in self._positions(seen_id):
+                    pipe.setbit(self._key(profile_id), position, 1)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error adding to seen filter of profile {profile_id}: {e}")
+            self.invalidate(profile_id)
+            return False
+
+    def invalidate(self, profile_id: int) -> bool:
+        """Mark the filter as not built so that it is rebuilt before the next use"""
+        try:
+            self.redis_client.client.delete(self._ready_key(profile_id))
+            return True
+        except Exception as e:
+            logger.error(f"Error invalidating seen filter of profile {profile_id}: {e}")
+            return False
+
+    def is_built(self, profile_id: int) -> bool:
+        try:
+            return bool(self.redis_client.client.exists(self._ready_key(profile_id)))
+        except Exception as e:
+            logger.error(f"Error checking seen filter of profile {profile_id}: {e}")
+            return False
+
+    def might_contain(self, profile_id: int, candidate_ids: List[int]) -> Optional[Set[int]]:
+        """Return the candidates that may have been seen, or None if the filter is unavailable"""
+        if not candidate_ids:
+            return set()
+        try:
+            pipe = self.redis_client.client.pipeline(transaction=False)
+            for candidate_id in candidate_ids:
+                for position in self._positions(candidate_id):
+                    pipe.getbit(self._key(profile_id), position)
+            bits = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error reading seen filter of profile {profile_id}: {e}")
+            return None
+
+        hits = set()
+        for index, candidate_id in enumerate(candidate_ids):
+            if all(bits[index * self.hash_count:(index + 1) * self.hash_count]):
+                hits.add(candidate_id)
+        return hits
+
+    def rebuild(self, profile_id: int, seen_ids: Iterable[int], batch_size: int = 1000) -> bool:
+        """Replace the filter with the given ids and mark it as built"""
+        try:
+            client = self.redis_client.client
+            temp_key = f"{self._key(profile_id)}:rebuild"
+            client.delete(temp_key)
+
+            pipe = client.pipeline(transaction=False)
+            pending = 0
+            for seen_id in seen_ids:
+                for position in self._positions(seen_id):
+                    pipe.setbit(temp_key, position, 1)
+                pending += 1
+                if pending >= batch_size:
+                    pipe.execute()
+                    pending = 0
+            pipe.execute()
+
+            pipe = client.pipeline(transaction=True)
+            if client.exists(temp_key):
+                pipe.rename(temp_key, self._key(profile_id))
+            else:
+                pipe.delete(self._key(profile_id))
+            pipe.set(self._ready_key(profile_id), 1)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error rebuilding seen filter of profile {profile_id}: {e}")
+            return False
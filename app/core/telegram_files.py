@@ -0,0 +1,28 @@
+import json
+import logging
+from urllib.parse import quote, urlencode
+from urllib.request import urlopen
+from . import config
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramFileError(Exception):
+    pass
+
+
+def download_telegram_file(file_id: str) -> bytes:
+    """Download a file sent to the bot through the Bot API getFile endpoint"""
+    base_url = f"{config.TELEGRAM_API_URL}/bot{config.TELEGRAM_TOKEN}"
+    with urlopen(f"{base_url}/getFile?{urlencode({'file_id': file_id})}",
+                 timeout=config.TELEGRAM_FILE_TIMEOUT) as response:
+        payload = json.load(response)
+    if not payload.get("ok"):
+        raise TelegramFileError(payload.get("description", f"getFile failed for {file_id}"))
+
+    file_path = payload["result"]["file_path"]
+    with urlopen(f"{config.TELEGRAM_API_URL}/file/bot{config.TELEGRAM_TOKEN}/{quote(file_path)}",
+                 timeout=config.TELEGRAM_FILE_TIMEOUT) as response:
+        data = response.read()
+    logger.debug(f"Downloaded Telegram file {file_id}: {len(data)} bytes")
+    return data
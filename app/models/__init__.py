@@ -1,4 +1,4 @@
-from .database import Base, engine, Session
+from .database import Base, get_engine, Session
 from .user import User
-from .profile import Profile, Photo, Rating
-from .interaction import Interaction, Match, Message
\ No newline at end of file
+from .profile import Profile, Photo, Rating, ProfileStats
+from .interaction import Interaction, Match, Message, MatchInbox, InteractionRollup, SeenProfile
\ No newline at end of file
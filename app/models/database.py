@@ -1,8 +1,250 @@
-from sqlalchemy import create_engine
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession as AsyncOrmSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
+from sqlalchemy.orm import Session as OrmSession, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from app.core import config
+from app.core.config import DATABASE_URL, DATABASE_REPLICA_URLS
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Checkout wait time and timeouts of the process's connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_checkout(self, waited: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        if waited * 1000 >= config.DB_POOL_SLOW_CHECKOUT_MS:
+            logger.warning(f"Waited {waited * 1000:.0f} ms for a database connection")
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+        logger.error("Timed out waiting for a database connection")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.max_overflow = max_overflow
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+
+class MeteredAsyncQueuePool(MeteredQueuePool, AsyncAdaptedQueuePool):
+    """MeteredQueuePool for asyncio engines"""
+
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(database_url: str) -> URL:
+    """The same database addressed through its asyncio driver"""
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def engine_options(role: str, database_url: str = DATABASE_URL, is_async: bool = False) -> Dict[str, Any]:
+    """create_engine keyword arguments for the pool profile of a process role"""
+    if not database_url.startswith("postgresql"):
+        return {}
+
+    profile = config.DB_POOL_PROFILES.get(role, config.DB_POOL_PROFILES["bot"])
+    statement_timeout = profile["statement_timeout_ms"]
+    return {
+        "poolclass": MeteredAsyncQueuePool if is_async else MeteredQueuePool,
+        "pool_size": profile["pool_size"],
+        "max_overflow": profile["max_overflow"],
+        "pool_timeout": profile["pool_timeout"],
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "connect_args": {"server_settings": {"statement_timeout": str(statement_timeout)}} if is_async
+        else {"options": f"-c statement_timeout={statement_timeout}"},
+    }
+
+
+def build_engine(role: str, database_url: str = DATABASE_URL) -> Engine:
+    sync_role = config.DB_SYNC_POOL_ROLES.get(role, role)
+    return create_engine(database_url, **engine_options(sync_role, database_url))
+
+
+def build_async_engine(role: str, database_url: str = DATABASE_URL) -> AsyncEngine:
+    return create_async_engine(async_database_url(database_url), **engine_options(role, database_url, is_async=True))
+
+
+def configure_engine(role: str, database_url: str = DATABASE_URL,
+                     replica_urls: Sequence[str] = DATABASE_REPLICA_URLS) -> Engine:
+    """
+    Rebind Session to fresh primary and replica engines using the pool profile
+    of the given role. Called by each process entrypoint, and after a Celery
+    worker forks so the child never reuses connections opened by the parent.
+    """
+    global engine, replica_engines, async_engine, async_replica_engines, process_role
+    for old_engine in [engine, *replica_engines]:
+        old_engine.dispose(close=False)
+    for old_engine in [async_engine, *async_replica_engines]:
+        old_engine.sync_engine.dispose(close=False)
+    process_role = role
+    engine = build_engine(role, database_url)
+    replica_engines = [build_engine(role, url) for url in replica_urls]
+    Session.configure(bind=engine, replicas=replica_engines)
+    async_engine = build_async_engine(role, database_url)
+    async_replica_engines = [build_async_engine(role, url) for url in replica_urls]
+    AsyncSession.configure(bind=async_engine, replicas=[e.sync_engine for e in async_replica_engines])
+    pool_metrics.reset()
+    logger.info(f"Database engine configured for {role} process with {len(replica_engines)} replicas")
+    return engine
+
+
+class RoutingSession(OrmSession):
+    """
+    Session that sends reads inside read_replica() to one of the replicas.
+    Everything else goes to the primary, and so does every read once the
+    session has pending changes or has written anything, so a session always
+    sees its own writes.
+    """
+
+    def __init__(self, replicas: Sequence[Engine] = (), **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = list(replicas)
+        self.replica = None
+        self.read_only_depth = 0
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.wrote = True
+        elif self.read_only_depth and self.replicas and not self.wrote \
+                and not (self.new or self.dirty or self.deleted):
+            if self.replica is None:
+                # One replica per session so consecutive reads see the same snapshot
+                self.replica = random.choice(self.replicas)
+            return self.replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+@contextmanager
+def read_replica(session: OrmSession):
+    """Route the reads made inside the block to a replica when the session allows it"""
+    if isinstance(session, AsyncOrmSession):
+        session = session.sync_session
+    if not isinstance(session, RoutingSession):
+        yield session
+        return
+
+    session.read_only_depth += 1
+    try:
+        yield session
+    finally:
+        session.read_only_depth -= 1
+
+
+@contextmanager
+def read_primary(session: OrmSession):
+    """Keep the block on the primary even inside read_replica(), for read-your-writes checks"""
+    if isinstance(session, AsyncOrmSession):
+        session = session.sync_session
+    if not isinstance(session, RoutingSession):
+        yield session
+        return
+
+    depth, session.read_only_depth = session.read_only_depth, 0
+    try:
+        yield session
+    finally:
+        session.read_only_depth = depth
+
+
+def read_only(method):
+    """Run a service method whose session argument only reads inside read_replica()"""
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        session = kwargs.get("session")
+        if session is None:
+            session = next((arg for arg in args if isinstance(arg, OrmSession)), None)
+        if session is None:
+            return method(*args, **kwargs)
+        with read_replica(session):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+def get_engine() -> Engine:
+    """The primary engine currently configured for this process"""
+    return engine
+
+
+def pool_status(bound_engine: Optional[Engine] = None) -> Dict[str, Any]:
+    """Pool size, connections in use and checkout metrics"""
+    pool = (bound_engine or engine).pool
+    status = {"role": process_role, "replicas": len(replica_engines), **pool_metrics.snapshot()}
+    if isinstance(pool, MeteredQueuePool):
+        capacity = pool.size() + max(pool.max_overflow, 0)
+        status.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool.max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "utilization": pool.checkedout() / capacity if capacity else 0.0,
+        })
+    return status
+
 
 Base = declarative_base()
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
\ No newline at end of file
+process_role = config.PROCESS_ROLE
+engine = build_engine(process_role)
+replica_engines: List[Engine] = [build_engine(process_role, url) for url in DATABASE_REPLICA_URLS]
+Session = sessionmaker(bind=engine, class_=RoutingSession, replicas=replica_engines)
+
+# Same routing for asyncio code; objects stay loaded after commit since lazy loads cannot be awaited implicitly
+async_engine = build_async_engine(process_role)
+async_replica_engines: List[AsyncEngine] = [build_async_engine(process_role, url) for url in DATABASE_REPLICA_URLS]
+AsyncSession = async_sessionmaker(bind=async_engine, sync_session_class=RoutingSession, expire_on_commit=False,
+                                  replicas=[e.sync_engine for e in async_replica_engines])
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
 class Interaction(Base):
+    # On PostgreSQL the table is range-partitioned by month on created_at (see RetentionService)
     __tablename__ = "interactions"
+    __table_args__ = (
+        Index("ix_interactions_from_to_type", "from_profile_id", "to_profile_id", "type"),
+        Index("ix_interactions_to_type", "to_profile_id", "type"),
+    )
 
     id = Column(Integer, primary_key=True)
     from_profile_id = Column(Integer, ForeignKey("profiles.id"))
@@ -17,6 +22,10 @@ class Interaction(Base):
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        Index("ix_matches_profile_id_1", "profile_id_1"),
+        Index("ix_matches_profile_id_2", "profile_id_2"),
+    )
 
     id = Column(Integer, primary_key=True)
     profile_id_1 = Column(Integer, ForeignKey("profiles.id"))
@@ -30,7 +39,11 @@ class Match(Base):
     messages = relationship("Message", back_populates="match")
 
 class Message(Base):
+    # On PostgreSQL the table is range-partitioned by month on created_at (see RetentionService)
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_match_created", "match_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     match_id = Column(Integer, ForeignKey("matches.id"))
@@ -40,4 +53,46 @@ class Message(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     match = relationship("Match", back_populates="messages")
-    sender = relationship("Profile", foreign_keys=[sender_id])
\ No newline at end of file
+    sender = relationship("Profile", foreign_keys=[sender_id])
+
+class MatchInbox(Base):
+    __tablename__ = "match_inbox"
+    __table_args__ = (
+        UniqueConstraint("profile_id", "match_id", name="uq_match_inbox_profile_match"),
+        Index("ix_match_inbox_profile_status_activity", "profile_id", "status", "last_activity_at"),
+        Index("ix_match_inbox_match_id", "match_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    profile_id = Column(Integer, ForeignKey("profiles.id"), nullable=False)
+    match_id = Column(Integer, ForeignKey("matches.id"), nullable=False)
+    other_profile_id = Column(Integer, ForeignKey("profiles.id"), nullable=False)
+    status = Column(String(20), default="active")
+    last_message_snippet = Column(String(100))
+    last_message_sender_id = Column(Integer)
+    last_message_at = Column(DateTime)
+    last_activity_at = Column(DateTime, default=datetime.utcnow)
+    unread_count = Column(Integer, default=0, nullable=False)
+
+    match = relationship("Match")
+    other_profile = relationship("Profile", foreign_keys=[other_profile_id])
+
+class InteractionRollup(Base):
+    __tablename__ = "interaction_rollups"
+    __table_args__ = (
+        UniqueConstraint("profile_id", "period_start", name="uq_interaction_rollups_profile_period"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    profile_id = Column(Integer, ForeignKey("profiles.id"), nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    total_views = Column(Integer, default=0, nullable=False)
+    likes_received = Column(Integer, default=0, nullable=False)
+
+
+class SeenProfile(Base):
+    """Who a viewer has already been shown, kept after their raw skips are compacted away"""
+    __tablename__ = "seen_profiles"
+
+    viewer_profile_id = Column(Integer, ForeignKey("profiles.id"), primary_key=True)
+    profile_id = Column(Integer, ForeignKey("profiles.id"), primary_key=True)
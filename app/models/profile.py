@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, JSON, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -26,16 +26,30 @@ class Profile(Base):
     user = relationship("User", back_populates="profile")
     photos = relationship("Photo", back_populates="profile")
     rating = relationship("Rating", back_populates="profile", uselist=False)
+    stats = relationship("ProfileStats", back_populates="profile", uselist=False)
     sent_interactions = relationship("Interaction", foreign_keys="Interaction.from_profile_id", back_populates="from_profile")
     received_interactions = relationship("Interaction", foreign_keys="Interaction.to_profile_id", back_populates="to_profile")
 
 class Photo(Base):
     __tablename__ = "photos"
+    __table_args__ = (
+        Index("ix_photos_profile_id", "profile_id"),
+        Index("ux_photos_profile_file_unique_id", "profile_id", "telegram_file_unique_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     profile_id = Column(Integer, ForeignKey("profiles.id"))
-    s3_path = Column(String(255), nullable=False)
+    # Normalized main image; empty until the ingestion task has uploaded the photo
+    s3_path = Column(String(255))
+    medium_s3_path = Column(String(255))
+    small_s3_path = Column(String(255))
+    width = Column(Integer)
+    height = Column(Integer)
     telegram_file_id = Column(String(255))
+    telegram_file_unique_id = Column(String(255))
+    # pending -> ready, or failed once the ingestion task runs out of retries
+    status = Column(String(20), nullable=False, default="ready", server_default="ready")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
     is_main = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -43,6 +57,9 @@ class Photo(Base):
 
 class Rating(Base):
     __tablename__ = "ratings"
+    __table_args__ = (
+        Index("ix_ratings_combined_rating_profile_id", "combined_rating", "profile_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     profile_id = Column(Integer, ForeignKey("profiles.id"), unique=True)
@@ -53,4 +70,17 @@ class Rating(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    profile = relationship("Profile", back_populates="rating")
\ No newline at end of file
+    profile = relationship("Profile", back_populates="rating")
+
+class ProfileStats(Base):
+    __tablename__ = "profile_stats"
+
+    id = Column(Integer, primary_key=True)
+    profile_id = Column(Integer, ForeignKey("profiles.id"), unique=True)
+    likes_received = Column(Integer, default=0, nullable=False)
+    total_views = Column(Integer, default=0, nullable=False)
+    matches_count = Column(Integer, default=0, nullable=False)
+    initiated_chats = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    profile = relationship("Profile", back_populates="stats")
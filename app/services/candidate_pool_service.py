@@ -0,0 +1,205 @@
+from sqlalchemy.orm import Session
+from app.models import *
+from app.core.redis_client import RedisClient
+from typing import Dict, List, Optional, Any, Iterable, Set, Callable
+from app.core import config
+import json
+import logging
+from functools import lru_cache
+from celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+ANY = "*"
+POOL_PREFIX = "pool"
+MEMBERSHIP_KEY = "pool:membership"
+READY_KEY = "pool:ready"
+
+
+class CandidatePoolService:
+    """
+    Redis sorted sets of profile ids scored by combined rating, one per
+    (gender, location, age) segment. Every profile is also indexed under the
+    wildcard segments, so viewers without a preference read a single set.
+    """
+
+    def __init__(self, redis_client: Optional[RedisClient] = None):
+        self.redis_client = redis_client or RedisClient()
+
+    @staticmethod
+    def segment_key(gender: Optional[str], location: Optional[str], age: Any) -> str:
+        return f"{POOL_PREFIX}:{gender or ANY}:{location or ANY}:{ANY if age is None else age}"
+
+    @staticmethod
+    def profile_segments(gender: Optional[str], location: Optional[str], age: Optional[int]) -> List[str]:
+        """All segment keys a profile with the given attributes belongs to"""
+        keys = []
+        for segment_gender in {gender or ANY, ANY}:
+            for segment_location in {location or ANY, ANY}:
+                for segment_age in {ANY if age is None else age, ANY}:
+                    keys.append(CandidatePoolService.segment_key(segment_gender, segment_location, segment_age))
+        return sorted(keys)
+
+    @staticmethod
+    def viewer_segments(viewer: Profile) -> List[str]:
+        """Segment keys whose union contains every profile matching the viewer's preferences"""
+        if viewer.preferred_age_min or viewer.preferred_age_max:
+            ages = range(viewer.preferred_age_min or config.CANDIDATE_POOL_MIN_AGE,
+                         (viewer.preferred_age_max or config.CANDIDATE_POOL_MAX_AGE) + 1)
+        else:
+            ages = [ANY]
+
+        return [CandidatePoolService.segment_key(viewer.preferred_gender, viewer.preferred_location, age)
+                for age in ages]
+
+    def index_profiles(self, entries: Iterable[Dict[str, Any]]) -> bool:
+        """Add or move profiles in the pools; entries carry id, gender, location, age and combined_rating"""
+        entries = list(entries)
+        if not entries:
+            return True
+        try:
+            client = self.redis_client.client
+            old_memberships = client.hmget(MEMBERSHIP_KEY, [entry["id"] for entry in entries])
+
+            pipe = client.pipeline(transaction=False)
+            for entry, old_membership in zip(entries, old_memberships):
+                new_keys = self.profile_segments(entry["gender"], entry["location"], entry["age"])
+                if old_membership:
+                    for key in set(json.loads(old_membership)) - set(new_keys):
+                        pipe.zrem(key, entry["id"])
+                for key in new_keys:
+                    pipe.zadd(key, {entry["id"]: entry["combined_rating"] or 0.0})
+                pipe.hset(MEMBERSHIP_KEY, entry["id"], json.dumps(new_keys))
+            pipe.execute()
+
+            logger.debug(f"Indexed {len(entries)} profiles in candidate pools")
+            return True
+        except Exception as e:
+            logger.error(f"Error indexing {len(entries)} profiles in candidate pools: {e}")
+            return False
+
+    def index_from_db(self, session: Session, profile_ids: List[int]) -> bool:
+        """Load current attributes and ratings of profiles and index them"""
+        if not profile_ids:
+            return True
+        rows = session.query(
+            Profile.id, Profile.gender, Profile.location, Profile.age, Rating.combined_rating
+        ).join(Rating, Profile.id == Rating.profile_id).filter(Profile.id.in_(profile_ids)).all()
+
+        return self.index_profiles({
+            "id": row.id,
+            "gender": row.gender,
+            "location": row.location,
+            "age": row.age,
+            "combined_rating": row.combined_rating
+        } for row in rows)
+
+    def remove_profile(self, profile_id: int) -> bool:
+        """Remove a profile from every pool it belongs to"""
+        try:
+            client = self.redis_client.client
+            membership = client.hget(MEMBERSHIP_KEY, profile_id)
+            pipe = client.pipeline(transaction=False)
+            for key in json.loads(membership) if membership else []:
+                pipe.zrem(key, profile_id)
+            pipe.hdel(MEMBERSHIP_KEY, profile_id)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error removing profile {profile_id} from candidate pools: {e}")
+            return False
+
+    def get_candidate_ids(self, viewer: Profile, limit: int,
+                          exclude: Callable[[List[int]], Set[int]]) -> Optional[List[int]]:
+        """
+        Best-rated profile ids matching the viewer's preferences, highest first.
+        exclude receives each scanned window of ids and returns the ones to skip.
+        Returns None when the pools are not built, Redis fails or CANDIDATE_POOL_MAX_SCAN
+        members were scanned without finding enough, so callers can fall back to SQL.
+        """
+        try:
+            client = self.redis_client.client
+            if not client.exists(READY_KEY):
+                return None
+
+            keys = self.viewer_segments(viewer)
+            if len(keys) == 1:
+                source_key = keys[0]
+            else:
+                source_key = f"{POOL_PREFIX}:deck:{viewer.id}"
+                pipe = client.pipeline(transaction=False)
+                pipe.zunionstore(source_key, keys, aggregate="MAX")
+                pipe.expire(source_key, config.CANDIDATE_POOL_UNION_TTL)
+                pipe.execute()
+
+            result = []
+            window = max(limit * 2, 20)
+            start = 0
+            while len(result) < limit:
+                if start >= config.CANDIDATE_POOL_MAX_SCAN:
+                    logger.debug(f"Candidate pool scan limit reached for profile {viewer.id}")
+                    return None
+                members = [int(member) for member in client.zrevrange(source_key, start, start + window - 1)]
+                if not members:
+                    break
+                excluded = exclude([member for member in members if member != viewer.id])
+                for profile_id in members:
+                    if profile_id != viewer.id and profile_id not in excluded:
+                        result.append(profile_id)
+                        if len(result) == limit:
+                            break
+                start += window
+
+            return result
+        except Exception as e:
+            logger.error(f"Error reading candidate pools for profile {viewer.id}: {e}")
+            return None
+
+    def rebuild(self, session: Session, chunk_size: int = config.RATING_BULK_CHUNK_SIZE) -> Dict[str, int]:
+        """Index every rated profile and mark the pools as ready"""
+        indexed_count = 0
+        last_id = 0
+        while True:
+            rows = session.query(
+                Profile.id, Profile.gender, Profile.location, Profile.age, Rating.combined_rating
+            ).join(Rating, Profile.id == Rating.profile_id).filter(
+                Profile.id > last_id
+            ).order_by(Profile.id).limit(chunk_size).all()
+            if not rows:
+                break
+
+            last_id = rows[-1].id
+            if not self.index_profiles({
+                "id": row.id,
+                "gender": row.gender,
+                "location": row.location,
+                "age": row.age,
+                "combined_rating": row.combined_rating
+            } for row in rows):
+                return {"indexed_count": indexed_count, "error": "indexing failed"}
+            indexed_count += len(rows)
+
+        self.redis_client.client.set(READY_KEY, 1)
+        return {"indexed_count": indexed_count}
+
+
+@lru_cache(maxsize=None)
+def get_candidate_pool_service() -> CandidatePoolService:
+    """Process-wide CandidatePoolService, created on first use"""
+    return CandidatePoolService()
+
+
+@celery_app.task
+def rebuild_candidate_pools():
+    """Periodic task to rebuild candidate pools from profiles and ratings"""
+    logger.info("Starting rebuild of candidate pools")
+    session = Session()
+    try:
+        result = get_candidate_pool_service().rebuild(session)
+        logger.info(f"Rebuilt candidate pools with {result['indexed_count']} profiles")
+        return result
+    except Exception as e:
+        logger.error(f"Error rebuilding candidate pools: {e}")
+        return {"error": str(e)}
+    finally:
+        session.close()
@@ -0,0 +1,62 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import case
+from app.models import *
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_LENGTH = 100
+
+
+class InboxService:
+    """
+    Per-profile projection of matches for the match list. Every method works
+    inside the caller's transaction, next to the match or message change it reflects.
+    """
+
+    @staticmethod
+    def add_match(session: Session, match: Match) -> None:
+        """Create the inbox rows of both participants for a flushed match"""
+        participants = [(match.profile_id_1, match.profile_id_2)]
+        if match.profile_id_1 != match.profile_id_2:
+            participants.append((match.profile_id_2, match.profile_id_1))
+
+        for profile_id, other_profile_id in participants:
+            session.add(MatchInbox(
+                profile_id=profile_id,
+                match_id=match.id,
+                other_profile_id=other_profile_id,
+                status=match.status or "active",
+                last_activity_at=match.created_at,
+                unread_count=0
+            ))
+
+    @staticmethod
+    def record_message(session: Session, message: Message) -> None:
+        """Move the match to the top of both inboxes and count the message as unread for the recipient"""
+        session.query(MatchInbox).filter(MatchInbox.match_id == message.match_id).update({
+            MatchInbox.last_message_snippet: (message.content or "")[:SNIPPET_LENGTH],
+            MatchInbox.last_message_sender_id: message.sender_id,
+            MatchInbox.last_message_at: message.created_at,
+            MatchInbox.last_activity_at: message.created_at,
+            MatchInbox.unread_count: MatchInbox.unread_count + case(
+                (MatchInbox.profile_id != message.sender_id, 1), else_=0
+            )
+        }, synchronize_session=False)
+
+    @staticmethod
+    def mark_read(session: Session, profile_id: int, match_id: int) -> None:
+        session.query(MatchInbox).filter(
+            MatchInbox.profile_id == profile_id,
+            MatchInbox.match_id == match_id
+        ).update({MatchInbox.unread_count: 0}, synchronize_session=False)
+
+    @staticmethod
+    def set_status(session: Session, match_ids: List[int], status: str) -> int:
+        """Mirror a match status change, e.g. archiving, into the inbox rows"""
+        if not match_ids:
+            return 0
+        return session.query(MatchInbox).filter(
+            MatchInbox.match_id.in_(match_ids)
+        ).update({MatchInbox.status: status}, synchronize_session=False)
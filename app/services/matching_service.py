@@ -1,9 +1,20 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, tuple_, update
 from app.models import *
+from app.models.database import read_only
 from app.core.redis_client import RedisClient
+from app.core.seen_filter import SeenFilter
 from app.services.rating_service import RatingService
-from typing import Dict, List, Optional, Any
+from app.services.stats_service import StatsService
+from app.services.inbox_service import InboxService
+from app.services.candidate_pool_service import CandidatePoolService
+from app.services.profile_service import ProfileService
+from typing import Dict, List, Optional, Any, Callable, Set, Tuple
+import base64
+import json
 import logging
+from functools import cached_property, lru_cache
 from datetime import datetime
 from celery_app import celery_app
 from app.core import config
@@ -12,10 +23,35 @@ logger = logging.getLogger(__name__)
 
 
 class MatchingService:
-    def __init__(self):
-        self.redis_client = RedisClient()
+    # Helpers built on the Redis client once and rebuilt only when the client is replaced
+    _HELPERS = ("seen_filter", "candidate_pool", "profile_service")
+
+    def __init__(self, redis_client: Optional[RedisClient] = None):
+        self.redis_client = redis_client or RedisClient()
         logger.info("Matching service initialized")
 
+    @property
+    def redis_client(self) -> RedisClient:
+        return self._redis_client
+
+    @redis_client.setter
+    def redis_client(self, redis_client: RedisClient):
+        self._redis_client = redis_client
+        for name in self._HELPERS:
+            self.__dict__.pop(name, None)
+
+    @cached_property
+    def seen_filter(self) -> SeenFilter:
+        return SeenFilter(self.redis_client)
+
+    @cached_property
+    def candidate_pool(self) -> CandidatePoolService:
+        return CandidatePoolService(self.redis_client)
+
+    @cached_property
+    def profile_service(self) -> ProfileService:
+        return ProfileService(self.redis_client)
+
     def like_profile(self, session: Session, from_profile_id: int, to_profile_id: int) -> Dict[str, Any]:
         """Record a like interaction and check for a match"""
         try:
@@ -25,6 +61,7 @@ class MatchingService:
                 type="like"
             )
             session.add(interaction)
+            StatsService.increment(session, to_profile_id, total_views=1, likes_received=1)
 
             mutual_like = session.query(Interaction).filter_by(
                 from_profile_id=to_profile_id,
@@ -42,25 +79,28 @@ class MatchingService:
                     status="active"
                 )
                 session.add(match)
+                session.flush()
+                InboxService.add_match(session, match)
+                StatsService.increment(session, from_profile_id, matches_count=1)
+                StatsService.increment(session, to_profile_id, matches_count=1)
                 session.commit()
+                self.seen_filter.add(from_profile_id, [to_profile_id])
 
                 is_match = True
                 match_id = match.id
 
-                RatingService.update_profile_rating(session, from_profile_id)
-                RatingService.update_profile_rating(session, to_profile_id)
+                RatingService.schedule_rating_refresh(session, self.redis_client, [from_profile_id, to_profile_id])
 
-                from_user_id = session.query(Profile.user_id).filter_by(id=from_profile_id).scalar()
-                to_user_id = session.query(Profile.user_id).filter_by(id=to_profile_id).scalar()
-
-                if from_user_id:
-                    self.redis_client.delete_profile_list(from_user_id)
-                if to_user_id:
-                    self.redis_client.delete_profile_list(to_user_id)
+                user_ids = [row[0] for row in session.query(Profile.user_id).filter(
+                    Profile.id.in_([from_profile_id, to_profile_id])
+                )]
+                self.redis_client.invalidate(user_ids=user_ids)
 
                 logger.info(f"Created match between profiles {from_profile_id} and {to_profile_id}")
             else:
                 session.commit()
+                self.seen_filter.add(from_profile_id, [to_profile_id])
+                RatingService.schedule_rating_refresh(session, self.redis_client, [to_profile_id])
                 logger.debug(f"Profile {from_profile_id} liked profile {to_profile_id}")
 
             return {
@@ -85,7 +125,10 @@ class MatchingService:
                 type="skip"
             )
             session.add(interaction)
+            StatsService.increment(session, to_profile_id, total_views=1)
             session.commit()
+            self.seen_filter.add(from_profile_id, [to_profile_id])
+            RatingService.schedule_rating_refresh(session, self.redis_client, [to_profile_id])
 
             logger.debug(f"Profile {from_profile_id} skipped profile {to_profile_id}")
             return {"success": True}
@@ -94,50 +137,240 @@ class MatchingService:
             logger.error(f"Error processing skip from {from_profile_id} to {to_profile_id}: {e}")
             return {"success": False, "error": str(e)}
 
+    def mark_chat_initiated(self, session: Session, match_id: int) -> bool:
+        """Mark that a dialog was started for a match"""
+        try:
+            match = session.query(Match).filter_by(id=match_id).first()
+            if not match or match.initiated_chat:
+                return False
+
+            match.initiated_chat = True
+            StatsService.increment(session, match.profile_id_1, initiated_chats=1)
+            StatsService.increment(session, match.profile_id_2, initiated_chats=1)
+            session.commit()
+            RatingService.schedule_rating_refresh(
+                session, self.redis_client, [match.profile_id_1, match.profile_id_2]
+            )
+
+            logger.info(f"Chat initiated for match {match_id}")
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error marking chat as initiated for match {match_id}: {e}")
+            return False
+
+    @staticmethod
+    def encode_match_cursor(last_activity_at: datetime, match_id: int) -> str:
+        """Opaque cursor for the position after a (last_activity_at, match_id) inbox row"""
+        payload = json.dumps([last_activity_at.isoformat(), match_id]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    @staticmethod
+    def decode_match_cursor(cursor: str) -> Tuple[datetime, int]:
+        """Parse a cursor produced by encode_match_cursor; raises ValueError if it is malformed"""
+        try:
+            last_activity_at, match_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(last_activity_at), int(match_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @read_only
+    def count_matches(self, session: Session, profile_id: int) -> int:
+        return session.query(func.count(MatchInbox.id)).filter(
+            MatchInbox.profile_id == profile_id,
+            MatchInbox.status == "active"
+        ).scalar() or 0
+
+    @read_only
+    def get_matches_page(self, session: Session, profile_id: int, limit: Optional[int] = None,
+                         cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get active matches by latest activity from the profile's inbox, with the
+        other profile, its username and main photo, in one query regardless of the number of matches.
+        """
+        main_photo_id = session.query(Photo.id).filter(
+            Photo.profile_id == Profile.id
+        ).order_by(desc(Photo.is_main), Photo.id).limit(1).correlate(Profile).scalar_subquery()
+
+        # The other participant's row tells whether they have read a message this profile sent
+        other_inbox = aliased(MatchInbox)
+        query = session.query(MatchInbox, Match, Profile, User.username, Photo, other_inbox.unread_count).join(
+            Match, Match.id == MatchInbox.match_id
+        ).outerjoin(
+            other_inbox, (other_inbox.match_id == MatchInbox.match_id)
+            & (other_inbox.profile_id == MatchInbox.other_profile_id)
+        ).join(
+            Profile, Profile.id == MatchInbox.other_profile_id
+        ).outerjoin(
+            User, User.id == Profile.user_id
+        ).outerjoin(
+            Photo, Photo.id == main_photo_id
+        ).filter(
+            MatchInbox.profile_id == profile_id,
+            MatchInbox.status == "active"
+        )
+
+        if cursor:
+            query = query.filter(
+                tuple_(MatchInbox.last_activity_at, MatchInbox.match_id) < self.decode_match_cursor(cursor)
+            )
+        query = query.order_by(desc(MatchInbox.last_activity_at), desc(MatchInbox.match_id))
+        if limit:
+            query = query.limit(limit)
+        rows = query.all()
+
+        result = []
+        for inbox, match, other_profile, username, main_photo, other_unread_count in rows:
+            recipient_unread_count = other_unread_count if inbox.last_message_sender_id == profile_id \
+                else inbox.unread_count
+            result.append({
+                "match_id": match.id,
+                "created_at": match.created_at.isoformat(),
+                "other_profile": {
+                    "id": other_profile.id,
+                    "name": other_profile.name,
+                    "age": other_profile.age,
+                    "location": other_profile.location,
+                    "username": username
+                },
+                "main_photo": {
+                    "telegram_file_id": main_photo.telegram_file_id,
+                    "s3_path": main_photo.s3_path
+                } if main_photo else None,
+                "initiated_chat": match.initiated_chat,
+                "unread_count": inbox.unread_count,
+                "last_message": {
+                    "content": inbox.last_message_snippet,
+                    "sender_id": inbox.last_message_sender_id,
+                    "created_at": inbox.last_message_at.isoformat(),
+                    "is_read": not recipient_unread_count
+                } if inbox.last_message_at else None
+            })
+
+        next_cursor = None
+        if limit and len(rows) == limit:
+            last_inbox = rows[-1][0]
+            next_cursor = self.encode_match_cursor(last_inbox.last_activity_at, last_inbox.match_id)
+
+        return {"matches": result, "next_cursor": next_cursor}
+
+    def send_message(self, session: Session, match_id: int, sender_profile_id: int, content: str) -> Dict[str, Any]:
+        """Store a message in an active match and update both inboxes"""
+        try:
+            match = session.query(Match).filter_by(id=match_id, status="active").first()
+            if not match or sender_profile_id not in (match.profile_id_1, match.profile_id_2):
+                return {"success": False, "error": "Match not found"}
+
+            message = Message(match_id=match_id, sender_id=sender_profile_id, content=content)
+            session.add(message)
+            session.flush()
+            InboxService.record_message(session, message)
+            session.commit()
+
+            logger.debug(f"Profile {sender_profile_id} sent message {message.id} in match {match_id}")
+            return {"success": True, "message_id": message.id, "created_at": message.created_at}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error sending message in match {match_id}: {e}")
+            return {"success": False, "error": str(e)}
+
+    def mark_messages_read(self, session: Session, match_id: int, profile_id: int) -> bool:
+        """Mark messages received by the profile in a match as read"""
+        try:
+            session.query(Message).filter(
+                Message.match_id == match_id,
+                Message.sender_id != profile_id,
+                Message.read == False
+            ).update({Message.read: True}, synchronize_session=False)
+            InboxService.mark_read(session, profile_id, match_id)
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error marking messages read in match {match_id} for profile {profile_id}: {e}")
+            return False
+
+    @read_only
     def get_matches(self, session: Session, profile_id: int) -> List[Dict[str, Any]]:
         """Get all matches for a profile"""
         try:
-            matches = session.query(Match).filter(
-                ((Match.profile_id_1 == profile_id) | (Match.profile_id_2 == profile_id)),
-                Match.status == "active"
-            ).all()
-
-            result = []
-            for match in matches:
-                other_profile_id = match.profile_id_2 if match.profile_id_1 == profile_id else match.profile_id_1
-
-                other_profile = session.query(Profile).filter_by(id=other_profile_id).first()
-                if not other_profile:
-                    continue
-
-                last_message = session.query(Message).filter_by(match_id=match.id).order_by(
-                    Message.created_at.desc()
-                ).first()
-
-                match_info = {
-                    "match_id": match.id,
-                    "created_at": match.created_at.isoformat(),
-                    "other_profile": {
-                        "id": other_profile.id,
-                        "name": other_profile.name,
-                        "age": other_profile.age
-                    },
-                    "initiated_chat": match.initiated_chat,
-                    "last_message": {
-                        "content": last_message.content,
-                        "sender_id": last_message.sender_id,
-                        "created_at": last_message.created_at.isoformat(),
-                        "is_read": last_message.read
-                    } if last_message else None
-                }
-                result.append(match_info)
-
+            result = self.get_matches_page(session, profile_id)["matches"]
             logger.debug(f"Found {len(result)} matches for profile {profile_id}")
             return result
         except Exception as e:
             logger.error(f"Error getting matches for profile {profile_id}: {e}")
             return []
 
+    def archive_inactive_matches(self, session: Session, cutoff_date: datetime,
+                                 batch_size: int = config.MATCH_ARCHIVE_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Archive active matches created before cutoff_date without a started chat.
+        Works in id-ordered batches with one UPDATE and one commit each, so memory
+        and lock time stay bounded by batch_size however many matches qualify.
+        """
+        archived_count = 0
+        batches = 0
+        last_id = 0
+        while True:
+            match_ids = [row[0] for row in session.query(Match.id).filter(
+                Match.id > last_id,
+                Match.created_at < cutoff_date,
+                Match.status == "active",
+                Match.initiated_chat == False
+            ).order_by(Match.id).limit(batch_size).all()]
+            if not match_ids:
+                break
+            last_id = match_ids[-1]
+
+            try:
+                # Conditions are repeated so matches changed since the select are left alone,
+                # and only the inbox rows of matches this UPDATE archived follow
+                archived_ids = session.execute(update(Match).where(
+                    Match.id.in_(match_ids),
+                    Match.status == "active",
+                    Match.initiated_chat == False
+                ).values(status="archived").returning(Match.id).execution_options(
+                    synchronize_session=False
+                )).scalars().all()
+                InboxService.set_status(session, archived_ids, "archived")
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error archiving matches {match_ids[0]}..{match_ids[-1]}: {e}")
+                continue
+
+            archived_count += len(archived_ids)
+            batches += 1
+            logger.info(f"Archived batch {batches}: {len(archived_ids)} matches up to id {last_id}, "
+                        f"{archived_count} in total")
+
+        return {"archived_count": archived_count, "batches": batches}
+
+    def rebuild_seen_filter(self, session: Session, profile_id: int) -> bool:
+        """Rebuild a profile's seen filter from its interactions without loading them all into memory"""
+        seen_ids = (row[0] for row in session.query(Interaction.to_profile_id).filter(
+            Interaction.from_profile_id == profile_id
+        ).union_all(session.query(SeenProfile.profile_id).filter(
+            SeenProfile.viewer_profile_id == profile_id
+        )).yield_per(1000))
+        return self.seen_filter.rebuild(profile_id, seen_ids)
+
+    def seen_exclusion(self, session: Session, profile_id: int) -> Callable[[List[int]], Set[int]]:
+        """
+        Build the exclusion check for candidate windows: the seen filter
+        narrows a window to possible hits, which are then confirmed in the database.
+        """
+        if not self.seen_filter.is_built(profile_id):
+            self.rebuild_seen_filter(session, profile_id)
+
+        def exclude(candidate_ids: List[int]) -> Set[int]:
+            maybe_seen = self.seen_filter.might_contain(profile_id, candidate_ids)
+            if maybe_seen is None:
+                maybe_seen = candidate_ids
+            return RatingService.interacted_among(session, profile_id, list(maybe_seen))
+
+        return exclude
+
     def get_next_profiles(self, session: Session, user_id: int, limit: int = config.PROFILES_PRELOAD_COUNT) -> List[
         Dict[str, Any]]:
         """Get the next batch of profiles for a user to view"""
@@ -147,14 +380,11 @@ class MatchingService:
                 logger.error(f"Profile not found for user {user_id}")
                 return []
 
-            interacted_profiles = session.query(Interaction.to_profile_id).filter_by(
-                from_profile_id=profile.id
-            ).all()
-            interacted_profile_ids = [p[0] for p in interacted_profiles]
-
-            profiles = RatingService.get_ranked_profiles(session, profile.id, limit)
-
-            profiles = [p for p in profiles if p["id"] not in interacted_profile_ids]
+            profiles = RatingService.get_ranked_profiles(
+                session, profile.id, limit,
+                candidate_pool=self.candidate_pool,
+                exclude=self.seen_exclusion(session, profile.id)
+            )
 
             if profiles:
                 self.redis_client.set_profile_list(user_id, profiles)
@@ -165,18 +395,168 @@ class MatchingService:
             logger.error(f"Error getting next profiles for user {user_id}: {e}")
             return []
 
+    def refill_deck(self, session: Session, user_id: int, size: int = config.DECK_SIZE) -> List[int]:
+        """
+        Top up a user's swipe deck to size. Candidates come from the candidate pools,
+        with seen profiles excluded through the seen filter; when the pools cannot
+        answer, they are paged from SQL by the keyset cursor stored with the deck.
+        """
+        profile = session.query(Profile).join(User).filter(User.id == user_id).first()
+        if not profile:
+            logger.error(f"Profile not found for user {user_id}")
+            return []
+
+        queued_ids = self.redis_client.get_deck(user_id)
+        needed = size - len(queued_ids)
+        if needed <= 0:
+            return []
+
+        taken = set(queued_ids)
+        exclude_seen = self.seen_exclusion(session, profile.id)
+        profile_ids = self.candidate_pool.get_candidate_ids(
+            profile, needed,
+            lambda ids: taken.intersection(ids) | exclude_seen([i for i in ids if i not in taken])
+        )
+        if profile_ids is None:
+            profile_ids = self._refill_from_ranking(session, user_id, profile.id, needed, taken)
+
+        self.redis_client.push_deck(user_id, profile_ids)
+        if profile_ids:
+            # Cache the new cards in one batch so each one renders from a single GET
+            self.profile_service.get_profiles(session, profile_ids)
+
+        logger.debug(f"Refilled deck of user {user_id} with {len(profile_ids)} profiles")
+        return profile_ids
+
+    def _refill_from_ranking(self, session: Session, user_id: int, profile_id: int, needed: int,
+                             taken: Set[int]) -> List[int]:
+        """Page candidates after the deck cursor, wrapping to the top once the ranking is exhausted"""
+        profile_ids = []
+        last_profile = None
+        cursor = self.redis_client.get_deck_cursor(user_id)
+        wrapped = cursor is None
+        while len(profile_ids) < needed:
+            page = RatingService.get_ranked_page(session, profile_id, needed, cursor)
+            for candidate in page["profiles"]:
+                if candidate["id"] not in taken and len(profile_ids) < needed:
+                    taken.add(candidate["id"])
+                    profile_ids.append(candidate["id"])
+                    last_profile = candidate
+
+            cursor = page["next_cursor"]
+            if cursor is None:
+                if wrapped:
+                    break
+                wrapped = True
+
+        self.redis_client.set_deck_cursor(user_id, RatingService.encode_cursor(
+            last_profile["rating"]["combined"], last_profile["id"]
+        ) if last_profile else None)
+        return profile_ids
+
+    def schedule_deck_refill(self, user_id: int) -> bool:
+        """Queue a background refill of a user's deck unless one is already pending"""
+        if not self.redis_client.acquire_deck_refill_lock(user_id):
+            return False
+        try:
+            preload_profiles.delay(user_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error scheduling deck refill for user {user_id}: {e}")
+            self.redis_client.release_deck_refill_lock(user_id)
+            return False
+
+    def next_from_deck(self, session: Session, user_id: int) -> Optional[int]:
+        """
+        Pop the next profile to show from the user's deck.
+        The deck is refilled in the background below the low-water mark
+        and synchronously only when it is empty.
+        """
+        profile = session.query(Profile).join(User).filter(User.id == user_id).first()
+        if not profile:
+            logger.error(f"Profile not found for user {user_id}")
+            return None
+
+        refilled_ids = None
+        popped_ids = set()
+        while True:
+            profile_id, remaining = self.redis_client.pop_deck(user_id)
+            if profile_id is None:
+                if refilled_ids is not None:
+                    # Deck could not be stored, serve straight from what the refill left unchecked
+                    unchecked_ids = [refilled_id for refilled_id in refilled_ids if refilled_id not in popped_ids]
+                    seen_ids = RatingService.interacted_among(session, profile.id, unchecked_ids)
+                    return next((refilled_id for refilled_id in unchecked_ids if refilled_id not in seen_ids), None)
+                refilled_ids = self.refill_deck(session, user_id)
+                continue
+            popped_ids.add(profile_id)
+
+            if remaining < config.DECK_LOW_WATER:
+                self.schedule_deck_refill(user_id)
+
+            # Profiles queued before a swipe on another device may already be seen
+            if not RatingService.interacted_among(session, profile.id, [profile_id]):
+                return profile_id
+
+
+@lru_cache(maxsize=None)
+def get_matching_service() -> MatchingService:
+    """Process-wide MatchingService, created on first use"""
+    return MatchingService()
+
+
+class AsyncMatchingService:
+    """MatchingService methods that only touch the database, for asyncio callers"""
+
+    def __init__(self, matching_service: Optional[MatchingService] = None):
+        self.matching_service = matching_service or get_matching_service()
+
+    async def count_matches(self, session: AsyncSession, profile_id: int) -> int:
+        return await session.run_sync(self.matching_service.count_matches, profile_id)
+
+    async def get_matches_page(self, session: AsyncSession, profile_id: int, limit: Optional[int] = None,
+                               cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await session.run_sync(self.matching_service.get_matches_page, profile_id, limit, cursor)
+
+    async def get_matches(self, session: AsyncSession, profile_id: int) -> List[Dict[str, Any]]:
+        return await session.run_sync(self.matching_service.get_matches, profile_id)
+
+    async def send_message(self, session: AsyncSession, match_id: int, sender_profile_id: int,
+                           content: str) -> Dict[str, Any]:
+        return await session.run_sync(self.matching_service.send_message, match_id, sender_profile_id, content)
+
+    async def mark_messages_read(self, session: AsyncSession, match_id: int, profile_id: int) -> bool:
+        return await session.run_sync(self.matching_service.mark_messages_read, match_id, profile_id)
+
 
 @celery_app.task
 def preload_profiles(user_id: int):
-    """Preload profiles for a user into Redis cache"""
+    """Top up a user's swipe deck in Redis"""
     session = Session()
+    matching_service = get_matching_service()
     try:
-        matching_service = MatchingService()
-        profiles = matching_service.get_next_profiles(session, user_id)
-        logger.info(f"Preloaded {len(profiles)} profiles for user {user_id}")
-        return {"success": True, "count": len(profiles)}
+        profile_ids = matching_service.refill_deck(session, user_id)
+        logger.info(f"Preloaded {len(profile_ids)} profiles for user {user_id}")
+        return {"success": True, "count": len(profile_ids)}
     except Exception as e:
         logger.error(f"Error preloading profiles for user {user_id}: {e}")
         return {"success": False, "error": str(e)}
     finally:
-        session.close()
\ No newline at end of file
+        # Taken by schedule_deck_refill when it queued this task
+        matching_service.redis_client.release_deck_refill_lock(user_id)
+        session.close()
+
+
+@celery_app.task
+def rebuild_seen_filter(profile_id: int):
+    """Rebuild the seen filter of a profile from its interactions"""
+    session = Session()
+    try:
+        success = get_matching_service().rebuild_seen_filter(session, profile_id)
+        logger.info(f"Rebuilt seen filter for profile {profile_id}: {success}")
+        return {"success": success}
+    except Exception as e:
+        logger.error(f"Error rebuilding seen filter for profile {profile_id}: {e}")
+        return {"success": False, "error": str(e)}
+    finally:
+        session.close()
@@ -1,22 +1,48 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from app.models import *
-from app.core.s3_client import S3Client
+from app.core.executor import BlockingExecutor
+from app.core.s3_client import S3Client, get_s3_client
+from app.core.telegram_files import download_telegram_file
+from app.core.image_processing import ImageProcessingError, process_photo
 from app.core.redis_client import RedisClient
+from app.core.profile_cache import profile_cache
 from app.services.rating_service import RatingService
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
+from functools import lru_cache
 import logging
 from datetime import datetime
+from celery_app import celery_app
+from app.core import config
 
 logger = logging.getLogger(__name__)
 
 class ProfileService:
-    def __init__(self):
-        self.s3_client = S3Client()
-        self.redis_client = RedisClient()
+    def __init__(self, redis_client: Optional[RedisClient] = None, s3_client: Optional[S3Client] = None):
+        self.redis_client = redis_client or RedisClient()
+        self._s3_client = s3_client
         logger.info("Profile service initialized")
 
+    @property
+    def s3_client(self) -> S3Client:
+        if self._s3_client is None:
+            self._s3_client = get_s3_client()
+        return self._s3_client
+
+    @s3_client.setter
+    def s3_client(self, s3_client: S3Client):
+        self._s3_client = s3_client
+
     def create_profile(self, session: Session, user_id: int, profile_data: Dict[str, Any]) -> Optional[Profile]:
         """Create a new profile for a user"""
+        profile = self._insert_profile(session, user_id, profile_data)
+        if profile:
+            self._publish_new_profile(session, user_id, profile.id)
+        return profile
+
+    def _insert_profile(self, session: Session, user_id: int, profile_data: Dict[str, Any]) -> Optional[Profile]:
+        """The database part of create_profile: the profile with empty rating and counters rows"""
         try:
             gender = profile_data.get("gender", "")
             if gender == "Мужской":
@@ -45,10 +71,9 @@ class ProfileService:
 
             rating = Rating(profile_id=profile.id)
             session.add(rating)
+            session.add(ProfileStats(profile_id=profile.id))
             session.commit()
 
-            RatingService.update_profile_rating(session, profile.id)
-
             logger.info(f"Created profile for user {user_id}")
             return profile
         except Exception as e:
@@ -56,6 +81,11 @@ class ProfileService:
             logger.error(f"Error creating profile for user {user_id}: {e}")
             return None
 
+    def _publish_new_profile(self, session: Session, user_id: int, profile_id: int):
+        """Rate a new profile, add it to the candidate pools and drop the user's cached summary"""
+        RatingService.update_profile_rating(session, profile_id)
+        self._invalidate(session, user_id)
+
     def update_profile(self, session: Session, profile_id: int, profile_data: Dict[str, Any]) -> Optional[Profile]:
         """Update an existing profile"""
         try:
@@ -101,9 +131,9 @@ class ProfileService:
             profile.updated_at = datetime.utcnow()
             session.commit()
 
-            RatingService.update_profile_rating(session, profile.id)
+            RatingService.schedule_rating_refresh(session, self.redis_client, [profile.id])
 
-            self.redis_client.delete_profile_list(profile.user_id)
+            self._invalidate(session, profile.user_id, profile.id)
 
             logger.info(f"Updated profile {profile_id}")
             return profile
@@ -115,8 +145,8 @@ class ProfileService:
                   is_main: bool = False) -> Optional[str]:
         """Add a photo to a profile"""
         try:
-            s3_path = self.s3_client.upload_photo(photo_data)
-            if not s3_path:
+            stored = self._store_photo(photo_data)
+            if not stored:
                 return None
 
             profile = session.query(Profile).filter_by(id=profile_id).first()
@@ -130,9 +160,9 @@ class ProfileService:
 
             photo = Photo(
                 profile_id=profile_id,
-                s3_path=s3_path,
                 telegram_file_id=telegram_file_id,
-                is_main=is_main
+                is_main=is_main,
+                **stored
             )
             session.add(photo)
 
@@ -140,39 +170,208 @@ class ProfileService:
 
             session.commit()
 
-            RatingService.update_profile_rating(session, profile_id)
+            RatingService.schedule_rating_refresh(session, self.redis_client, [profile_id])
 
-            self.redis_client.delete_profile_list(profile.user_id)
+            self._invalidate(session, profile.user_id, profile.id)
 
             logger.info(f"Added photo for profile {profile_id}")
-            return s3_path
+            return stored["s3_path"]
         except Exception as e:
             session.rollback()
             logger.error(f"Error adding photo for profile {profile_id}: {e}")
             return None
 
-    def get_photos(self, session: Session, profile_id: int) -> List[Dict[str, Any]]:
-        """Get all photos for a profile with their telegram file IDs (if available)"""
+    def _store_photo(self, photo_data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Build the main, medium and small variants of an uploaded photo and store
+        them in S3; returns the Photo column values, or None if the upload failed.
+        Raises ImageProcessingError if the data is not an image.
+        """
+        variants = process_photo(photo_data)
+        paths = self.s3_client.upload_photo_variants(variants)
+        if not paths:
+            return None
+        return {
+            "s3_path": paths["main"],
+            "medium_s3_path": paths.get("medium"),
+            "small_s3_path": paths.get("small"),
+            "width": variants["main"]["width"],
+            "height": variants["main"]["height"]
+        }
+
+    def record_photo(self, session: Session, profile_id: int, telegram_file_id: str,
+                     telegram_file_unique_id: str, is_main: bool = False) -> Dict[str, Any]:
+        """
+        Store a photo sent through Telegram as pending and queue its upload to S3.
+        Sending the same file again (same file_unique_id) reuses the existing photo
+        and re-queues it unless it is already uploaded.
+        """
         try:
-            photos = session.query(Photo).filter_by(profile_id=profile_id).all()
-            result = []
+            profile = session.query(Profile).filter_by(id=profile_id).first()
+            if not profile:
+                logger.error(f"Profile {profile_id} not found when recording photo")
+                return {"success": False, "error": "Profile not found"}
 
-            for photo in photos:
-                photo_data = {
-                    "id": photo.id,
-                    "is_main": photo.is_main,
-                    "created_at": photo.created_at.isoformat()
-                }
+            photo = session.query(Photo).filter_by(
+                profile_id=profile_id, telegram_file_unique_id=telegram_file_unique_id
+            ).first()
+            created = photo is None
 
-                if photo.telegram_file_id:
-                    photo_data["telegram_file_id"] = photo.telegram_file_id
-                    photo_data["url"] = photo.telegram_file_id
-                else:
-                    url = self.s3_client.get_photo_url(photo.s3_path)
-                    if url:
-                        photo_data["url"] = url
+            if is_main and (created or not photo.is_main):
+                session.query(Photo).filter_by(profile_id=profile_id, is_main=True).update(
+                    {"is_main": False})
+            if created:
+                photo = Photo(
+                    profile_id=profile_id,
+                    telegram_file_id=telegram_file_id,
+                    telegram_file_unique_id=telegram_file_unique_id,
+                    status="pending",
+                    is_main=is_main
+                )
+                session.add(photo)
+            else:
+                photo.is_main = photo.is_main or is_main
+                if photo.status != "ready":
+                    photo.status = "pending"
+                    photo.attempts = 0
+
+            try:
+                session.commit()
+            except IntegrityError:
+                # The same file was recorded concurrently; use that photo
+                session.rollback()
+                photo = session.query(Photo).filter_by(
+                    profile_id=profile_id, telegram_file_unique_id=telegram_file_unique_id
+                ).one()
+                created = False
+
+            self._invalidate(session, profile.user_id, profile_id)
+            queued = photo.status == "pending" and self._queue_ingestion(photo.id)
+
+            logger.info(f"Recorded photo {photo.id} for profile {profile_id} ({photo.status})")
+            return {"success": True, "photo_id": photo.id, "status": photo.status,
+                    "created": created, "queued": queued}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error recording photo for profile {profile_id}: {e}")
+            return {"success": False, "error": str(e)}
 
-                result.append(photo_data)
+    def _queue_ingestion(self, photo_id: int) -> bool:
+        try:
+            ingest_photo.delay(photo_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error queueing ingestion of photo {photo_id}: {e}")
+            return False
+
+    def ingest_photo(self, session: Session, photo_id: int,
+                     download: Optional[Callable[[str], bytes]] = None) -> Dict[str, Any]:
+        """
+        Fetch a pending photo from Telegram, upload it to S3 and mark it ready.
+        Safe to run more than once: uploaded photos are skipped, and an upload
+        that loses a race with another run is deleted again.
+        """
+        try:
+            photo = session.query(Photo).filter_by(id=photo_id).first()
+            if not photo:
+                return {"success": False, "error": "Photo not found", "retryable": False}
+            if photo.status == "ready":
+                return {"success": True, "photo_id": photo_id, "s3_path": photo.s3_path, "skipped": True}
+
+            photo.attempts += 1
+            session.commit()
+
+            try:
+                stored = self._store_photo((download or download_telegram_file)(photo.telegram_file_id))
+            except ImageProcessingError as e:
+                self.mark_photo_failed(session, photo_id)
+                logger.error(f"Photo {photo_id} is not a usable image: {e}")
+                return {"success": False, "error": str(e), "retryable": False}
+            if not stored:
+                return {"success": False, "error": "Upload to S3 failed", "retryable": True}
+
+            updated = session.query(Photo).filter(
+                Photo.id == photo_id, Photo.status != "ready"
+            ).update({**stored, "status": "ready"}, synchronize_session=False)
+            if updated:
+                session.query(Profile).filter_by(id=photo.profile_id).update(
+                    {Profile.photo_count: Profile.photo_count + 1}, synchronize_session=False)
+            session.commit()
+
+            if not updated:
+                for key, value in stored.items():
+                    if key.endswith("s3_path"):
+                        self.s3_client.delete_photo(value)
+                return {"success": True, "photo_id": photo_id, "skipped": True}
+
+            profile = session.query(Profile).filter_by(id=photo.profile_id).first()
+            RatingService.schedule_rating_refresh(session, self.redis_client, [profile.id])
+            self._invalidate(session, profile.user_id, profile.id)
+
+            logger.info(f"Ingested photo {photo_id} for profile {profile.id}: {stored['s3_path']}")
+            return {"success": True, "photo_id": photo_id, "s3_path": stored["s3_path"]}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error ingesting photo {photo_id}: {e}")
+            return {"success": False, "error": str(e), "retryable": True}
+
+    def mark_photo_failed(self, session: Session, photo_id: int) -> bool:
+        """Give up on a photo after its ingestion retries are exhausted"""
+        try:
+            updated = session.query(Photo).filter(
+                Photo.id == photo_id, Photo.status != "ready"
+            ).update({Photo.status: "failed"}, synchronize_session=False)
+            session.commit()
+
+            if updated:
+                profile = session.query(Profile).join(Photo).filter(Photo.id == photo_id).first()
+                if profile:
+                    self._invalidate(session, profile.user_id, profile.id)
+            return bool(updated)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error marking photo {photo_id} as failed: {e}")
+            return False
+
+    def get_photo_status(self, session: Session, photo_id: int) -> Optional[Dict[str, Any]]:
+        """Ingestion state of a photo: pending, ready or failed"""
+        photo = session.query(Photo).filter_by(id=photo_id).first()
+        if not photo:
+            return None
+        return {
+            "photo_id": photo.id,
+            "profile_id": photo.profile_id,
+            "status": photo.status,
+            "attempts": photo.attempts,
+            "s3_path": photo.s3_path
+        }
+
+    def _invalidate(self, session: Session, user_id: int, profile_id: Optional[int] = None):
+        """
+        Drop the cached profile, the user's profile list and deck, and the
+        get_user_profile summary in one round trip once the change is committed
+        """
+        user = session.get(User, user_id)
+        telegram_ids = [user.telegram_id] if user else []
+        self.redis_client.invalidate(
+            profile_ids=[profile_id] if profile_id else [],
+            user_ids=[user_id],
+            telegram_ids=telegram_ids
+        )
+        for telegram_id in telegram_ids:
+            profile_cache.drop_local(telegram_id)
+
+    def photo_url(self, telegram_file_id: Optional[str], s3_path: Optional[str]) -> Optional[str]:
+        """Telegram file id if the photo was sent through Telegram, otherwise its S3 URL"""
+        if telegram_file_id:
+            return telegram_file_id
+        return self.s3_client.get_photo_url(s3_path) if s3_path else None
+
+    def get_photos(self, session: Session, profile_id: int) -> List[Dict[str, Any]]:
+        """Get all photos for a profile with their telegram file IDs (if available)"""
+        try:
+            photos = session.query(Photo).filter_by(profile_id=profile_id).all()
+            result = [self._photo_dict(photo) for photo in photos]
 
             logger.debug(f"Retrieved {len(result)} photos for profile {profile_id}")
             return result
@@ -180,23 +379,71 @@ class ProfileService:
             logger.error(f"Error getting photos for profile {profile_id}: {e}")
             return []
 
+    def _photo_dict(self, photo: Photo) -> Dict[str, Any]:
+        photo_data = {
+            "id": photo.id,
+            "is_main": photo.is_main,
+            "status": photo.status,
+            "created_at": photo.created_at.isoformat()
+        }
+
+        if photo.telegram_file_id:
+            photo_data["telegram_file_id"] = photo.telegram_file_id
+        url = self.photo_url(photo.telegram_file_id, photo.s3_path)
+        if url:
+            photo_data["url"] = url
+        if photo.s3_path:
+            photo_data["width"] = photo.width
+            photo_data["height"] = photo.height
+            photo_data["variants"] = {
+                name: self.s3_client.get_photo_url(path)
+                for name, path in (("main", photo.s3_path), ("medium", photo.medium_s3_path),
+                                   ("small", photo.small_s3_path))
+                if path
+            }
+        return photo_data
+
     def get_profile(self, session: Session, profile_id: int) -> Optional[Dict[str, Any]]:
         """Get a profile with its photos and rating"""
+        profile = self.get_profiles(session, [profile_id]).get(profile_id)
+        if profile is None:
+            logger.error(f"Profile {profile_id} not found")
+        return profile
+
+    def get_profiles(self, session: Session, profile_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get several profiles with their photos and ratings by id. Cached ones come
+        from one MGET; the rest are loaded with one query per table and cached
+        with one pipelined write. Missing profiles are left out.
+        """
         try:
-            cached_profile = self.redis_client.get_cached_profile(profile_id)
-            if cached_profile:
-                return cached_profile
-
-            profile = session.query(Profile).filter_by(id=profile_id).first()
-            if not profile:
-                logger.error(f"Profile {profile_id} not found")
-                return None
-
-            photos = self.get_photos(session, profile_id)
-
-            rating = session.query(Rating).filter_by(profile_id=profile_id).first()
-
-            result = {
+            result = self.redis_client.get_cached_profiles(profile_ids)
+            missing = [profile_id for profile_id in profile_ids if profile_id not in result]
+            if missing:
+                loaded = self._load_profiles(session, missing)
+                self.redis_client.cache_profiles(loaded)
+                result.update(loaded)
+
+            logger.debug(f"Retrieved {len(result)} profiles, {len(missing)} from the database")
+            return result
+        except Exception as e:
+            logger.error(f"Error getting profiles {profile_ids}: {e}")
+            return {}
+
+    def _load_profiles(self, session: Session, profile_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        profiles = session.query(Profile).filter(Profile.id.in_(profile_ids)).all()
+        ratings = {
+            rating.profile_id: rating
+            for rating in session.query(Rating).filter(Rating.profile_id.in_(profile_ids))
+        }
+        photos = {}
+        for photo in session.query(Photo).filter(Photo.profile_id.in_(profile_ids)).order_by(Photo.id):
+            photos.setdefault(photo.profile_id, []).append(self._photo_dict(photo))
+
+        result = {}
+        for profile in profiles:
+            rating = ratings.get(profile.id)
+            result[profile.id] = {
                 "id": profile.id,
                 "name": profile.name,
                 "age": profile.age,
@@ -210,7 +457,7 @@ class ProfileService:
                 "preferred_location": profile.preferred_location,
                 "profile_completeness": profile.profile_completeness,
                 "photo_count": profile.photo_count,
-                "photos": photos,
+                "photos": photos.get(profile.id, []),
                 "rating": {
                     "primary": rating.primary_rating if rating else 0.0,
                     "behavioral": rating.behavioral_rating if rating else 0.0,
@@ -219,14 +466,7 @@ class ProfileService:
                 "created_at": profile.created_at.isoformat(),
                 "updated_at": profile.updated_at.isoformat()
             }
-
-            self.redis_client.cache_profile(profile_id, result)
-
-            logger.debug(f"Retrieved profile {profile_id}")
-            return result
-        except Exception as e:
-            logger.error(f"Error getting profile {profile_id}: {e}")
-            return None
+        return result
 
     def _calculate_profile_completeness(self, profile_data: Dict[str, Any]) -> float:
         """Calculate profile completeness percentage"""
@@ -235,4 +475,52 @@ class ProfileService:
 
         filled = sum(1 for field in required_fields if profile_data.get(field))
 
-        return filled / len(required_fields)
\ No newline at end of file
+        return filled / len(required_fields)
+
+
+@lru_cache(maxsize=None)
+def get_profile_service() -> ProfileService:
+    """Process-wide ProfileService, created on first use"""
+    return ProfileService()
+
+
+class AsyncProfileService:
+    """
+    ProfileService for asyncio callers. Database work runs on the AsyncSession
+    via run_sync; steps that also call Redis go to the given BlockingExecutor.
+    """
+
+    def __init__(self, profile_service: Optional[ProfileService] = None):
+        self.profile_service = profile_service or get_profile_service()
+
+    async def create_profile(self, session: AsyncSession, executor: BlockingExecutor, user_id: int,
+                             profile_data: Dict[str, Any]) -> Optional[Profile]:
+        profile = await session.run_sync(self.profile_service._insert_profile, user_id, profile_data)
+        if profile:
+            await executor.run(self.profile_service._publish_new_profile, user_id, profile.id)
+        return profile
+
+    async def get_photos(self, session: AsyncSession, profile_id: int) -> List[Dict[str, Any]]:
+        return await session.run_sync(self.profile_service.get_photos, profile_id)
+
+    async def get_photo_status(self, session: AsyncSession, photo_id: int) -> Optional[Dict[str, Any]]:
+        return await session.run_sync(self.profile_service.get_photo_status, photo_id)
+
+
+@celery_app.task(bind=True, max_retries=config.PHOTO_INGEST_MAX_RETRIES)
+def ingest_photo(self, photo_id: int):
+    """Fetch a photo from Telegram, upload it to S3 and refresh the profile rating"""
+    session = Session()
+    try:
+        profile_service = get_profile_service()
+        result = profile_service.ingest_photo(session, photo_id)
+        if result["success"] or not result.get("retryable"):
+            return result
+        if self.request.retries >= self.max_retries:
+            profile_service.mark_photo_failed(session, photo_id)
+            logger.error(f"Giving up on photo {photo_id} after {self.request.retries + 1} attempts: "
+                         f"{result['error']}")
+            return result
+        raise self.retry(countdown=config.PHOTO_INGEST_RETRY_DELAY * 2 ** self.request.retries)
+    finally:
+        session.close()
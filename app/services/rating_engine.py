@@ -0,0 +1,107 @@
+import numpy as np
+from sqlalchemy.orm import Session
+from app.models import *
+from app.services.stats_service import StatsService
+from typing import Dict, List, Optional
+from app.core import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+INPUT_FIELDS = ("profile_completeness", "photo_count", "has_preferences",
+                "likes_received", "total_views", "matches_count", "initiated_chats")
+
+
+class RatingEngine:
+    """
+    Columnar version of the RatingService formulas.
+    Every operation mirrors the scalar code step by step, so results are bit-for-bit equal.
+    """
+
+    @staticmethod
+    def load_inputs(session: Session, profile_ids: Optional[List[int]] = None) -> Dict[str, np.ndarray]:
+        """Load rating inputs for the given profiles (or all profiles) into arrays ordered by profile id"""
+        query = session.query(
+            Profile.id,
+            Profile.profile_completeness,
+            Profile.photo_count,
+            Profile.preferred_age_min,
+            Profile.preferred_age_max,
+            Profile.preferred_gender
+        )
+        if profile_ids is not None:
+            query = query.filter(Profile.id.in_(profile_ids))
+        rows = query.order_by(Profile.id).all()
+
+        size = len(rows)
+        inputs = {
+            "profile_id": np.fromiter((row[0] for row in rows), dtype=np.int64, count=size),
+            "profile_completeness": np.fromiter((row[1] or 0.0 for row in rows), dtype=np.float64, count=size),
+            "photo_count": np.fromiter((row[2] or 0 for row in rows), dtype=np.int64, count=size),
+            "has_preferences": np.fromiter((bool(row[3] and row[4] and row[5]) for row in rows),
+                                           dtype=bool, count=size),
+            "likes_received": np.zeros(size, dtype=np.int64),
+            "total_views": np.zeros(size, dtype=np.int64),
+            "matches_count": np.zeros(size, dtype=np.int64),
+            "initiated_chats": np.zeros(size, dtype=np.int64)
+        }
+        if not size:
+            return inputs
+
+        interaction_rows, match_rows = StatsService.query_interaction_aggregates(session, profile_ids)
+        RatingEngine._scatter_add(inputs, interaction_rows, "total_views", "likes_received")
+        RatingEngine._scatter_add(inputs, match_rows, "matches_count", "initiated_chats")
+
+        return inputs
+
+    @staticmethod
+    def _scatter_add(inputs: Dict[str, np.ndarray], rows: list, first_field: str, second_field: str):
+        """Add grouped (profile_id, value, value) rows into the matching positions of two input arrays"""
+        if not rows:
+            return
+
+        values = np.array([(row[0], row[1] or 0, row[2] or 0) for row in rows], dtype=np.int64)
+        profile_ids = inputs["profile_id"]
+        positions = np.searchsorted(profile_ids, values[:, 0])
+        positions = np.minimum(positions, len(profile_ids) - 1)
+        known = profile_ids[positions] == values[:, 0]
+
+        np.add.at(inputs[first_field], positions[known], values[known, 1])
+        np.add.at(inputs[second_field], positions[known], values[known, 2])
+
+    @staticmethod
+    def compute(inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Compute primary, behavioral and combined ratings for all rows in one vectorized pass"""
+        completeness = np.asarray(inputs["profile_completeness"], dtype=np.float64)
+        photo_count = np.asarray(inputs["photo_count"], dtype=np.float64)
+        has_preferences = np.asarray(inputs["has_preferences"], dtype=bool)
+        likes = np.asarray(inputs["likes_received"], dtype=np.float64)
+        views = np.asarray(inputs["total_views"], dtype=np.float64)
+        matches = np.asarray(inputs["matches_count"], dtype=np.float64)
+        chats = np.asarray(inputs["initiated_chats"], dtype=np.float64)
+
+        completeness_score = completeness * 0.4
+        photo_score = np.minimum(photo_count / 3, 1.0) * 0.3
+        preferences_score = np.where(has_preferences, 0.3, 0.0)
+        primary = (completeness_score + photo_score + preferences_score) * 100
+
+        likes_score = np.minimum(likes / 100, 1.0) * 0.3
+        ratio_score = RatingEngine._safe_divide(likes, views) * 0.3
+        match_score = np.where(
+            likes > 0, np.minimum(RatingEngine._safe_divide(matches, likes), 0.5) / 0.5 * 0.2, 0.0
+        )
+        chat_score = RatingEngine._safe_divide(chats, matches) * 0.2
+        behavioral = (likes_score + ratio_score + match_score + chat_score) * 100
+
+        combined = primary * config.PRIMARY_RATING_WEIGHT + behavioral * config.BEHAVIORAL_RATING_WEIGHT
+
+        return {
+            "primary_rating": primary,
+            "behavioral_rating": behavioral,
+            "combined_rating": combined
+        }
+
+    @staticmethod
+    def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        """Element-wise division that yields 0.0 where the denominator is zero"""
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
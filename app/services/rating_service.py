@@ -1,15 +1,62 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, or_, tuple_
 from app.models import *
-from typing import List, Dict, Any
+from app.models.database import read_only, read_primary
+from typing import List, Dict, Any, Optional, Tuple, Callable, Set
 from app.core import config
+from app.core.redis_client import RedisClient
+from app.services.stats_service import StatsService
+from app.services.rating_engine import RatingEngine
+from app.services.candidate_pool_service import CandidatePoolService, get_candidate_pool_service
+from datetime import datetime
+import numpy as np
+import base64
+import json
 import logging
+import time
+from celery import chord, group
 from celery_app import celery_app
 
 logger = logging.getLogger(__name__)
 
 
 class RatingService:
+    @staticmethod
+    def primary_rating_from_inputs(profile_completeness: float, photo_count: int, has_preferences: bool) -> float:
+        """Primary rating formula applied to already loaded profile fields"""
+        completeness_score = profile_completeness * 0.4
+
+        photo_score = min(photo_count / 3, 1.0) * 0.3
+
+        preferences_score = 0.0
+        if has_preferences:
+            preferences_score = 0.3
+
+        return (completeness_score + photo_score + preferences_score) * 100
+
+    @staticmethod
+    def behavioral_rating_from_counts(likes_received: int, total_views: int, matches_count: int,
+                                      initiated_chats: int) -> float:
+        """Behavioral rating formula applied to already aggregated interaction counters"""
+        likes_score = min(likes_received / 100, 1.0) * 0.3
+
+        ratio_score = 0.0
+        if total_views > 0:
+            ratio = likes_received / total_views
+            ratio_score = ratio * 0.3
+
+        match_score = 0.0
+        if likes_received > 0:
+            match_ratio = min(matches_count / likes_received, 0.5) / 0.5
+            match_score = match_ratio * 0.2
+
+        chat_score = 0.0
+        if matches_count > 0:
+            chat_ratio = initiated_chats / matches_count
+            chat_score = chat_ratio * 0.2
+
+        return (likes_score + ratio_score + match_score + chat_score) * 100
+
     @staticmethod
     def calculate_primary_rating(session: Session, profile_id: int) -> float:
         """
@@ -25,15 +72,12 @@ class RatingService:
                 logger.error(f"Profile {profile_id} not found when calculating primary rating")
                 return 0.0
 
-            completeness_score = profile.profile_completeness * 0.4
-
-            photo_score = min(profile.photo_count / 3, 1.0) * 0.3
-
-            preferences_score = 0.0
-            if profile.preferred_age_min and profile.preferred_age_max and profile.preferred_gender:
-                preferences_score = 0.3
-
-            primary_rating = (completeness_score + photo_score + preferences_score) * 100
+            has_preferences = bool(
+                profile.preferred_age_min and profile.preferred_age_max and profile.preferred_gender
+            )
+            primary_rating = RatingService.primary_rating_from_inputs(
+                profile.profile_completeness, profile.photo_count, has_preferences
+            )
 
             logger.debug(f"Calculated primary rating for profile {profile_id}: {primary_rating}")
             return primary_rating
@@ -54,42 +98,12 @@ class RatingService:
         2) Включает временные параметры (активность в определенное время суток)
         """
         try:
-            total_views = session.query(func.count(Interaction.id)).filter(
-                Interaction.to_profile_id == profile_id
-            ).scalar() or 0
+            counters = StatsService.get_counters(session, profile_id)
 
-            likes_received = session.query(func.count(Interaction.id)).filter(
-                Interaction.to_profile_id == profile_id,
-                Interaction.type == "like"
-            ).scalar() or 0
-
-            likes_score = min(likes_received / 100, 1.0) * 0.3
-
-            ratio_score = 0.0
-            if total_views > 0:
-                ratio = likes_received / total_views
-                ratio_score = ratio * 0.3
-
-            matches_count = session.query(func.count(Match.id)).filter(
-                ((Match.profile_id_1 == profile_id) | (Match.profile_id_2 == profile_id))
-            ).scalar() or 0
-
-            match_score = 0.0
-            if likes_received > 0:
-                match_ratio = min(matches_count / likes_received, 0.5) / 0.5
-                match_score = match_ratio * 0.2
-
-            initiated_chats = session.query(func.count(Match.id)).filter(
-                ((Match.profile_id_1 == profile_id) | (Match.profile_id_2 == profile_id)),
-                Match.initiated_chat == True
-            ).scalar() or 0
-
-            chat_score = 0.0
-            if matches_count > 0:
-                chat_ratio = initiated_chats / matches_count
-                chat_score = chat_ratio * 0.2
-
-            behavioral_rating = (likes_score + ratio_score + match_score + chat_score) * 100
+            behavioral_rating = RatingService.behavioral_rating_from_counts(
+                counters["likes_received"], counters["total_views"],
+                counters["matches_count"], counters["initiated_chats"]
+            )
 
             logger.debug(f"Calculated behavioral rating for profile {profile_id}: {behavioral_rating}")
             return behavioral_rating
@@ -131,6 +145,7 @@ class RatingService:
                 rating.combined_rating = combined_rating
 
             session.commit()
+            get_candidate_pool_service().index_from_db(session, [profile_id])
             logger.info(f"Updated rating for profile {profile_id}: {combined_rating}")
 
             return {
@@ -148,7 +163,260 @@ class RatingService:
             }
 
     @staticmethod
-    def get_ranked_profiles(session: Session, user_profile_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+    def _write_ratings(session: Session, profile_ids: np.ndarray, ratings: Dict[str, np.ndarray]) -> int:
+        """Persist computed ratings with one bulk UPDATE (and INSERT for missing rows), then commit"""
+        ids = profile_ids.tolist()
+        existing_ratings = dict(session.query(Rating.profile_id, Rating.id).filter(
+            Rating.profile_id.in_(ids)
+        ).all())
+
+        now = datetime.utcnow()
+        updates = []
+        inserts = []
+        for profile_id, primary_rating, behavioral_rating, combined_rating in zip(
+                ids,
+                ratings["primary_rating"].tolist(),
+                ratings["behavioral_rating"].tolist(),
+                ratings["combined_rating"].tolist()):
+            values = {
+                "primary_rating": primary_rating,
+                "behavioral_rating": behavioral_rating,
+                "combined_rating": combined_rating,
+                "last_calculated": now,
+                "updated_at": now
+            }
+
+            rating_id = existing_ratings.get(profile_id)
+            if rating_id:
+                updates.append({"id": rating_id, **values})
+            else:
+                inserts.append({"profile_id": profile_id, "created_at": now, **values})
+
+        if updates:
+            session.bulk_update_mappings(Rating, updates)
+        if inserts:
+            session.bulk_insert_mappings(Rating, inserts)
+        session.commit()
+
+        get_candidate_pool_service().index_from_db(session, ids)
+
+        return len(ids)
+
+    @staticmethod
+    def update_ratings_bulk(session: Session, profile_ids: Optional[List[int]] = None,
+                            chunk_size: int = config.RATING_BULK_CHUNK_SIZE) -> Dict[str, int]:
+        """
+        Recalculate ratings for the given profiles (or all profiles) with the vectorized engine.
+        Inputs are loaded column-wise in one pass, results are written back chunk by chunk;
+        ids of chunks whose write failed are returned in failed_ids.
+        """
+        if profile_ids is None:
+            batches = [None]
+        else:
+            batches = [profile_ids[start:start + chunk_size] for start in range(0, len(profile_ids), chunk_size)]
+
+        updated_count = 0
+        total = 0
+        failed_ids = []
+        for batch in batches:
+            inputs = RatingEngine.load_inputs(session, batch)
+            ratings = RatingEngine.compute(inputs)
+            total += len(batch) if batch is not None else len(inputs["profile_id"])
+
+            for start in range(0, len(inputs["profile_id"]), chunk_size):
+                chunk = slice(start, start + chunk_size)
+                try:
+                    updated_count += RatingService._write_ratings(
+                        session,
+                        inputs["profile_id"][chunk],
+                        {name: values[chunk] for name, values in ratings.items()}
+                    )
+                except Exception as e:
+                    session.rollback()
+                    failed_ids.extend(inputs["profile_id"][chunk].tolist())
+                    logger.error(f"Error writing ratings for chunk starting at profile "
+                                 f"{inputs['profile_id'][start]}: {e}")
+
+            logger.debug(f"Bulk rating update progress: {updated_count}/{total} profiles")
+
+        return {"updated_count": updated_count, "total": total, "failed_ids": failed_ids}
+
+    @staticmethod
+    def build_shard_ranges(min_id: int, max_id: int, shard_size: int) -> List[Tuple[int, int]]:
+        """Split the inclusive id range [min_id, max_id] into half-open [start, end) shards"""
+        return [(start, min(start + shard_size, max_id + 1)) for start in range(min_id, max_id + 1, shard_size)]
+
+    @staticmethod
+    def update_ratings_range(session: Session, start_id: int, end_id: int) -> Dict[str, int]:
+        """Recalculate ratings for profiles with start_id <= id < end_id"""
+        profile_ids = [row[0] for row in session.query(Profile.id).filter(
+            Profile.id >= start_id,
+            Profile.id < end_id
+        ).order_by(Profile.id).all()]
+
+        return RatingService.update_ratings_bulk(session, profile_ids)
+
+    @staticmethod
+    def schedule_rating_refresh(session: Session, redis_client: RedisClient, profile_ids: List[int]):
+        """Queue profiles for the dirty-set refresh, recalculating synchronously if Redis is unavailable"""
+        if redis_client.mark_profiles_dirty(profile_ids):
+            return
+
+        for profile_id in profile_ids:
+            RatingService.update_profile_rating(session, profile_id)
+
+    @staticmethod
+    def refresh_dirty_ratings(session: Session, redis_client: RedisClient,
+                              batch_size: int = config.RATING_DIRTY_BATCH_SIZE,
+                              max_batches: int = config.RATING_DIRTY_MAX_BATCHES) -> Dict[str, int]:
+        """Drain the dirty set in batches and recalculate only those profiles"""
+        refreshed_count = 0
+        batches = 0
+
+        while batches < max_batches:
+            profile_ids = redis_client.pop_dirty_profiles(batch_size)
+            if not profile_ids:
+                break
+
+            try:
+                result = RatingService.update_ratings_bulk(session, profile_ids)
+            except Exception as e:
+                session.rollback()
+                redis_client.mark_profiles_dirty(profile_ids)
+                logger.error(f"Error refreshing dirty ratings, returned {len(profile_ids)} profiles to the set: {e}")
+                break
+
+            refreshed_count += result["updated_count"]
+            batches += 1
+            if result["failed_ids"]:
+                # Leave them for the next run rather than popping the same failing ids again now
+                redis_client.mark_profiles_dirty(result["failed_ids"])
+                logger.error(f"Error writing ratings of {len(result['failed_ids'])} dirty profiles, "
+                             f"returned them to the set")
+                break
+
+        return {"refreshed_count": refreshed_count, "batches": batches}
+
+    @staticmethod
+    def interacted_among(session: Session, user_profile_id: int, candidate_ids: List[int]) -> Set[int]:
+        """Exact check which of the candidates the user has already interacted with"""
+        if not candidate_ids:
+            return set()
+        # Swipes just committed may not have reached a replica yet
+        with read_primary(session):
+            return {row[0] for row in session.query(Interaction.to_profile_id).filter(
+                Interaction.from_profile_id == user_profile_id,
+                Interaction.to_profile_id.in_(candidate_ids)
+            ).union_all(session.query(SeenProfile.profile_id).filter(
+                SeenProfile.viewer_profile_id == user_profile_id,
+                SeenProfile.profile_id.in_(candidate_ids)
+            )).all()}
+
+    @staticmethod
+    def _candidates_query(session: Session, user_profile: Profile):
+        """Profiles with ratings that match the user's preferences"""
+        return session.query(
+            Profile, Rating
+        ).join(
+            Rating, Profile.id == Rating.profile_id
+        ).filter(
+            Profile.gender == user_profile.preferred_gender if user_profile.preferred_gender else True,
+            Profile.age >= user_profile.preferred_age_min if user_profile.preferred_age_min else True,
+            Profile.age <= user_profile.preferred_age_max if user_profile.preferred_age_max else True,
+            Profile.location == user_profile.preferred_location if user_profile.preferred_location else True,
+            Profile.id != user_profile.id
+        )
+
+    @staticmethod
+    def _interacted_exists(session: Session, user_profile_id: int):
+        """Correlated EXISTS over the user's interactions, raw or compacted, with the outer Profile row"""
+        return or_(
+            session.query(Interaction.id).filter(
+                Interaction.from_profile_id == user_profile_id,
+                Interaction.to_profile_id == Profile.id
+            ).exists(),
+            session.query(SeenProfile.profile_id).filter(
+                SeenProfile.viewer_profile_id == user_profile_id,
+                SeenProfile.profile_id == Profile.id
+            ).exists()
+        )
+
+    @staticmethod
+    def _ranked_profile_dict(profile: Profile, rating: Rating) -> Dict[str, Any]:
+        return {
+            "id": profile.id,
+            "name": profile.name,
+            "age": profile.age,
+            "gender": profile.gender,
+            "bio": profile.bio,
+            "location": profile.location,
+            "interests": profile.interests,
+            "photo_count": profile.photo_count,
+            "rating": {
+                "primary": rating.primary_rating,
+                "behavioral": rating.behavioral_rating,
+                "combined": rating.combined_rating
+            }
+        }
+
+    @staticmethod
+    def encode_cursor(combined_rating: float, profile_id: int) -> str:
+        """Opaque cursor for the position after a (combined_rating, profile_id) row"""
+        payload = json.dumps([combined_rating, profile_id]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, int]:
+        """Parse a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+        try:
+            combined_rating, profile_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return float(combined_rating), int(profile_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @staticmethod
+    @read_only
+    def get_ranked_page(session: Session, user_profile_id: int, limit: int = 20,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of ranked profiles ordered by (combined_rating, profile_id) descending.
+        Pages continue strictly after the cursor, so the cost does not grow with how
+        deep the user has paged; pass the returned next_cursor to get the following page.
+        """
+        user_profile = session.query(Profile).filter_by(id=user_profile_id).first()
+        if not user_profile:
+            logger.error(f"Profile {user_profile_id} not found when getting ranked page")
+            return {"profiles": [], "next_cursor": None}
+
+        query = RatingService._candidates_query(session, user_profile).filter(
+            Rating.combined_rating.isnot(None),
+            ~RatingService._interacted_exists(session, user_profile_id)
+        )
+        if cursor:
+            query = query.filter(
+                tuple_(Rating.combined_rating, Rating.profile_id) < RatingService.decode_cursor(cursor)
+            )
+
+        rows = query.order_by(
+            desc(Rating.combined_rating), desc(Rating.profile_id)
+        ).limit(limit).all()
+
+        next_cursor = None
+        if len(rows) == limit:
+            last_rating = rows[-1][1]
+            next_cursor = RatingService.encode_cursor(last_rating.combined_rating, last_rating.profile_id)
+
+        return {
+            "profiles": [RatingService._ranked_profile_dict(profile, rating) for profile, rating in rows],
+            "next_cursor": next_cursor
+        }
+
+    @staticmethod
+    @read_only
+    def get_ranked_profiles(session: Session, user_profile_id: int, limit: int = 20,
+                            candidate_pool: Optional[CandidatePoolService] = None,
+                            use_pool: bool = True,
+                            exclude: Optional[Callable[[List[int]], Set[int]]] = None) -> List[Dict[str, Any]]:
         """Get ranked profiles for a user based on preferences and ratings"""
         try:
             user_profile = session.query(Profile).filter_by(id=user_profile_id).first()
@@ -156,44 +424,28 @@ class RatingService:
                 logger.error(f"Profile {user_profile_id} not found when getting ranked profiles")
                 return []
 
-            interacted_profiles = session.query(Interaction.to_profile_id).filter_by(
-                from_profile_id=user_profile_id
-            ).all()
-            interacted_profile_ids = [p[0] for p in interacted_profiles]
-
-            matching_profiles = session.query(
-                Profile, Rating
-            ).join(
-                Rating, Profile.id == Rating.profile_id
-            ).filter(
-                Profile.gender == user_profile.preferred_gender if user_profile.preferred_gender else True,
-                Profile.age >= user_profile.preferred_age_min if user_profile.preferred_age_min else True,
-                Profile.age <= user_profile.preferred_age_max if user_profile.preferred_age_max else True,
-                Profile.location == user_profile.preferred_location if user_profile.preferred_location else True,
-                Profile.id != user_profile_id,
-                ~Profile.id.in_(interacted_profile_ids) if interacted_profile_ids else True
-            ).order_by(
-                desc(Rating.combined_rating)
-            ).limit(limit).all()
-
-            result = []
-            for profile, rating in matching_profiles:
-                profile_dict = {
-                    "id": profile.id,
-                    "name": profile.name,
-                    "age": profile.age,
-                    "gender": profile.gender,
-                    "bio": profile.bio,
-                    "location": profile.location,
-                    "interests": profile.interests,
-                    "photo_count": profile.photo_count,
-                    "rating": {
-                        "primary": rating.primary_rating,
-                        "behavioral": rating.behavioral_rating,
-                        "combined": rating.combined_rating
-                    }
-                }
-                result.append(profile_dict)
+            candidates_query = RatingService._candidates_query(session, user_profile)
+
+            candidate_ids = None
+            if use_pool:
+                candidate_pool = candidate_pool or get_candidate_pool_service()
+                candidate_ids = candidate_pool.get_candidate_ids(
+                    user_profile, limit,
+                    exclude or (lambda ids: RatingService.interacted_among(session, user_profile_id, ids))
+                )
+
+            if candidate_ids is not None:
+                rows = candidates_query.filter(Profile.id.in_(candidate_ids)).all() if candidate_ids else []
+                positions = {profile_id: position for position, profile_id in enumerate(candidate_ids)}
+                matching_profiles = sorted(rows, key=lambda row: positions[row[0].id])
+            else:
+                matching_profiles = candidates_query.filter(
+                    ~RatingService._interacted_exists(session, user_profile_id)
+                ).order_by(
+                    desc(Rating.combined_rating)
+                ).limit(limit).all()
+
+            result = [RatingService._ranked_profile_dict(profile, rating) for profile, rating in matching_profiles]
 
             logger.debug(f"Found {len(result)} ranked profiles for user {user_profile_id}")
             return result
@@ -201,13 +453,115 @@ class RatingService:
             logger.error(f"Error getting ranked profiles for user {user_profile_id}: {e}")
             return []
 
+@celery_app.task
+def refresh_dirty_ratings():
+    """Frequent task to recalculate ratings of profiles changed since the last run"""
+    session = Session()
+    try:
+        result = RatingService.refresh_dirty_ratings(session, RedisClient())
+        if result["refreshed_count"]:
+            logger.info(f"Refreshed ratings for {result['refreshed_count']} dirty profiles "
+                        f"in {result['batches']} batches")
+        return result
+    except Exception as e:
+        logger.error(f"Error refreshing dirty ratings: {e}")
+        return {"error": str(e)}
+    finally:
+        session.close()
+
+
+@celery_app.task
+def update_ratings_shards(shard_ranges: List[List[int]]):
+    """Recalculate ratings for a lane of id-range shards, reporting per-shard counts and timings"""
+    session = Session()
+    results = []
+    try:
+        for start_id, end_id in shard_ranges:
+            started = time.perf_counter()
+            try:
+                result = RatingService.update_ratings_range(session, start_id, end_id)
+                # Only the count travels back through the chord
+                result["failed_count"] = len(result.pop("failed_ids"))
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error updating ratings for shard [{start_id}, {end_id}): {e}")
+                result = {"updated_count": 0, "total": 0, "failed_count": 0, "error": str(e)}
+
+            results.append({
+                "start_id": start_id,
+                "end_id": end_id,
+                "duration": time.perf_counter() - started,
+                **result
+            })
+        return results
+    finally:
+        session.close()
+
+
+@celery_app.task
+def collect_rating_shards(lane_results: List[List[Dict[str, Any]]], started_at: float):
+    """Chord callback aggregating per-shard results of a sharded rating update"""
+    shards = [shard for lane in lane_results for shard in lane]
+    durations = [shard["duration"] for shard in shards]
+
+    summary = {
+        "shards": len(shards),
+        "failed_shards": sum(1 for shard in shards if "error" in shard or shard.get("failed_count")),
+        "failed_count": sum(shard.get("failed_count", 0) for shard in shards),
+        "updated_count": sum(shard["updated_count"] for shard in shards),
+        "total": sum(shard["total"] for shard in shards),
+        "wall_clock": time.time() - started_at,
+        "shard_time_total": sum(durations),
+        "shard_time_max": max(durations) if durations else 0.0
+    }
+
+    logger.info(f"Completed sharded rating update: {summary['updated_count']}/{summary['total']} profiles "
+                f"in {summary['shards']} shards, wall clock {summary['wall_clock']:.1f}s, "
+                f"shard time {summary['shard_time_total']:.1f}s")
+    if summary["failed_shards"]:
+        logger.error(f"Sharded rating update failed for {summary['failed_count']} profiles "
+                     f"in {summary['failed_shards']} shards")
+    return summary
+
 
 @celery_app.task
-def update_all_ratings():
+def update_all_ratings_sharded(shard_size: int = config.RATING_SHARD_SIZE,
+                               concurrency: int = config.RATING_SHARD_CONCURRENCY):
+    """Fan the full rating update out to parallel lanes of id-range shards"""
+    session = Session()
+    try:
+        min_id, max_id = session.query(func.min(Profile.id), func.max(Profile.id)).one()
+        if min_id is None:
+            logger.info("No profiles to update ratings for")
+            return {"shards": 0, "lanes": 0}
+
+        shard_ranges = RatingService.build_shard_ranges(min_id, max_id, shard_size)
+        lane_count = max(1, min(concurrency, len(shard_ranges)))
+        lanes = [shard_ranges[lane::lane_count] for lane in range(lane_count)]
+
+        chord(group(update_ratings_shards.s(lane) for lane in lanes))(collect_rating_shards.s(time.time()))
+
+        logger.info(f"Dispatched {len(shard_ranges)} rating shards over {lane_count} lanes "
+                    f"for profile ids {min_id}..{max_id}")
+        return {"shards": len(shard_ranges), "lanes": lane_count}
+    except Exception as e:
+        logger.error(f"Error dispatching sharded rating update: {e}")
+        return {"error": str(e)}
+    finally:
+        session.close()
+
+
+@celery_app.task
+def update_all_ratings(bulk: bool = True):
     """Periodic task to update all profile ratings"""
-    logger.info("Starting batch update of all profile ratings")
+    logger.info(f"Starting batch update of all profile ratings (bulk={bulk})")
     session = Session()
     try:
+        if bulk:
+            result = RatingService.update_ratings_bulk(session)
+            logger.info(f"Completed bulk update of ratings for {result['updated_count']}/{result['total']} profiles")
+            return result
+
         profiles = session.query(Profile).all()
         updated_count = 0
 
@@ -224,4 +578,4 @@ def update_all_ratings():
         logger.error(f"Error in batch rating update: {e}")
         return {"error": str(e)}
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
@@ -0,0 +1,175 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, text
+from app.models import *
+from typing import Dict, List
+from app.core import config
+from datetime import datetime
+import logging
+from celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("interactions", "messages")
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    month_index = moment.year * 12 + moment.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+class RetentionService:
+    """
+    Monthly partitions of interactions and messages (PostgreSQL only) and
+    compaction of old raw interactions into per-profile monthly rollups.
+    Likes are never compacted: matching needs them to detect a like back.
+    Compacted skips leave a (viewer, profile) pair in seen_profiles so the
+    profile stays out of the viewer's deck.
+    """
+
+    @staticmethod
+    def is_partitioned(session: Session) -> bool:
+        return session.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def ensure_partitions(session: Session, months_ahead: int = config.PARTITION_MONTHS_AHEAD) -> List[str]:
+        """Create the partitions for the current and upcoming months if they are missing"""
+        if not RetentionService.is_partitioned(session):
+            return []
+
+        created = []
+        current = month_start(datetime.utcnow())
+        for table in PARTITIONED_TABLES:
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                name = partition_name(table, month)
+                try:
+                    session.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+                    ))
+                    session.commit()
+                    created.append(name)
+                except Exception as e:
+                    session.rollback()
+                    logger.error(f"Error creating partition {name}: {e}")
+        return created
+
+    @staticmethod
+    def rollup_interactions(session: Session,
+                            retention_months: int = config.INTERACTION_RETENTION_MONTHS) -> Dict[str, int]:
+        """
+        Fold raw skips older than the retention window into interaction_rollups
+        and remove them, one month per transaction so a month is never counted twice.
+        """
+        cutoff = add_months(month_start(datetime.utcnow()), -retention_months)
+        oldest = session.query(func.min(Interaction.created_at)).filter(
+            Interaction.created_at < cutoff,
+            Interaction.type != "like"
+        ).scalar()
+
+        compacted_count = 0
+        months = 0
+        month = month_start(oldest) if oldest else cutoff
+        while month < cutoff:
+            next_month = add_months(month, 1)
+            try:
+                compacted_count += RetentionService._compact_month(session, month, next_month)
+                session.commit()
+                months += 1
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error compacting interactions of {month:%Y-%m}: {e}")
+            month = next_month
+
+        return {"compacted_count": compacted_count, "months": months}
+
+    @staticmethod
+    def _compact_month(session: Session, month: datetime, next_month: datetime) -> int:
+        compacted = (Interaction.created_at >= month, Interaction.created_at < next_month,
+                     Interaction.type != "like")
+        rows = session.query(
+            Interaction.to_profile_id,
+            func.count(Interaction.id)
+        ).filter(
+            Interaction.to_profile_id.isnot(None), *compacted
+        ).group_by(Interaction.to_profile_id).all()
+        raw_count = session.query(func.count(Interaction.id)).filter(*compacted).scalar() or 0
+        if not raw_count:
+            return 0
+
+        existing = {rollup.profile_id: rollup for rollup in session.query(InteractionRollup).filter(
+            InteractionRollup.period_start == month
+        ).all()}
+        for profile_id, total_views in rows:
+            rollup = existing.get(profile_id)
+            if rollup:
+                rollup.total_views += total_views or 0
+            else:
+                session.add(InteractionRollup(profile_id=profile_id, period_start=month,
+                                              total_views=total_views or 0, likes_received=0))
+        session.flush()
+
+        # Keep who saw whom, so compacted skips still keep profiles out of the viewer's deck
+        seen_pairs = session.query(
+            Interaction.from_profile_id, Interaction.to_profile_id
+        ).filter(
+            Interaction.from_profile_id.isnot(None),
+            Interaction.to_profile_id.isnot(None),
+            *compacted,
+            ~session.query(SeenProfile.profile_id).filter(
+                SeenProfile.viewer_profile_id == Interaction.from_profile_id,
+                SeenProfile.profile_id == Interaction.to_profile_id
+            ).exists()
+        ).distinct()
+        session.execute(insert(SeenProfile).from_select(["viewer_profile_id", "profile_id"], seen_pairs))
+
+        name = partition_name("interactions", month)
+        if RetentionService.is_partitioned(session) and session.execute(
+                text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            # The month's likes move to the default partition before the rest is dropped
+            session.execute(text(f"ALTER TABLE interactions DETACH PARTITION {name}"))
+            session.execute(text(f"INSERT INTO interactions SELECT * FROM {name} WHERE type = 'like'"))
+            session.execute(text(f"DROP TABLE {name}"))
+        # Leftovers in the default partition, or the whole month on unpartitioned databases
+        session.query(Interaction).filter(*compacted).delete(synchronize_session=False)
+
+        logger.info(f"Compacted {raw_count} interactions of {month:%Y-%m} into {len(rows)} rollups")
+        return raw_count
+
+
+@celery_app.task
+def ensure_interaction_partitions():
+    """Periodic task to create upcoming monthly partitions"""
+    session = Session()
+    try:
+        created = RetentionService.ensure_partitions(session)
+        return {"partitions": created}
+    except Exception as e:
+        logger.error(f"Error ensuring partitions: {e}")
+        return {"error": str(e)}
+    finally:
+        session.close()
+
+
+@celery_app.task
+def compact_old_interactions():
+    """Periodic task to roll up interactions older than the retention window"""
+    logger.info("Starting compaction of old interactions")
+    session = Session()
+    try:
+        result = RetentionService.rollup_interactions(session)
+        logger.info(f"Compacted {result['compacted_count']} interactions over {result['months']} months")
+        return result
+    except Exception as e:
+        logger.error(f"Error compacting old interactions: {e}")
+        return {"error": str(e)}
+    finally:
+        session.close()
@@ -0,0 +1,188 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, true
+from app.models import *
+from typing import List, Dict, Optional, Tuple
+from app.core import config
+from datetime import datetime
+import logging
+from celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("likes_received", "total_views", "matches_count", "initiated_chats")
+
+
+class StatsService:
+    @staticmethod
+    def query_interaction_aggregates(session: Session, profile_ids: Optional[List[int]] = None) -> Tuple[
+        List[Tuple[int, int, int]], List[Tuple[int, int, int]]]:
+        """
+        Run the grouped aggregate queries for the given profiles (or all profiles).
+        Returns (profile_id, total_views, likes_received) rows and
+        (profile_id, matches_count, initiated_chats) rows; a profile may appear
+        twice in either list: raw interactions plus compacted rollups, and once
+        per side of the match. Reads the primary: every caller writes the
+        results back as counters or ratings.
+        """
+        interaction_query = session.query(
+            Interaction.to_profile_id,
+            func.count(Interaction.id),
+            func.sum(case((Interaction.type == "like", 1), else_=0))
+        )
+        if profile_ids is not None:
+            interaction_query = interaction_query.filter(Interaction.to_profile_id.in_(profile_ids))
+        interaction_rows = interaction_query.filter(
+            Interaction.to_profile_id.isnot(None)
+        ).group_by(Interaction.to_profile_id).all()
+
+        rollup_query = session.query(
+            InteractionRollup.profile_id,
+            func.sum(InteractionRollup.total_views),
+            func.sum(InteractionRollup.likes_received)
+        )
+        if profile_ids is not None:
+            rollup_query = rollup_query.filter(InteractionRollup.profile_id.in_(profile_ids))
+        interaction_rows.extend(rollup_query.group_by(InteractionRollup.profile_id).all())
+
+        match_rows = []
+        for match_column, extra_filter in ((Match.profile_id_1, true()),
+                                           (Match.profile_id_2, Match.profile_id_1 != Match.profile_id_2)):
+            match_query = session.query(
+                match_column,
+                func.count(Match.id),
+                func.sum(case((Match.initiated_chat == True, 1), else_=0))
+            )
+            if profile_ids is not None:
+                match_query = match_query.filter(match_column.in_(profile_ids))
+            match_rows.extend(match_query.filter(
+                match_column.isnot(None),
+                extra_filter
+            ).group_by(match_column).all())
+
+        return interaction_rows, match_rows
+
+    @staticmethod
+    def collect_interaction_aggregates(session: Session, profile_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        """Count views, likes, matches and initiated chats for many profiles with grouped queries"""
+        aggregates = {profile_id: {field: 0 for field in COUNTER_FIELDS} for profile_id in profile_ids}
+        if not profile_ids:
+            return aggregates
+
+        interaction_rows, match_rows = StatsService.query_interaction_aggregates(session, profile_ids)
+
+        for profile_id, total_views, likes_received in interaction_rows:
+            aggregates[profile_id]["total_views"] += total_views or 0
+            aggregates[profile_id]["likes_received"] += likes_received or 0
+
+        for profile_id, matches_count, initiated_chats in match_rows:
+            aggregates[profile_id]["matches_count"] += matches_count or 0
+            aggregates[profile_id]["initiated_chats"] += initiated_chats or 0
+
+        return aggregates
+
+    @staticmethod
+    def increment(session: Session, profile_id: int, **deltas: int) -> None:
+        """
+        Atomically add deltas to a profile's counters as part of the caller's transaction.
+        The underlying interaction/match change must already be added to the session:
+        a missing counters row is seeded from the raw tables, which then include it.
+        """
+        deltas = {field: value for field, value in deltas.items() if value}
+        unknown = set(deltas) - set(COUNTER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown profile counters: {', '.join(sorted(unknown))}")
+        if not deltas:
+            return
+
+        values = {getattr(ProfileStats, field): getattr(ProfileStats, field) + value
+                  for field, value in deltas.items()}
+        values[ProfileStats.updated_at] = datetime.utcnow()
+
+        updated = session.query(ProfileStats).filter_by(profile_id=profile_id).update(
+            values, synchronize_session=False
+        )
+        if not updated:
+            session.flush()
+            StatsService._seed_counters(session, profile_id)
+
+    @staticmethod
+    def get_counters(session: Session, profile_id: int) -> Dict[str, int]:
+        """Get a profile's behavioral counters, seeding them from the raw tables if missing"""
+        stats = session.query(ProfileStats).filter_by(profile_id=profile_id).first()
+        if not stats:
+            stats = StatsService._seed_counters(session, profile_id)
+
+        return {field: getattr(stats, field) or 0 for field in COUNTER_FIELDS}
+
+    @staticmethod
+    def _seed_counters(session: Session, profile_id: int) -> ProfileStats:
+        """Create the counters row for a profile from the raw interactions and matches"""
+        counts = StatsService.collect_interaction_aggregates(session, [profile_id])[profile_id]
+        stats = ProfileStats(profile_id=profile_id, **counts)
+        session.add(stats)
+        session.flush()
+        logger.debug(f"Seeded counters for profile {profile_id}: {counts}")
+        return stats
+
+    @staticmethod
+    def rebuild_counters(session: Session, profile_ids: Optional[List[int]] = None,
+                         chunk_size: int = config.RATING_BULK_CHUNK_SIZE) -> Dict[str, int]:
+        """Recompute counters from the raw tables and overwrite the stored values chunk by chunk"""
+        rebuilt_count = 0
+        last_id = 0
+        position = 0
+
+        while True:
+            if profile_ids is not None:
+                chunk = profile_ids[position:position + chunk_size]
+                position += chunk_size
+            else:
+                chunk = [row[0] for row in session.query(Profile.id).filter(
+                    Profile.id > last_id
+                ).order_by(Profile.id).limit(chunk_size).all()]
+            if not chunk:
+                break
+            last_id = chunk[-1]
+
+            try:
+                aggregates = StatsService.collect_interaction_aggregates(session, chunk)
+                existing = dict(session.query(ProfileStats.profile_id, ProfileStats.id).filter(
+                    ProfileStats.profile_id.in_(chunk)
+                ).all())
+
+                now = datetime.utcnow()
+                updates = []
+                inserts = []
+                for profile_id, counts in aggregates.items():
+                    if profile_id in existing:
+                        updates.append({"id": existing[profile_id], "updated_at": now, **counts})
+                    else:
+                        inserts.append({"profile_id": profile_id, "updated_at": now, **counts})
+
+                if updates:
+                    session.bulk_update_mappings(ProfileStats, updates)
+                if inserts:
+                    session.bulk_insert_mappings(ProfileStats, inserts)
+                session.commit()
+                rebuilt_count += len(chunk)
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Error rebuilding counters for chunk starting at profile {chunk[0]}: {e}")
+
+        return {"rebuilt_count": rebuilt_count}
+
+
+@celery_app.task
+def reconcile_profile_stats():
+    """Periodic task to rebuild behavioral counters from interactions and matches"""
+    logger.info("Starting reconciliation of profile counters")
+    session = Session()
+    try:
+        result = StatsService.rebuild_counters(session)
+        logger.info(f"Reconciled counters for {result['rebuilt_count']} profiles")
+        return result
+    except Exception as e:
+        logger.error(f"Error reconciling profile counters: {e}")
+        return {"error": str(e)}
+    finally:
+        session.close()
@@ -1,6 +1,9 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import *
+from app.core.profile_cache import profile_cache
 from typing import Optional, Dict, Any
+import asyncio
 import logging
 from datetime import datetime
 
@@ -37,7 +40,18 @@ class UserService:
 
     @staticmethod
     def get_user_profile(session: Session, telegram_id: int) -> Optional[Dict[str, Any]]:
-        """Get a user's profile data"""
+        """Get a user's profile data, from the profile summary cache when possible"""
+        cached, generation = profile_cache.lookup(telegram_id)
+        if cached is not None:
+            return cached
+
+        summary = UserService._load_user_profile(session, telegram_id)
+        if summary is not None:
+            profile_cache.set(telegram_id, summary, generation)
+        return summary
+
+    @staticmethod
+    def _load_user_profile(session: Session, telegram_id: int) -> Optional[Dict[str, Any]]:
         try:
             user = session.query(User).filter_by(telegram_id=telegram_id).first()
             if not user:
@@ -56,6 +70,7 @@ class UserService:
                 photo_data.append({
                     "id": photo.id,
                     "is_main": photo.is_main,
+                    "status": photo.status,
                     "created_at": photo.created_at.isoformat()
                 })
 
@@ -81,4 +96,33 @@ class UserService:
             }
         except Exception as e:
             logger.error(f"Error getting profile for user with Telegram ID {telegram_id}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+class AsyncUserService:
+    """
+    UserService for asyncio callers. The sync implementation runs on the
+    AsyncSession's connection via run_sync, so its queries await the driver
+    instead of blocking the event loop; Redis calls run on the loop's default executor.
+    """
+
+    @staticmethod
+    async def get_or_create_user(session: AsyncSession, telegram_id: int,
+                                 telegram_username: Optional[str] = None) -> User:
+        return await session.run_sync(UserService.get_or_create_user, telegram_id, telegram_username)
+
+    @staticmethod
+    async def get_user_profile(session: AsyncSession, telegram_id: int) -> Optional[Dict[str, Any]]:
+        cached = profile_cache.get_local(telegram_id)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        cached, generation = await loop.run_in_executor(None, profile_cache.get_shared, telegram_id)
+        if cached is not None:
+            return cached
+
+        summary = await session.run_sync(UserService._load_user_profile, telegram_id)
+        if summary is not None:
+            await loop.run_in_executor(None, profile_cache.set, telegram_id, summary, generation)
+        return summary
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Load test for the bot's blocking-call executor. Concurrent "updates" each run
+a slow query (SQLite with a sleep function standing in for a slow database),
+either directly on the event loop as handlers used to, or through
+BlockingExecutor. A heartbeat task measures how long the loop stalls.
+
+Usage:
+    python -m benchmarks.bench_bot_offload --updates 50 --query-ms 50 --workers 16
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from app.core.executor import BlockingExecutor
+from app.models import Base
+
+
+def slow_engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                           pool_size=32, max_overflow=0)
+
+    @event.listens_for(engine, "connect")
+    def _register_sleep(dbapi_connection, connection_record):
+        dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def slow_service_call(session, query_ms):
+    return session.execute(text("SELECT sleep_ms(:ms)"), {"ms": query_ms}).scalar()
+
+
+async def measure(handle_update, updates, interval=0.005):
+    lags = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    ticker = asyncio.create_task(heartbeat())
+    started = time.perf_counter()
+    await asyncio.gather(*(handle_update() for _ in range(updates)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+
+    lags.sort()
+    return {
+        "total_ms": elapsed * 1000,
+        "max_lag_ms": lags[-1] * 1000 if lags else elapsed * 1000,
+        "p95_lag_ms": lags[int(len(lags) * 0.95)] * 1000 if lags else elapsed * 1000,
+        "ticks": len(lags),
+    }
+
+
+async def run(args, engine):
+    session_factory = sessionmaker(bind=engine)
+
+    async def inline_update():
+        session = session_factory()
+        try:
+            slow_service_call(session, args.query_ms)
+        finally:
+            session.close()
+        await asyncio.sleep(0)
+
+    executor = BlockingExecutor(session_factory, max_workers=args.workers, max_queue=args.updates)
+
+    async def offloaded_update():
+        await executor.run(slow_service_call, args.query_ms)
+
+    results = {}
+    for label, handle_update in (("on loop", inline_update), ("executor", offloaded_update)):
+        results[label] = await measure(handle_update, args.updates)
+    stats = executor.stats()
+    executor.shutdown(wait=True)
+    return results, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--query-ms", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    fd, temp_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = slow_engine(temp_path)
+    try:
+        results, stats = asyncio.run(run(args, engine))
+    finally:
+        engine.dispose()
+        os.unlink(temp_path)
+
+    print(f"{args.updates} updates, {args.query_ms} ms per query, {args.workers} workers")
+    print(f"{'mode':>10} {'total ms':>10} {'max lag ms':>11} {'p95 lag ms':>11} {'ticks':>6}")
+    for label, result in results.items():
+        print(f"{label:>10} {result['total_ms']:>10.0f} {result['max_lag_ms']:>11.1f} "
+              f"{result['p95_lag_ms']:>11.1f} {result['ticks']:>6}")
+    print(f"executor max queue depth {stats['max_queue_depth']}, "
+          f"avg wait {stats['wait_avg_ms']:.1f} ms, max wait {stats['wait_max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
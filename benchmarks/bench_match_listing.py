@@ -0,0 +1,119 @@
+"""
+Compare round trips and latency of the match list before and after batching.
+The per-match variant reproduces the previous get_matches plus the per-match
+User and photo lookups show_matches did on top of it.
+
+Usage:
+    python -m benchmarks.bench_match_listing --matches 10 50 200 800
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, User, Profile, Photo, Match, Message
+from app.services.inbox_service import InboxService
+from app.services.matching_service import MatchingService
+
+
+def build_dataset(session, matches_count):
+    session.bulk_insert_mappings(User, [
+        {"id": i, "telegram_id": 1_000_000 + i, "username": f"user{i}"}
+        for i in range(1, matches_count + 2)
+    ])
+    session.bulk_insert_mappings(Profile, [
+        {"id": i, "user_id": i, "name": f"User {i}", "age": 20 + i % 30, "location": "Москва"}
+        for i in range(1, matches_count + 2)
+    ])
+    session.bulk_insert_mappings(Photo, [
+        {"profile_id": i, "s3_path": f"photos/{i}.jpg", "is_main": True}
+        for i in range(2, matches_count + 2)
+    ])
+    started = datetime(2024, 1, 1)
+    session.bulk_insert_mappings(Match, [
+        {"id": i, "profile_id_1": 1 if i % 2 else i + 1, "profile_id_2": i + 1 if i % 2 else 1,
+         "status": "active", "created_at": started + timedelta(minutes=i)}
+        for i in range(1, matches_count + 1)
+    ])
+    session.bulk_insert_mappings(Message, [
+        {"match_id": i, "sender_id": i + 1, "content": f"message {n}",
+         "created_at": started + timedelta(minutes=i, seconds=n)}
+        for i in range(1, matches_count + 1) for n in range(3)
+    ])
+    # get_matches reads the match_inbox projection, which the service keeps up to date on every write
+    for match in session.query(Match).order_by(Match.id):
+        InboxService.add_match(session, match)
+    session.flush()
+    for message in session.query(Message).order_by(Message.created_at):
+        InboxService.record_message(session, message)
+    session.commit()
+
+
+def list_matches_per_match(session, profile_id):
+    """The previous implementation: one query for matches, then lookups per match"""
+    matches = session.query(Match).filter(
+        ((Match.profile_id_1 == profile_id) | (Match.profile_id_2 == profile_id)),
+        Match.status == "active"
+    ).all()
+
+    result = []
+    for match in matches:
+        other_profile_id = match.profile_id_2 if match.profile_id_1 == profile_id else match.profile_id_1
+        other_profile = session.query(Profile).filter_by(id=other_profile_id).first()
+        last_message = session.query(Message).filter_by(match_id=match.id).order_by(
+            Message.created_at.desc()
+        ).first()
+        other_user = session.query(User).join(Profile).filter(Profile.id == other_profile_id).first()
+        photos = session.query(Photo).filter_by(profile_id=other_profile_id).all()
+        result.append((match.id, other_profile.name, last_message, other_user.username, photos))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, nargs="+", default=[10, 50, 200, 800])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'matches':>8} {'per-match stmts':>16} {'per-match ms':>13} {'batched stmts':>14} {'batched ms':>11}")
+    for matches_count in args.matches:
+        fd, temp_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{temp_path}")
+        Base.metadata.create_all(engine)
+        counter = {"statements": 0}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            counter["statements"] += 1
+
+        try:
+            session = sessionmaker(bind=engine)()
+            build_dataset(session, matches_count)
+            matching_service = MatchingService()
+
+            timings = {}
+            for label, list_matches in (
+                ("per-match", lambda: list_matches_per_match(session, 1)),
+                ("batched", lambda: matching_service.get_matches(session, 1))
+            ):
+                counter["statements"] = 0
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    session.expire_all()
+                    assert len(list_matches()) == matches_count
+                elapsed = (time.perf_counter() - started) / args.repeat
+                timings[label] = (counter["statements"] // args.repeat, elapsed * 1000)
+
+            print(f"{matches_count:>8} {timings['per-match'][0]:>16} {timings['per-match'][1]:>13.2f} "
+                  f"{timings['batched'][0]:>14} {timings['batched'][1]:>11.2f}")
+            session.close()
+        finally:
+            engine.dispose()
+            os.unlink(temp_path)
+
+
+if __name__ == "__main__":
+    main()
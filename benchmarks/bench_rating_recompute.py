@@ -0,0 +1,130 @@
+"""
+Compare per-profile and bulk rating recomputation on a synthetic dataset.
+
+Usage:
+    python -m benchmarks.bench_rating_recompute --profiles 2000 --interactions 40000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models import Base, User, Profile, Rating, Interaction, Match
+from app.services.rating_service import RatingService
+
+
+def build_dataset(session, profiles_count, interactions_count, matches_count, seed=42):
+    rng = random.Random(seed)
+
+    session.bulk_insert_mappings(User, [
+        {"id": i, "telegram_id": 1_000_000 + i, "username": f"user{i}"}
+        for i in range(1, profiles_count + 1)
+    ])
+    session.bulk_insert_mappings(Profile, [
+        {
+            "id": i,
+            "user_id": i,
+            "name": f"User {i}",
+            "age": rng.randint(18, 60),
+            "gender": rng.choice(["Мужской", "Женский"]),
+            "location": rng.choice(["Москва", "Казань", "Самара"]),
+            "preferred_age_min": 18,
+            "preferred_age_max": rng.choice([None, 45]),
+            "preferred_gender": rng.choice(["Мужской", "Женский"]),
+            "profile_completeness": rng.random(),
+            "photo_count": rng.randint(0, 5)
+        }
+        for i in range(1, profiles_count + 1)
+    ])
+    session.bulk_insert_mappings(Rating, [{"profile_id": i} for i in range(1, profiles_count + 1)])
+    session.bulk_insert_mappings(Interaction, [
+        {
+            "from_profile_id": rng.randint(1, profiles_count),
+            "to_profile_id": rng.randint(1, profiles_count),
+            "type": rng.choice(["like", "skip"])
+        }
+        for _ in range(interactions_count)
+    ])
+    session.bulk_insert_mappings(Match, [
+        {
+            "profile_id_1": rng.randint(1, profiles_count),
+            "profile_id_2": rng.randint(1, profiles_count),
+            "status": "active",
+            "initiated_chat": rng.random() < 0.3
+        }
+        for _ in range(matches_count)
+    ])
+    session.commit()
+
+
+def count_statements(engine):
+    counter = {"statements": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    return counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=2000)
+    parser.add_argument("--interactions", type=int, default=40000)
+    parser.add_argument("--matches", type=int, default=4000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--database-url", default=None,
+                        help="Database to run against (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    temp_path = None
+    database_url = args.database_url
+    if not database_url:
+        fd, temp_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite:///{temp_path}"
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    counter = count_statements(engine)
+
+    try:
+        session = Session()
+        build_dataset(session, args.profiles, args.interactions, args.matches)
+        profile_ids = [row[0] for row in session.query(Profile.id).order_by(Profile.id).all()]
+
+        counter["statements"] = 0
+        started = time.perf_counter()
+        for profile_id in profile_ids:
+            RatingService.update_profile_rating(session, profile_id)
+        per_profile_seconds = time.perf_counter() - started
+        per_profile_statements = counter["statements"]
+        expected = {r.profile_id: r.combined_rating for r in session.query(Rating).all()}
+
+        counter["statements"] = 0
+        started = time.perf_counter()
+        RatingService.update_ratings_bulk(session, chunk_size=args.chunk_size)
+        bulk_seconds = time.perf_counter() - started
+        bulk_statements = counter["statements"]
+        actual = {r.profile_id: r.combined_rating for r in session.query(Rating).all()}
+
+        mismatches = sum(1 for pid, value in expected.items() if actual[pid] != value)
+
+        print(f"profiles={args.profiles} interactions={args.interactions} matches={args.matches}")
+        print(f"per-profile: {per_profile_seconds:8.3f}s  {per_profile_statements:8d} statements")
+        print(f"bulk:        {bulk_seconds:8.3f}s  {bulk_statements:8d} statements")
+        print(f"speedup:     {per_profile_seconds / bulk_seconds:8.1f}x")
+        print(f"mismatched ratings: {mismatches}")
+        session.close()
+    finally:
+        engine.dispose()
+        if temp_path:
+            os.unlink(temp_path)
+
+
+if __name__ == "__main__":
+    main()
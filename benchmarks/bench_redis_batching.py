@@ -0,0 +1,92 @@
+"""
+Round trips and latency of per-key RedisClient calls against the batched ones:
+rendering a page of cached profiles (GET per id vs MGET), caching it (SET per
+id vs one pipeline) and invalidating after a match (DEL per user vs one DEL).
+Runs on fakeredis with a simulated network round trip unless --redis-url is given.
+
+Usage:
+    python -m benchmarks.bench_redis_batching --profiles 20 --rtt-ms 0.5
+    python -m benchmarks.bench_redis_batching --redis-url redis://localhost:6379/15
+"""
+import argparse
+import random
+import time
+import fakeredis
+import redis
+from app.core.redis_client import RedisClient
+from benchmarks.bench_redis_codec import build_profile
+
+
+def instrumented_client(redis_url, rtt):
+    client = RedisClient()
+    client.client = redis.Redis.from_url(redis_url) if redis_url else fakeredis.FakeRedis()
+    counter = {"round_trips": 0}
+    pool = client.client.connection_pool
+
+    class CountingConnection(pool.connection_class):
+        def send_packed_command(self, command, check_health=True):
+            counter["round_trips"] += 1
+            if rtt:
+                time.sleep(rtt)
+            return super().send_packed_command(command, check_health)
+
+    pool.connection_class = CountingConnection
+    pool.reset()
+    client.client.ping()
+    return client, counter
+
+
+def scenarios(client, profiles):
+    ids = list(profiles)
+    user_ids = [1, 2]
+
+    def per_key_set():
+        for profile_id, profile in profiles.items():
+            client.cache_profile(profile_id, profile)
+
+    def per_key_get():
+        return {profile_id: client.get_cached_profile(profile_id) for profile_id in ids}
+
+    def per_key_invalidate():
+        for user_id in user_ids:
+            client.client.delete(f"profiles:{user_id}", f"deck:{user_id}", f"deck:{user_id}:cursor")
+
+    yield "cache profiles", per_key_set, lambda: client.cache_profiles(profiles)
+    yield "get profiles", per_key_get, lambda: client.get_cached_profiles(ids)
+    yield "match invalidate", per_key_invalidate, lambda: client.invalidate(user_ids=user_ids)
+
+
+def measure(func, counter, repeat):
+    counter["round_trips"] = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - started
+    return counter["round_trips"] / repeat, elapsed / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated round trip added to every request")
+    parser.add_argument("--redis-url", help="use a real Redis instead of fakeredis; its keys are flushed")
+    args = parser.parse_args()
+
+    rtt = 0 if args.redis_url else args.rtt_ms / 1000
+    client, counter = instrumented_client(args.redis_url, rtt)
+    client.client.flushdb()
+    rng = random.Random(42)
+    profiles = {profile_id: build_profile(rng, profile_id) for profile_id in range(1, args.profiles + 1)}
+
+    print(f"{args.profiles} profiles, {'real Redis' if args.redis_url else f'fakeredis, {args.rtt_ms} ms RTT'}")
+    print(f"{'scenario':>18} {'mode':>8} {'round trips':>12} {'ms':>8}")
+    for label, per_key, batched in scenarios(client, profiles):
+        for mode, func in (("per key", per_key), ("batched", batched)):
+            round_trips, ms = measure(func, counter, args.repeat)
+            print(f"{label:>18} {mode:>8} {round_trips:>12.0f} {ms:>8.2f}")
+    client.client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Encode/decode time and payload size of cached values: the preloaded profile
+lists and single profiles RedisClient stores, under pickle and stdlib json
+(the previous formats) and every serializer/compression pair Codec supports.
+
+Usage:
+    python -m benchmarks.bench_redis_codec --lists 10,100 --repeat 200
+"""
+import argparse
+import json
+import pickle
+import random
+import time
+from app.core.codec import COMPRESSORS, SERIALIZERS, Codec
+
+INTERESTS = ["Путешествия", "Музыка", "Кино", "Спорт", "Книги", "Кулинария", "Фотография", "Танцы"]
+WORDS = "люблю путешествовать читать книги гулять в парке готовить пасту ходить в кино и на концерты".split()
+
+
+def build_profile(rng, profile_id):
+    return {
+        "id": profile_id,
+        "name": f"Пользователь {profile_id}",
+        "age": rng.randint(18, 60),
+        "gender": rng.choice(["Мужской", "Женский"]),
+        "bio": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))).capitalize(),
+        "location": rng.choice(["Москва", "Санкт-Петербург", "Казань", "Самара"]),
+        "interests": ", ".join(rng.sample(INTERESTS, rng.randint(1, 5))),
+        "photo_count": rng.randint(0, 5),
+        "rating": {
+            "primary": rng.random() * 10,
+            "behavioral": rng.random() * 10,
+            "combined": rng.random() * 10
+        }
+    }
+
+
+def timed(func, value, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(value)
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def measure(encode, decode, value, repeat):
+    encoded = encode(value)
+    assert decode(encoded) == value
+    return timed(encode, value, repeat), timed(decode, encoded, repeat), len(encoded)
+
+
+def formats(threshold):
+    yield "pickle", pickle.dumps, pickle.loads
+    yield "json (old)", lambda value: json.dumps(value).encode(), json.loads
+    for serializer in SERIALIZERS:
+        for compression in COMPRESSORS:
+            codec = Codec(serializer, compression, threshold)
+            yield f"{serializer}+{compression}", codec.encode, codec.decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lists", default="1,10,100", help="comma-separated profile list lengths")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for length in (int(value) for value in args.lists.split(",")):
+        profiles = [build_profile(rng, profile_id) for profile_id in range(1, length + 1)]
+        value = profiles[0] if length == 1 else profiles
+        print(f"\n{'single profile' if length == 1 else f'list of {length} profiles'}")
+        print(f"{'format':>16} {'encode us':>10} {'decode us':>10} {'bytes':>8}")
+        for label, encode, decode in formats(args.threshold):
+            encode_us, decode_us, size = measure(encode, decode, value, args.repeat)
+            print(f"{label:>16} {encode_us:>10.1f} {decode_us:>10.1f} {size:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Startup and per-request cost of the S3 client. A local HTTP server stands in
+for object storage, answering every request after --latency-ms and counting them.
+"eager" reproduces the previous behaviour: every handler built a ProfileService,
+whose S3Client created a boto3 client and called head_bucket. "lazy" is the
+current one: a shared service and client, and no S3 requests until an upload.
+
+Usage:
+    python -m benchmarks.bench_s3_client --requests 50 --latency-ms 5
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.core import config
+from app.core.s3_client import S3Client
+from app.services.profile_service import ProfileService, get_profile_service
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    counts = {}
+    latency = 0.0
+
+    def _respond(self):
+        FakeS3Handler.counts[self.command] = FakeS3Handler.counts.get(self.command, 0) + 1
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(FakeS3Handler.latency)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_HEAD = do_PUT = do_GET = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EagerS3Client(S3Client):
+    """S3Client as it was: boto3 client and bucket check in the constructor"""
+
+    def __init__(self):
+        super().__init__()
+        self.s3
+        self._ensure_bucket_exists()
+
+
+def render_profile(service, photos):
+    return [service.photo_url(None, f"photos/{index}.jpg") for index in range(photos)]
+
+
+def run(label, make_service, args):
+    FakeS3Handler.counts = {}
+    started = time.perf_counter()
+    service = make_service()
+    startup_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        render_profile(make_service(), args.photos)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    view_requests = sum(FakeS3Handler.counts.values())
+
+    for _ in range(args.uploads):
+        service.s3_client.upload_photo(b"\xff\xd8" + b"0" * 1024)
+
+    return {
+        "label": label,
+        "startup_ms": startup_ms,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+        "view_requests": view_requests,
+        "head_bucket": FakeS3Handler.counts.get("HEAD", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--photos", type=int, default=3)
+    parser.add_argument("--uploads", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    FakeS3Handler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeS3Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config.S3_ENDPOINT = f"127.0.0.1:{server.server_port}"
+    config.S3_SECURE = False
+
+    results = [
+        run("eager", lambda: ProfileService(s3_client=EagerS3Client()), args),
+        run("lazy", get_profile_service, args),
+    ]
+    server.shutdown()
+
+    print(f"{args.requests} profile views with {args.photos} S3 photos, then {args.uploads} uploads, "
+          f"{args.latency_ms} ms S3 latency")
+    print(f"{'mode':>6} {'startup ms':>11} {'view p50 ms':>12} {'view p95 ms':>12} "
+          f"{'S3 calls in views':>18} {'head_bucket':>12}")
+    for result in results:
+        print(f"{result['label']:>6} {result['startup_ms']:>11.2f} {result['p50_ms']:>12.3f} "
+              f"{result['p95_ms']:>12.3f} {result['view_requests']:>18} {result['head_bucket']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Compare ways of excluding already seen profiles for viewers with a long history:
+loading interacted ids into a NOT IN list, a NOT EXISTS anti-join, and
+candidate pools with the Redis seen filter.
+
+Usage:
+    python -m benchmarks.bench_seen_filter --profiles 20000 --history 10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import fakeredis
+import redis
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.redis_client import RedisClient
+from app.models import Base, User, Profile, Rating, Interaction
+from app.services.candidate_pool_service import CandidatePoolService
+from app.services.matching_service import MatchingService
+from app.services.rating_service import RatingService
+
+
+def build_dataset(session, profiles_count, viewers_count, history, seed=42):
+    rng = random.Random(seed)
+
+    session.bulk_insert_mappings(User, [
+        {"id": i, "telegram_id": 1_000_000 + i, "username": f"user{i}"}
+        for i in range(1, profiles_count + 1)
+    ])
+    session.bulk_insert_mappings(Profile, [
+        {
+            "id": i,
+            "user_id": i,
+            "name": f"User {i}",
+            "age": rng.randint(18, 60),
+            "gender": rng.choice(["Мужской", "Женский"]),
+            "location": rng.choice(["Москва", "Казань", "Самара"])
+        }
+        for i in range(1, profiles_count + 1)
+    ])
+    session.bulk_insert_mappings(Rating, [
+        {"profile_id": i, "combined_rating": rng.random() * 100}
+        for i in range(1, profiles_count + 1)
+    ])
+    for viewer_id in range(1, viewers_count + 1):
+        seen = rng.sample(range(1, profiles_count + 1), min(history, profiles_count))
+        session.bulk_insert_mappings(Interaction, [
+            {"from_profile_id": viewer_id, "to_profile_id": to_id, "type": rng.choice(["like", "skip"])}
+            for to_id in seen if to_id != viewer_id
+        ])
+    session.commit()
+
+
+def ranked_with_not_in(session, viewer_id, limit):
+    """The previous implementation: materialize interacted ids and send them back as NOT IN"""
+    interacted_ids = [row[0] for row in session.query(Interaction.to_profile_id).filter_by(
+        from_profile_id=viewer_id
+    ).all()]
+    return [row[0] for row in session.query(Profile.id).join(Rating).filter(
+        Profile.id != viewer_id,
+        ~Profile.id.in_(interacted_ids)
+    ).order_by(Rating.combined_rating.desc()).limit(limit).all()]
+
+
+def measure(label, viewers, fn):
+    started = time.perf_counter()
+    results = {viewer_id: fn(viewer_id) for viewer_id in viewers}
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed / len(viewers) * 1000:8.2f} ms/request")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--history", type=int, default=10000)
+    parser.add_argument("--viewers", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--database-url", default=None,
+                        help="Database to run against (defaults to a temporary SQLite file)")
+    parser.add_argument("--redis-url", default=None,
+                        help="Redis to run against (defaults to in-process fakeredis, which is much slower)")
+    args = parser.parse_args()
+
+    temp_path = None
+    database_url = args.database_url
+    if not database_url:
+        fd, temp_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite:///{temp_path}"
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    try:
+        session = Session()
+        build_dataset(session, args.profiles, args.viewers, args.history)
+        viewers = list(range(1, args.viewers + 1))
+
+        redis_client = RedisClient()
+        redis_client.client = redis.from_url(args.redis_url) if args.redis_url else fakeredis.FakeRedis()
+        pool = CandidatePoolService(redis_client)
+        pool.rebuild(session)
+        matching_service = MatchingService()
+        matching_service.redis_client = redis_client
+
+        started = time.perf_counter()
+        for viewer_id in viewers:
+            matching_service.rebuild_seen_filter(session, viewer_id)
+        print(f"seen filter rebuild    {(time.perf_counter() - started) / len(viewers) * 1000:8.2f} ms/viewer")
+
+        baseline = measure("NOT IN list", viewers, lambda viewer_id: ranked_with_not_in(
+            session, viewer_id, args.limit
+        ))
+        anti_join = measure("NOT EXISTS", viewers, lambda viewer_id: [
+            p["id"] for p in RatingService.get_ranked_profiles(session, viewer_id, args.limit, use_pool=False)
+        ])
+        pooled = measure("pool + seen filter", viewers, lambda viewer_id: [
+            p["id"] for p in RatingService.get_ranked_profiles(
+                session, viewer_id, args.limit, candidate_pool=pool,
+                exclude=matching_service.seen_exclusion(session, viewer_id)
+            )
+        ])
+
+        print(f"profiles={args.profiles} history={args.history} viewers={args.viewers}")
+        print(f"NOT EXISTS matches baseline: {anti_join == baseline}")
+        print(f"pool + seen filter matches baseline: {pooled == baseline}")
+        session.close()
+    finally:
+        engine.dispose()
+        if temp_path:
+            os.unlink(temp_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,15 @@ import logging
 import asyncio
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
+from sqlalchemy import select
 from app.core import config
 from app.models import *
-from app.models.database import Session
-from app.services.user_service import UserService
-from app.services.profile_service import ProfileService
-from app.services.matching_service import MatchingService
-import io
+from app.models.database import AsyncSession, configure_engine
+from app.core.executor import BlockingExecutor
+from app.core.redis_client import close_connection_pools
+from app.services.user_service import AsyncUserService
+from app.services.profile_service import AsyncProfileService, get_profile_service
+from app.services.matching_service import AsyncMatchingService, get_matching_service
 from telegram.error import BadRequest
 from app.services.matching_service import preload_profiles
 
@@ -48,17 +50,20 @@ user_states = {}
 
 user_data = {}
 
+# Service calls that still block on Redis or S3 run here instead of on the event loop
+blocking = BlockingExecutor()
+
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start command handler"""
     user_id = update.effective_user.id
     username = update.effective_user.username
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user = UserService.get_or_create_user(session, user_id, username)
+        user = await AsyncUserService.get_or_create_user(session, user_id, username)
 
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if user_profile and user_profile.get("has_profile"):
             await show_main_menu(update, context)
@@ -76,7 +81,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Произошла ошибка при запуске бота. Пожалуйста, попробуйте снова позже."
         )
     finally:
-        session.close()
+        await session.close()
 
 
 async def start_registration(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -117,20 +122,22 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
         photo = update.message.photo[-1]
         file_id = photo.file_id
 
-        session = Session()
+        session = AsyncSession()
         try:
-            user = UserService.get_or_create_user(session, user_id)
+            user = await AsyncUserService.get_or_create_user(session, user_id)
 
-            profile_service = ProfileService()
+            profile_service = get_profile_service()
 
-            user_profile = UserService.get_user_profile(session, user_id)
+            user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
             if not user_profile or not user_profile.get("has_profile"):
                 profile_data = user_data.get(user_id, {})
                 if not profile_data and 'profile_data' in context.user_data:
                     profile_data = context.user_data['profile_data']
 
-                profile = profile_service.create_profile(session, user.id, profile_data)
+                profile = await AsyncProfileService(profile_service).create_profile(
+                    session, blocking, user.id, profile_data
+                )
 
                 if not profile:
                     await update.message.reply_text(
@@ -142,20 +149,16 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 profile_id = user_profile["profile_id"]
 
-            photo_file = await context.bot.get_file(photo.file_id)
-            photo_bytes = io.BytesIO()
-            await photo_file.download_to_memory(photo_bytes)
-            photo_bytes.seek(0)
-
-            s3_path = profile_service.add_photo(
-                session,
+            # The upload to S3 and the rating refresh happen in the ingest_photo task
+            result = await blocking.run(
+                profile_service.record_photo,
                 profile_id,
-                photo_bytes.getvalue(),
-                telegram_file_id=file_id,
+                file_id,
+                photo.file_unique_id,
                 is_main=True
             )
 
-            if s3_path:
+            if result["success"]:
                 if user_id in user_data:
                     del user_data[user_id]
                 if 'profile_data' in context.user_data:
@@ -183,7 +186,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "Произошла ошибка при обработке фото. Пожалуйста, попробуйте снова позже."
             )
         finally:
-            session.close()
+            await session.close()
     else:
         await update.message.reply_text("Пожалуйста, отправьте фотографию:")
 
@@ -194,9 +197,9 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = query.from_user.id
 
     if 'state' not in context.user_data:
-        session = Session()
+        session = AsyncSession()
         try:
-            user_profile = UserService.get_user_profile(session, user_id)
+            user_profile = await AsyncUserService.get_user_profile(session, user_id)
             if user_profile and user_profile.get("has_profile"):
                 state = user_states.get(user_id, BROWSING)
                 context.user_data['state'] = state
@@ -207,7 +210,7 @@ async def handle_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception as e:
             logger.error(f"Error recovering state in handle_button: {e}")
         finally:
-            session.close()
+            await session.close()
 
     await query.answer()
 
@@ -505,29 +508,29 @@ async def handle_profile_action(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     user_id = query.from_user.id
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await query.answer("Сначала нужно создать анкету. Начните с команды /start.")
             return
 
-        matching_service = MatchingService()
+        matching_service = get_matching_service()
 
         if action == "like":
-            result = matching_service.like_profile(session, user_profile["profile_id"], profile_id)
+            result = await blocking.run(matching_service.like_profile, user_profile["profile_id"], profile_id)
 
             if result.get("is_match"):
-                other_profile = session.query(Profile).filter_by(id=profile_id).first()
+                other_profile = await session.get(Profile, profile_id)
 
                 if not other_profile:
                     logger.error(f"Could not find profile {profile_id} for match notification")
                     await query.answer("Произошла ошибка. Попробуйте еще раз.")
                     return
 
-                other_user = session.query(User).join(Profile).filter(
-                    Profile.id == other_profile.id).first()
+                other_user = await session.scalar(select(User).join(Profile).where(
+                    Profile.id == other_profile.id))
 
                 await query.answer(f"У вас новая пара с {other_profile.name}!")
 
@@ -554,7 +557,7 @@ async def handle_profile_action(update: Update, context: ContextTypes.DEFAULT_TY
 
                 try:
                     if other_user:
-                        this_user = session.query(User).filter(User.telegram_id == user_id).first()
+                        this_user = await session.scalar(select(User).where(User.telegram_id == user_id))
 
                         other_match_keyboard = []
                         if this_user and this_user.username:
@@ -593,7 +596,7 @@ async def handle_profile_action(update: Update, context: ContextTypes.DEFAULT_TY
 
                 await show_next_profile(update, context)
         else:
-            matching_service.skip_profile(session, user_profile["profile_id"], profile_id)
+            await blocking.run(matching_service.skip_profile, user_profile["profile_id"], profile_id)
 
             await query.answer("Анкета пропущена")
 
@@ -605,7 +608,7 @@ async def handle_profile_action(update: Update, context: ContextTypes.DEFAULT_TY
         logger.error(f"Error handling profile action: {e}")
         await query.answer("Произошла ошибка при обработке действия.")
     finally:
-        session.close()
+        await session.close()
 
 
 async def show_edit_profile_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -645,18 +648,18 @@ async def handle_edit_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Имя должно содержать минимум 2 символа. Пожалуйста, попробуйте еще раз:")
         return
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await update.message.reply_text("Профиль не найден. Начните с команды /start.")
             return
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
-        result = profile_service.update_profile(
-            session,
+        result = await blocking.run(
+            profile_service.update_profile,
             user_profile["profile_id"],
             {"name": name}
         )
@@ -673,7 +676,7 @@ async def handle_edit_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Произошла ошибка при обновлении имени. Пожалуйста, попробуйте снова позже."
         )
     finally:
-        session.close()
+        await session.close()
         user_states[user_id] = BROWSING
         context.user_data['state'] = BROWSING
 
@@ -688,18 +691,18 @@ async def handle_edit_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("Возраст должен быть от 18 до 100 лет. Пожалуйста, попробуйте еще раз:")
             return
 
-        session = Session()
+        session = AsyncSession()
         try:
-            user_profile = UserService.get_user_profile(session, user_id)
+            user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
             if not user_profile or not user_profile.get("has_profile"):
                 await update.message.reply_text("Профиль не найден. Начните с команды /start.")
                 return
 
-            profile_service = ProfileService()
+            profile_service = get_profile_service()
 
-            result = profile_service.update_profile(
-                session,
+            result = await blocking.run(
+                profile_service.update_profile,
                 user_profile["profile_id"],
                 {"age": age}
             )
@@ -716,7 +719,7 @@ async def handle_edit_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "Произошла ошибка при обновлении возраста. Пожалуйста, попробуйте снова позже."
             )
         finally:
-            session.close()
+            await session.close()
             user_states[user_id] = BROWSING
             context.user_data['state'] = BROWSING
 
@@ -734,18 +737,18 @@ async def handle_edit_bio(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Описание должно содержать минимум 10 символов. Пожалуйста, попробуйте еще раз:")
         return
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await update.message.reply_text("Профиль не найден. Начните с команды /start.")
             return
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
-        result = profile_service.update_profile(
-            session,
+        result = await blocking.run(
+            profile_service.update_profile,
             user_profile["profile_id"],
             {"bio": bio}
         )
@@ -762,7 +765,7 @@ async def handle_edit_bio(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Произошла ошибка при обновлении описания. Пожалуйста, попробуйте снова позже."
         )
     finally:
-        session.close()
+        await session.close()
         user_states[user_id] = BROWSING
         context.user_data['state'] = BROWSING
 
@@ -776,18 +779,18 @@ async def handle_edit_location(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("Пожалуйста, укажите корректное название города:")
         return
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await update.message.reply_text("Профиль не найден. Начните с команды /start.")
             return
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
-        result = profile_service.update_profile(
-            session,
+        result = await blocking.run(
+            profile_service.update_profile,
             user_profile["profile_id"],
             {"location": location}
         )
@@ -804,7 +807,7 @@ async def handle_edit_location(update: Update, context: ContextTypes.DEFAULT_TYP
             "Произошла ошибка при обновлении города. Пожалуйста, попробуйте снова позже."
         )
     finally:
-        session.close()
+        await session.close()
         user_states[user_id] = BROWSING
         context.user_data['state'] = BROWSING
 
@@ -820,18 +823,18 @@ async def handle_edit_interests(update: Update, context: ContextTypes.DEFAULT_TY
 
     interests = [i.strip() for i in interests_text.split(",") if i.strip()]
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await update.message.reply_text("Профиль не найден. Начните с команды /start.")
             return
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
-        result = profile_service.update_profile(
-            session,
+        result = await blocking.run(
+            profile_service.update_profile,
             user_profile["profile_id"],
             {"interests": interests}
         )
@@ -848,7 +851,7 @@ async def handle_edit_interests(update: Update, context: ContextTypes.DEFAULT_TY
             "Произошла ошибка при обновлении интересов. Пожалуйста, попробуйте снова позже."
         )
     finally:
-        session.close()
+        await session.close()
         user_states[user_id] = BROWSING
         context.user_data['state'] = BROWSING
 
@@ -869,18 +872,18 @@ async def handle_edit_preferred_gender(update: Update, context: ContextTypes.DEF
     if preferred_gender == "Любой":
         preferred_gender = None
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await update.message.reply_text("Профиль не найден. Начните с команды /start.")
             return
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
-        result = profile_service.update_profile(
-            session,
+        result = await blocking.run(
+            profile_service.update_profile,
             user_profile["profile_id"],
             {"preferred_gender": preferred_gender}
         )
@@ -898,7 +901,7 @@ async def handle_edit_preferred_gender(update: Update, context: ContextTypes.DEF
             "Произошла ошибка при обновлении предпочитаемого пола. Пожалуйста, попробуйте снова позже."
         )
     finally:
-        session.close()
+        await session.close()
         user_states[user_id] = BROWSING
         context.user_data['state'] = BROWSING
 
@@ -908,9 +911,9 @@ async def direct_edit_age_range(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     user_id = query.from_user.id
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile:
             await context.bot.send_message(user_id, "Профиль не найден. Используйте /start для создания профиля.")
@@ -936,7 +939,7 @@ async def direct_edit_age_range(update: Update, context: ContextTypes.DEFAULT_TY
             "Произошла ошибка при загрузке данных. Пожалуйста, попробуйте позже."
         )
     finally:
-        session.close()
+        await session.close()
 
 
 async def direct_edit_location_pref(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -944,9 +947,9 @@ async def direct_edit_location_pref(update: Update, context: ContextTypes.DEFAUL
     query = update.callback_query
     user_id = query.from_user.id
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile:
             await context.bot.send_message(user_id, "Профиль не найден. Используйте /start для создания профиля.")
@@ -970,7 +973,7 @@ async def direct_edit_location_pref(update: Update, context: ContextTypes.DEFAUL
             "Произошла ошибка при загрузке данных. Пожалуйста, попробуйте позже."
         )
     finally:
-        session.close()
+        await session.close()
 
 
 async def handle_direct_age_range_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1001,18 +1004,18 @@ async def handle_direct_age_range_edit(update: Update, context: ContextTypes.DEF
             preferred_age_min = age
             preferred_age_max = age
 
-        session = Session()
+        session = AsyncSession()
         try:
-            user_profile = UserService.get_user_profile(session, user_id)
+            user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
             if not user_profile:
                 await update.message.reply_text("Профиль не найден. Используйте /start для создания профиля.")
                 return
 
-            profile_service = ProfileService()
+            profile_service = get_profile_service()
 
-            result = profile_service.update_profile(
-                session,
+            result = await blocking.run(
+                profile_service.update_profile,
                 user_profile["profile_id"],
                 {
                     "preferred_age_min": preferred_age_min,
@@ -1033,7 +1036,7 @@ async def handle_direct_age_range_edit(update: Update, context: ContextTypes.DEF
             logger.error(f"Error updating age range: {e}")
             await update.message.reply_text("❌ Произошла ошибка при обновлении. Пожалуйста, попробуйте позже.")
         finally:
-            session.close()
+            await session.close()
             user_states[user_id] = BROWSING
             context.user_data['state'] = BROWSING
 
@@ -1050,18 +1053,18 @@ async def handle_direct_location_edit(update: Update, context: ContextTypes.DEFA
 
     preferred_location = None if location.lower() == "любой" else location
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile:
             await update.message.reply_text("Профиль не найден. Используйте /start для создания профиля.")
             return
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
-        result = profile_service.update_profile(
-            session,
+        result = await blocking.run(
+            profile_service.update_profile,
             user_profile["profile_id"],
             {
                 "preferred_location": preferred_location
@@ -1079,7 +1082,7 @@ async def handle_direct_location_edit(update: Update, context: ContextTypes.DEFA
         logger.error(f"Error updating preferred location: {e}")
         await update.message.reply_text("❌ Произошла ошибка при обновлении. Пожалуйста, попробуйте позже.")
     finally:
-        session.close()
+        await session.close()
         context.user_data['state'] = BROWSING
 
 
@@ -1127,9 +1130,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif state == DIRECT_EDIT_LOCATION:
         await handle_direct_location_edit(update, context)
     else:
-        session = Session()
+        session = AsyncSession()
         try:
-            user_profile = UserService.get_user_profile(session, user_id)
+            user_profile = await AsyncUserService.get_user_profile(session, user_id)
             if user_profile and user_profile.get("has_profile"):
                 user_states[user_id] = BROWSING
                 context.user_data['state'] = BROWSING
@@ -1145,7 +1148,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "Произошла ошибка. Используйте /start, чтобы начать сначала."
             )
         finally:
-            session.close()
+            await session.close()
 
 
 def sync_user_state(user_id, context, state=None):
@@ -1181,9 +1184,9 @@ async def handle_edit_field_selection(update: Update, context: ContextTypes.DEFA
     query = update.callback_query
     user_id = query.from_user.id
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await context.bot.send_message(user_id, "Профиль не найден. Начните с команды /start.")
@@ -1263,7 +1266,7 @@ async def handle_edit_field_selection(update: Update, context: ContextTypes.DEFA
             "Произошла ошибка при загрузке данных профиля. Пожалуйста, попробуйте снова позже."
         )
     finally:
-        session.close()
+        await session.close()
 
 
 async def show_my_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1272,9 +1275,9 @@ async def show_my_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"Showing profile for user {user_id}, current state: {context.user_data.get('state', 'None')}")
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             await update.message.reply_text(
@@ -1282,9 +1285,9 @@ async def show_my_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
-        photos = profile_service.get_photos(session, user_profile["profile_id"])
+        photos = await AsyncProfileService(profile_service).get_photos(session, user_profile["profile_id"])
 
         profile_text = (
             f"👤 {user_profile['name']}, {user_profile['age']}\n"
@@ -1308,6 +1311,10 @@ async def show_my_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         if photos and len(photos) > 0:
             main_photo = next((p for p in photos if p.get("is_main")), photos[0])
+            if main_photo.get("status") == "pending":
+                profile_text += "\n\n⏳ Фото ещё обрабатывается"
+            elif main_photo.get("status") == "failed":
+                profile_text += "\n\n⚠️ Не удалось сохранить фото, отправьте его ещё раз"
 
             photo_source = main_photo.get("telegram_file_id") or main_photo.get("url")
 
@@ -1375,7 +1382,7 @@ async def show_my_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "Произошла ошибка при загрузке профиля. Пожалуйста, попробуйте снова позже."
             )
     finally:
-        session.close()
+        await session.close()
         sync_user_state(user_id, context, BROWSING)
         logger.info(f"Profile display completed, state set to: {context.user_data.get('state', 'None')}")
 
@@ -1388,10 +1395,10 @@ async def show_next_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     sync_user_state(user_id, context, VIEWING_PROFILE)
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user = UserService.get_or_create_user(session, user_id)
-        user_profile = UserService.get_user_profile(session, user_id)
+        user = await AsyncUserService.get_or_create_user(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             message_text = "Сначала нужно создать анкету. Начните с команды /start."
@@ -1402,13 +1409,11 @@ async def show_next_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
             sync_user_state(user_id, context, BROWSING)
             return
 
-        matching_service = MatchingService()
-
-        matching_service.redis_client.delete_profile_list(user_id)
+        matching_service = get_matching_service()
 
-        profiles = matching_service.get_next_profiles(session, user.id, 2)
+        next_profile_id = await blocking.run(matching_service.next_from_deck, user.id)
 
-        if not profiles:
+        if not next_profile_id:
             keyboard = [
                 [InlineKeyboardButton("🔄 Пересмотреть настройки", callback_data="edit_preferences")]
             ]
@@ -1423,15 +1428,15 @@ async def show_next_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
             sync_user_state(user_id, context, BROWSING)
             return
 
-        profile = profiles[0]
+        profile = {"id": next_profile_id}
 
         if "current_profiles" not in context.user_data:
             context.user_data["current_profiles"] = {}
 
         context.user_data["current_profiles"][user_id] = profile
 
-        profile_service = ProfileService()
-        profile_data = profile_service.get_profile(session, profile["id"])
+        profile_service = get_profile_service()
+        profile_data = await blocking.run(profile_service.get_profile, profile["id"])
 
         if not profile_data:
             message_text = "Ошибка при загрузке анкеты. Попробуйте еще раз."
@@ -1458,7 +1463,7 @@ async def show_next_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        photos = profile_service.get_photos(session, profile["id"])
+        photos = await AsyncProfileService(profile_service).get_photos(session, profile["id"])
         photo_sent = False
 
         if photos and len(photos) > 0:
@@ -1505,7 +1510,7 @@ async def show_next_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         sync_user_state(user_id, context, BROWSING)
     finally:
-        session.close()
+        await session.close()
 
 
 async def restore_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1514,9 +1519,9 @@ async def restore_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"Attempting to restore session for user {user_id}")
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if user_profile and user_profile.get("has_profile"):
             sync_user_state(user_id, context, BROWSING)
@@ -1539,7 +1544,7 @@ async def restore_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "❌ Произошла ошибка при восстановлении сессии. Используйте /start, чтобы начать сначала."
         )
     finally:
-        session.close()
+        await session.close()
 
 
 async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1562,12 +1567,9 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if len(parts) >= 3:
                 match_id = int(parts[2])
 
-                session = Session()
+                session = AsyncSession()
                 try:
-                    match = session.query(Match).filter_by(id=match_id).first()
-                    if match and not match.initiated_chat:
-                        match.initiated_chat = True
-                        session.commit()
+                    if await blocking.run(get_matching_service().mark_chat_initiated, match_id):
                         logger.info(f"Chat initiated for match {match_id} by user {user_id}")
                         await update.callback_query.answer("Диалог отмечен как начатый!")
 
@@ -1575,13 +1577,13 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     logger.error(f"Error marking chat as initiated: {e}")
                     await update.callback_query.answer("Ошибка при отметке диалога.")
                 finally:
-                    session.close()
+                    await session.close()
 
     context.user_data['matches_page'] = page
 
-    session = Session()
+    session = AsyncSession()
     try:
-        user_profile = UserService.get_user_profile(session, user_id)
+        user_profile = await AsyncUserService.get_user_profile(session, user_id)
 
         if not user_profile or not user_profile.get("has_profile"):
             message_text = "Сначала нужно создать анкету. Начните с команды /start."
@@ -1592,11 +1594,11 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
             sync_user_state(user_id, context, BROWSING)
             return
 
-        matching_service = MatchingService()
+        matching_service = get_matching_service()
 
-        matches = matching_service.get_matches(session, user_profile["profile_id"])
+        matches_count = await AsyncMatchingService(matching_service).count_matches(session, user_profile["profile_id"])
 
-        if not matches:
+        if not matches_count:
             message_text = "У вас пока нет пар. Продолжайте просматривать анкеты, чтобы найти совпадения!"
             if hasattr(update, 'callback_query') and update.callback_query:
                 await update.callback_query.message.edit_text(message_text)
@@ -1605,28 +1607,42 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
             sync_user_state(user_id, context, BROWSING)
             return
 
-        context.user_data['matches'] = matches
+        # Cursor of every visited page, so "back" does not rescan earlier matches
+        cursors = context.user_data.get('matches_cursors') or [None]
+        if page >= matches_count or page >= len(cursors):
+            page = 0
+            cursors = [None]
+            context.user_data['matches_page'] = 0
 
-        if page >= len(matches):
+        matches_page = await AsyncMatchingService(matching_service).get_matches_page(
+            session, user_profile["profile_id"], limit=1, cursor=cursors[page]
+        )
+        if not matches_page["matches"]:
             page = 0
+            cursors = [None]
             context.user_data['matches_page'] = 0
+            matches_page = await AsyncMatchingService(matching_service).get_matches_page(
+                session, user_profile["profile_id"], limit=1
+            )
+
+        del cursors[page + 1:]
+        if matches_page["next_cursor"]:
+            cursors.append(matches_page["next_cursor"])
+        context.user_data['matches_cursors'] = cursors
 
-        match = matches[page]
+        match = matches_page["matches"][0]
         other_profile = match["other_profile"]
         match_id = match["match_id"]
 
-        profile_service = ProfileService()
+        profile_service = get_profile_service()
 
         keyboard = []
 
-        other_user = session.query(User).join(Profile).filter(
-            Profile.id == other_profile.get('id')).first()
-
-        if other_user and other_user.username:
+        if other_profile.get("username"):
             keyboard.append([
                 InlineKeyboardButton(
                     "💬 Написать в Telegram",
-                    url=f"https://t.me/{other_user.username}"
+                    url=f"https://t.me/{other_profile['username']}"
                 )
             ])
 
@@ -1650,9 +1666,9 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if page > 0:
             navigation_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data="match_prev"))
 
-        navigation_buttons.append(InlineKeyboardButton(f"{page + 1}/{len(matches)}", callback_data="match_count"))
+        navigation_buttons.append(InlineKeyboardButton(f"{page + 1}/{matches_count}", callback_data="match_count"))
 
-        if page < len(matches) - 1:
+        if matches_page["next_cursor"] and page < matches_count - 1:
             navigation_buttons.append(InlineKeyboardButton("Вперед ➡️", callback_data="match_next"))
 
         keyboard.append(navigation_buttons)
@@ -1663,17 +1679,7 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         name = other_profile.get('name', 'Без имени')
         age = other_profile.get('age', '')
-        location = 'Не указано'
-
-        if 'location' in other_profile:
-            location = other_profile['location']
-        else:
-            try:
-                full_profile = profile_service.get_profile(session, other_profile.get('id'))
-                if full_profile and 'location' in full_profile:
-                    location = full_profile.get('location')
-            except Exception as e:
-                logger.error(f"Error fetching full profile: {e}")
+        location = other_profile.get('location') or 'Не указано'
 
         match_text = (
             f"👤 {name}, {age}\n"
@@ -1685,37 +1691,37 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
         photo_sent = False
 
         try:
-            photos = profile_service.get_photos(session, other_profile.get('id'))
-
-            if photos and len(photos) > 0:
-                main_photo = next((p for p in photos if p.get("is_main")), photos[0])
+            main_photo = match.get("main_photo")
+            photo_url = profile_service.photo_url(
+                main_photo["telegram_file_id"], main_photo["s3_path"]
+            ) if main_photo else None
 
-                if main_photo and "url" in main_photo and main_photo["url"]:
-                    if hasattr(update, 'callback_query') and update.callback_query:
-                        try:
-                            await update.callback_query.message.delete()
-                            await context.bot.send_photo(
-                                user_id,
-                                main_photo["url"],
-                                caption=match_text,
-                                reply_markup=reply_markup
-                            )
-                        except Exception as e:
-                            logger.error(f"Error updating match photo: {e}")
-                            await context.bot.send_photo(
-                                user_id,
-                                main_photo["url"],
-                                caption=match_text,
-                                reply_markup=reply_markup
-                            )
-                    else:
+            if photo_url:
+                if hasattr(update, 'callback_query') and update.callback_query:
+                    try:
+                        await update.callback_query.message.delete()
                         await context.bot.send_photo(
                             user_id,
-                            main_photo["url"],
+                            photo_url,
                             caption=match_text,
                             reply_markup=reply_markup
                         )
-                    photo_sent = True
+                    except Exception as e:
+                        logger.error(f"Error updating match photo: {e}")
+                        await context.bot.send_photo(
+                            user_id,
+                            photo_url,
+                            caption=match_text,
+                            reply_markup=reply_markup
+                        )
+                else:
+                    await context.bot.send_photo(
+                        user_id,
+                        photo_url,
+                        caption=match_text,
+                        reply_markup=reply_markup
+                    )
+                photo_sent = True
         except Exception as e:
             logger.error(f"Error processing match photo: {e}")
 
@@ -1747,7 +1753,7 @@ async def show_matches(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         sync_user_state(user_id, context, BROWSING)
     finally:
-        session.close()
+        await session.close()
 
 
 async def check_state(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1788,7 +1794,10 @@ def get_user_state(user_id, context):
 
 def main():
     """Start the bot"""
-    application = Application.builder().token(config.TELEGRAM_TOKEN).build()
+    configure_engine("bot")
+    application = Application.builder().token(config.TELEGRAM_TOKEN).concurrent_updates(
+        config.BOT_CONCURRENT_UPDATES
+    ).build()
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("restore", restore_session))
@@ -1803,6 +1812,8 @@ def main():
 
     application.run_polling()
 
+    blocking.shutdown()
+    close_connection_pools()
     logger.info("Dating Bot stopped")
 
 
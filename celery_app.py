@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
 from app.core import config
 import logging
 
@@ -7,7 +8,15 @@ logger = logging.getLogger(__name__)
 celery_app = Celery(
     'dating_bot',
     broker=config.CELERY_BROKER_URL,
-    backend=config.CELERY_RESULT_BACKEND
+    backend=config.CELERY_RESULT_BACKEND,
+    include=[
+        'app.services.rating_service',
+        'app.services.stats_service',
+        'app.services.matching_service',
+        'app.services.profile_service',
+        'app.services.candidate_pool_service',
+        'app.services.retention_service'
+    ]
 )
 
 celery_app.conf.update(
@@ -18,4 +27,13 @@ celery_app.conf.update(
     enable_utc=True,
 )
 
+
+@worker_init.connect
+@worker_process_init.connect
+def configure_worker_engine(**kwargs):
+    """Use the Celery pool profile, with fresh connections in every forked child"""
+    from app.models.database import configure_engine
+    configure_engine("celery")
+
+
 logger.info("Celery app initialized")
\ No newline at end of file
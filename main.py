@@ -5,7 +5,11 @@ from celery.schedules import crontab
 from celery_app import celery_app
 from bot import main as bot_main
 from app.core.config import *
-from app.services.rating_service import update_all_ratings
+from app.services.rating_service import update_all_ratings_sharded, refresh_dirty_ratings
+from app.services.stats_service import reconcile_profile_stats
+from app.services.candidate_pool_service import rebuild_candidate_pools
+from app.services.retention_service import ensure_interaction_partitions, compact_old_interactions
+from app.services.matching_service import get_matching_service
 from datetime import datetime, timedelta
 from app.models import Session, User, Match
 
@@ -19,8 +23,13 @@ logging.basicConfig(
 @celery_app.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
     sender.add_periodic_task(
-        crontab(minute=0, hour='*'),
-        update_all_ratings.s()
+        RATING_DIRTY_REFRESH_INTERVAL,
+        refresh_dirty_ratings.s()
+    )
+
+    sender.add_periodic_task(
+        crontab(minute=0, hour=3),
+        update_all_ratings_sharded.s()
     )
 
     sender.add_periodic_task(
@@ -28,27 +37,38 @@ def setup_periodic_tasks(sender, **kwargs):
         cleanup_expired_data.s()
     )
 
+    sender.add_periodic_task(
+        crontab(minute=30, hour=2),
+        reconcile_profile_stats.s()
+    )
+
+    sender.add_periodic_task(
+        crontab(minute=30, hour=3),
+        rebuild_candidate_pools.s()
+    )
+
+    sender.add_periodic_task(
+        crontab(minute=0, hour=1, day_of_month=1),
+        ensure_interaction_partitions.s()
+    )
+
+    sender.add_periodic_task(
+        crontab(minute=30, hour=1, day_of_month=1),
+        compact_old_interactions.s()
+    )
+
 
 @celery_app.task
 def cleanup_expired_data():
     """Clean up expired user data and sessions"""
     session = Session()
     try:
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
-
-        inactive_matches = session.query(Match).filter(
-            Match.created_at < cutoff_date,
-            Match.status == "active",
-            Match.initiated_chat == False
-        ).all()
-
-        for match in inactive_matches:
-            match.status = "archived"
+        cutoff_date = datetime.utcnow() - timedelta(days=MATCH_ARCHIVE_AFTER_DAYS)
 
-        session.commit()
-        logging.info(f"Archived {len(inactive_matches)} inactive matches")
+        result = get_matching_service().archive_inactive_matches(session, cutoff_date)
+        logging.info(f"Archived {result['archived_count']} inactive matches in {result['batches']} batches")
 
-        return {"success": True, "archived_matches": len(inactive_matches)}
+        return {"success": True, "archived_matches": result["archived_count"], "batches": result["batches"]}
     except Exception as e:
         session.rollback()
         logging.error(f"Error cleaning up expired data: {e}")
@@ -1,10 +1,14 @@
 import pytest
 import tempfile
 import os
+import fakeredis
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from app.models.database import Base
 from app.core import config
+from app.core.redis_client import RedisClient
+from app.core.profile_cache import profile_cache
 
 
 @pytest.fixture(scope="session")
@@ -34,6 +38,45 @@ def test_session(test_db_engine):
     session.close()
 
 
+@pytest.fixture
+def isolated_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+
+    yield session
+
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def redis_client():
+    client = RedisClient()
+    client.client = fakeredis.FakeRedis()
+
+    yield client
+
+    client.client.flushall()
+
+
+@pytest.fixture(autouse=True)
+def profile_summary_cache(redis_client):
+    """Process-wide summary cache on fakeredis, empty for every test"""
+    profile_cache.redis_client = redis_client
+    profile_cache.clear_local()
+    profile_cache.reset_stats()
+
+    yield profile_cache
+
+    profile_cache.clear_local()
+
+
 @pytest.fixture
 def sample_user_data():
     return {
@@ -1,6 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
-from app.api.server import app, get_db
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.api import server
+from app.api.server import app, get_db, get_async_db
+from app.services.matching_service import MatchingService
+from app.models.database import async_database_url
 from tests.conftest import test_session
 
 
@@ -10,12 +15,24 @@ def get_test_db(test_session):
     return _get_test_db
 
 
+def get_test_async_db(async_session_factory):
+    async def _get_test_async_db():
+        async with async_session_factory() as session:
+            yield session
+    return _get_test_async_db
+
+
 @pytest.fixture
-def client(test_session):
+def client(test_session, test_db_engine):
+    async_engine = create_async_engine(async_database_url(str(test_db_engine.url)), poolclass=NullPool)
     app.dependency_overrides[get_db] = get_test_db(test_session)
+    app.dependency_overrides[get_async_db] = get_test_async_db(
+        async_sessionmaker(async_engine, expire_on_commit=False)
+    )
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+    async_engine.sync_engine.dispose()
 
 
 class TestAPI:
@@ -110,4 +127,29 @@ class TestAPI:
         assert "total_interactions" in data
         assert "total_matches" in data
         assert data["total_users"] >= 1
-        assert data["total_profiles"] >= 1
\ No newline at end of file
+        assert data["total_profiles"] >= 1
+
+    def test_candidates_for_nonexistent_profile(self, client):
+        response = client.get("/profiles/999999/candidates")
+        assert response.status_code == 404
+        assert "Профиль не найден" in response.json()["detail"]
+
+    def test_send_message_to_nonexistent_match(self, client):
+        response = client.post("/matches/999999/messages", json={"sender_profile_id": 1, "content": "привет"})
+        assert response.status_code == 404
+        assert "Совпадение не найдено" in response.json()["detail"]
+
+    def test_interaction_updates_seen_filter_and_ratings(self, client, sample_profile_data, redis_client, monkeypatch):
+        matching_service = MatchingService(redis_client)
+        monkeypatch.setattr(server, "get_matching_service", lambda: matching_service)
+        profile_ids = []
+        for telegram_id in (555001, 555002):
+            client.post("/users", json={"telegram_id": telegram_id, "username": f"user{telegram_id}"})
+            profile_ids.append(client.post(f"/users/{telegram_id}/profile", json=sample_profile_data).json()["id"])
+
+        response = client.post(f"/profiles/{profile_ids[0]}/interactions",
+                               json={"to_profile_id": profile_ids[1], "type": "like"})
+
+        assert response.status_code == 200
+        assert redis_client.pop_dirty_profiles(10) == [profile_ids[1]]
+        assert matching_service.seen_filter.might_contain(profile_ids[0], [profile_ids[1]]) == {profile_ids[1]}
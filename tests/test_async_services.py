@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.models import *
+from app.models.database import Base, RoutingSession, async_database_url, read_replica
+from app.services.user_service import AsyncUserService, UserService
+from app.services.matching_service import AsyncMatchingService, MatchingService
+from app.services import rating_service as rating_module
+from app.services.candidate_pool_service import MEMBERSHIP_KEY, CandidatePoolService
+from app.services.profile_service import AsyncProfileService, ProfileService
+from app.core.executor import BlockingExecutor
+from tests.test_rating_service import create_profiles
+from tests.test_matching_service import create_matches
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def sync_session(database_url):
+    engine = create_engine(database_url)
+    session = sessionmaker(bind=engine)()
+
+    yield session
+
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def async_session_factory(database_url):
+    engine = create_async_engine(async_database_url(database_url), poolclass=NullPool)
+
+    yield async_sessionmaker(engine, sync_session_class=RoutingSession, expire_on_commit=False)
+
+    engine.sync_engine.dispose()
+
+
+class TestAsyncServices:
+
+    def test_async_url_uses_async_driver(self):
+        assert async_database_url("postgresql://u:p@db/dating").drivername == "postgresql+asyncpg"
+        assert async_database_url("sqlite:///bot.db").drivername == "sqlite+aiosqlite"
+
+    @pytest.mark.asyncio
+    async def test_user_created_and_loaded_through_async_session(self, async_session_factory):
+        async with async_session_factory() as session:
+            user = await AsyncUserService.get_or_create_user(session, 555, "async_user")
+            # Attributes stay loaded after the commit inside the service
+            assert (user.telegram_id, user.username) == (555, "async_user")
+            assert await AsyncUserService.get_user_profile(session, 555) == {"has_profile": False, "user_id": user.id}
+
+    @pytest.mark.asyncio
+    async def test_summary_cache_redis_calls_leave_the_event_loop(self, sync_session, async_session_factory,
+                                                                  profile_summary_cache, monkeypatch):
+        profile = create_profiles(sync_session, 1)[0]
+        telegram_id = profile.user.telegram_id
+        threads = []
+        get_cached = profile_summary_cache.redis_client.get_cached_user_profile
+        cache = profile_summary_cache.redis_client.cache_user_profile
+        monkeypatch.setattr(profile_summary_cache.redis_client, "get_cached_user_profile",
+                            lambda *args: threads.append(threading.current_thread()) or get_cached(*args))
+        monkeypatch.setattr(profile_summary_cache.redis_client, "cache_user_profile",
+                            lambda *args: threads.append(threading.current_thread()) or cache(*args))
+
+        async with async_session_factory() as session:
+            first = await AsyncUserService.get_user_profile(session, telegram_id)
+            second = await AsyncUserService.get_user_profile(session, telegram_id)
+
+        assert first == second and first["profile_id"] == profile.id
+        assert len(threads) == 2 and threading.current_thread() not in threads
+        assert profile_summary_cache.stats()["local_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_profile_creation_calls_redis_on_the_executor(self, database_url, sync_session,
+                                                                async_session_factory, redis_client, monkeypatch):
+        threads = []
+        candidate_pool = CandidatePoolService(redis_client)
+        monkeypatch.setattr(rating_module, "get_candidate_pool_service", lambda: candidate_pool)
+        for client, name in ((candidate_pool, "index_profiles"), (redis_client, "invalidate")):
+            call = getattr(client, name)
+            monkeypatch.setattr(client, name, lambda *args, call=call, **kwargs:
+                                threads.append(threading.current_thread().name) or call(*args, **kwargs))
+        user = User(telegram_id=888)
+        sync_session.add(user)
+        sync_session.commit()
+        engine = create_engine(database_url)
+        executor = BlockingExecutor(sessionmaker(bind=engine), max_workers=1, max_queue=1)
+
+        try:
+            async with async_session_factory() as session:
+                profile = await AsyncProfileService(ProfileService(redis_client)).create_profile(
+                    session, executor, user.id, {"name": "Анна", "age": 25, "gender": "Женский", "location": "Москва"}
+                )
+        finally:
+            executor.shutdown()
+            engine.dispose()
+
+        assert sync_session.get(Rating, profile.id).combined_rating is not None
+        assert len(threads) == 2 and all(name.startswith("blocking") for name in threads)
+        assert redis_client.client.hexists(MEMBERSHIP_KEY, profile.id)
+
+    @pytest.mark.asyncio
+    async def test_matches_match_sync_service(self, sync_session, async_session_factory):
+        profiles = create_profiles(sync_session, 6)
+        create_matches(sync_session, profiles[0], profiles[1:])
+        expected = MatchingService().get_matches(sync_session, profiles[0].id)
+
+        async with async_session_factory() as session:
+            matching_service = AsyncMatchingService(MatchingService())
+            assert await matching_service.get_matches(session, profiles[0].id) == expected
+            assert await matching_service.count_matches(session, profiles[0].id) == 5
+
+    @pytest.mark.asyncio
+    async def test_concurrent_handlers_use_separate_sessions(self, sync_session, async_session_factory):
+        profiles = create_profiles(sync_session, 10)
+        telegram_ids = [p.user.telegram_id for p in profiles]
+
+        async def load(telegram_id):
+            async with async_session_factory() as session:
+                return await AsyncUserService.get_user_profile(session, telegram_id)
+
+        results = await asyncio.gather(*(load(telegram_id) for telegram_id in telegram_ids))
+
+        assert [r["profile_id"] for r in results] == [p.id for p in profiles]
+        assert results == [UserService.get_user_profile(sync_session, t) for t in telegram_ids]
+
+    @pytest.mark.asyncio
+    async def test_read_replica_routes_async_session(self, tmp_path, database_url):
+        replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+        replica = create_engine(replica_url)
+        Base.metadata.create_all(replica)
+        seed = sessionmaker(bind=replica)()
+        seed.add(User(telegram_id=777))
+        seed.commit()
+        seed.close()
+        replica.dispose()
+
+        primary_engine = create_async_engine(async_database_url(database_url), poolclass=NullPool)
+        replica_engine = create_async_engine(async_database_url(replica_url), poolclass=NullPool)
+        factory = async_sessionmaker(primary_engine, sync_session_class=RoutingSession,
+                                     replicas=[replica_engine.sync_engine])
+        try:
+            async with factory() as session:
+                with read_replica(session):
+                    assert await session.scalar(select(User.id).where(User.telegram_id == 777)) is not None
+                assert await session.scalar(select(User.id).where(User.telegram_id == 777)) is None
+        finally:
+            await primary_engine.dispose()
+            await replica_engine.dispose()
@@ -0,0 +1,74 @@
+from app.core import config
+from app.services.candidate_pool_service import CandidatePoolService
+from app.services.rating_service import RatingService
+from app.models import *
+from tests.test_rating_service import create_profiles, create_activity
+
+
+def ranked_ids(profiles):
+    return [p["id"] for p in profiles]
+
+
+class TestCandidatePoolService:
+
+    def test_profile_segments_include_wildcards(self):
+        keys = CandidatePoolService.profile_segments("Женский", "Москва", 25)
+
+        assert len(keys) == 8
+        assert "pool:Женский:Москва:25" in keys
+        assert "pool:*:*:*" in keys
+
+    def test_viewer_segments_follow_preferences(self, isolated_session):
+        viewer = Profile(id=1, preferred_gender="Женский", preferred_age_min=20, preferred_age_max=22)
+        assert CandidatePoolService.viewer_segments(viewer) == [
+            "pool:Женский:*:20", "pool:Женский:*:21", "pool:Женский:*:22"
+        ]
+
+        viewer = Profile(id=1, preferred_location="Казань")
+        assert CandidatePoolService.viewer_segments(viewer) == ["pool:*:Казань:*"]
+
+    def test_pool_results_match_sql_path(self, isolated_session, redis_client):
+        profiles = create_profiles(isolated_session, 60)
+        create_activity(isolated_session, profiles, interactions=150, matches=10)
+        RatingService.update_ratings_bulk(isolated_session)
+        pool = CandidatePoolService(redis_client)
+        pool.rebuild(isolated_session)
+
+        for viewer in profiles[:15]:
+            from_pool = RatingService.get_ranked_profiles(isolated_session, viewer.id, 5, candidate_pool=pool)
+            from_sql = RatingService.get_ranked_profiles(isolated_session, viewer.id, 5, use_pool=False)
+            assert ranked_ids(from_pool) == ranked_ids(from_sql)
+
+    def test_pool_not_ready_falls_back_to_sql(self, isolated_session, redis_client):
+        profiles = create_profiles(isolated_session, 5)
+        pool = CandidatePoolService(redis_client)
+
+        assert pool.get_candidate_ids(profiles[0], 10, lambda ids: set()) is None
+
+    def test_scan_limit_falls_back_to_sql(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 40)
+        RatingService.update_ratings_bulk(isolated_session)
+        pool = CandidatePoolService(redis_client)
+        pool.rebuild(isolated_session)
+        viewer = profiles[0]
+        viewer.preferred_gender = viewer.preferred_age_min = viewer.preferred_age_max = None
+        viewer.preferred_location = None
+        monkeypatch.setattr(config, "CANDIDATE_POOL_MAX_SCAN", 20)
+
+        assert pool.get_candidate_ids(viewer, 5, lambda ids: set(ids)) is None
+        assert pool.get_candidate_ids(viewer, 5, lambda ids: set(ids[:-2])) is None
+        assert len(pool.get_candidate_ids(viewer, 5, lambda ids: set())) == 5
+
+        monkeypatch.setattr(config, "CANDIDATE_POOL_MAX_SCAN", 1000)
+        assert pool.get_candidate_ids(viewer, 5, lambda ids: set(ids)) == []
+
+    def test_reindex_moves_profile_between_segments(self, isolated_session, redis_client):
+        pool = CandidatePoolService(redis_client)
+        pool.index_profiles([{"id": 7, "gender": "Женский", "location": "Москва", "age": 30, "combined_rating": 50.0}])
+        pool.index_profiles([{"id": 7, "gender": "Женский", "location": "Казань", "age": 30, "combined_rating": 60.0}])
+
+        assert redis_client.client.zscore("pool:Женский:Москва:30", 7) is None
+        assert redis_client.client.zscore("pool:Женский:Казань:30", 7) == 60.0
+
+        pool.remove_profile(7)
+        assert redis_client.client.zscore("pool:*:*:*", 7) is None
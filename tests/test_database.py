@@ -0,0 +1,175 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.orm import sessionmaker
+from app.core import config
+from app.models import *
+from app.models import database
+from app.models.database import (Base, MeteredQueuePool, RoutingSession, engine_options, pool_metrics,
+                                 pool_status, read_only, read_replica)
+from app.services.rating_service import RatingService
+from app.services.stats_service import StatsService
+
+
+@pytest.fixture
+def metered_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=MeteredQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.1)
+    pool_metrics.reset()
+
+    yield engine
+
+    engine.dispose()
+    pool_metrics.reset()
+
+
+class TestEnginePooling:
+
+    def test_options_follow_role_profile(self):
+        options = engine_options("celery", "postgresql://user:pass@db/dating_bot")
+        profile = config.DB_POOL_PROFILES["celery"]
+
+        assert options["poolclass"] is MeteredQueuePool
+        assert options["pool_size"] == profile["pool_size"]
+        assert options["max_overflow"] == profile["max_overflow"]
+        assert options["pool_pre_ping"] == config.DB_POOL_PRE_PING
+        assert options["connect_args"]["options"] == f"-c statement_timeout={profile['statement_timeout_ms']}"
+
+    def test_unknown_role_and_sqlite(self):
+        assert engine_options("worker", "postgresql://db/x")["pool_size"] == config.DB_POOL_PROFILES["bot"]["pool_size"]
+        assert engine_options("api", "sqlite://") == {}
+
+    def test_checkouts_and_utilization_are_reported(self, metered_engine):
+        with metered_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            status = pool_status(metered_engine)
+
+        assert status["checkouts"] == 1
+        assert (status["pool_size"], status["max_overflow"]) == (1, 0)
+        assert status["checked_out"] == 1
+        assert status["utilization"] == 1.0
+        assert pool_status(metered_engine)["checked_out"] == 0
+
+    def test_exhausted_pool_records_timeout(self, metered_engine):
+        with metered_engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                metered_engine.connect()
+
+        status = pool_status(metered_engine)
+        assert status["timeouts"] == 1
+        assert status["checkouts"] == 1
+
+    def test_bot_pools_share_one_connection_budget(self, monkeypatch):
+        original, original_async = database.engine, database.async_engine
+        monkeypatch.setattr(database, "process_role", database.process_role)
+        try:
+            engine = database.configure_engine("bot", "postgresql://user:pass@db/dating_bot", replica_urls=())
+            pools = [engine.pool, database.async_engine.pool]
+            assert (engine.pool.size(), engine.pool.max_overflow) == (config.BOT_EXECUTOR_WORKERS, 0)
+            assert sum(pool.size() + pool.max_overflow for pool in pools) == 30
+        finally:
+            database.engine.dispose()
+            database.engine, database.async_engine = original, original_async
+            database.Session.configure(bind=original)
+            database.AsyncSession.configure(bind=original_async)
+
+    def test_configure_engine_rebinds_session(self, monkeypatch):
+        original = database.engine
+        monkeypatch.setattr(database, "process_role", database.process_role)
+        try:
+            engine = database.configure_engine("api", "sqlite://")
+            assert database.Session().get_bind() is engine
+            assert get_engine() is engine
+            assert pool_status()["role"] == "api"
+        finally:
+            database.engine.dispose()
+            database.engine = original
+            database.Session.configure(bind=original)
+
+
+@pytest.fixture
+def routed(tmp_path):
+    """Primary and replica stand-ins with the same schema but different rows"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, telegram_ids in ((primary, [1]), (replica, [1, 2])):
+        Base.metadata.create_all(engine)
+        seed = sessionmaker(bind=engine)()
+        for telegram_id in telegram_ids:
+            seed.add(User(telegram_id=telegram_id))
+        seed.commit()
+        seed.close()
+
+    factory = sessionmaker(bind=primary, class_=RoutingSession, replicas=[replica])
+    session = factory()
+
+    yield session, factory
+
+    session.close()
+    primary.dispose()
+    replica.dispose()
+
+
+@read_only
+def find_user_id(session, telegram_id):
+    return session.query(User.id).filter_by(telegram_id=telegram_id).scalar()
+
+
+class TestReadReplicaRouting:
+
+    def test_read_only_methods_use_replica(self, routed):
+        session, _ = routed
+
+        assert find_user_id(session, 2) == 2
+        assert session.query(User).filter_by(telegram_id=2).first() is None
+
+    def test_session_reads_its_own_writes(self, routed):
+        session, _ = routed
+        session.add(User(telegram_id=3))
+        session.commit()
+
+        assert find_user_id(session, 3) is not None
+        assert find_user_id(session, 2) is None
+
+    def test_pending_changes_and_flushes_go_to_primary(self, routed):
+        session, factory = routed
+        with read_replica(session):
+            session.add(User(telegram_id=4))
+            assert session.query(User).filter_by(telegram_id=4).first() is not None
+            session.commit()
+
+        assert factory().query(User).filter_by(telegram_id=4).count() == 1
+
+    def test_interaction_checks_stay_on_primary(self, routed):
+        session, _ = routed
+        primary = session.get_bind()
+        seed = sessionmaker(bind=primary)()
+        for telegram_id in (10, 11):
+            user = User(telegram_id=telegram_id)
+            seed.add(user)
+            seed.flush()
+            seed.add(Profile(user_id=user.id, name="x", age=30, gender="Мужской", location="Москва"))
+        seed.flush()
+        first, second = seed.query(Profile).order_by(Profile.id).all()
+        seed.add(Interaction(from_profile_id=first.id, to_profile_id=second.id, type="like"))
+        seed.commit()
+
+        with read_replica(session):
+            assert RatingService.interacted_among(session, first.id, [second.id]) == {second.id}
+        seed.close()
+
+    def test_without_replicas_everything_uses_primary(self, routed):
+        session, _ = routed
+        plain = sessionmaker(bind=session.get_bind(), class_=RoutingSession)()
+
+        assert find_user_id(plain, 2) is None
+        plain.close()
+
+    def test_aggregates_for_write_back_read_the_primary(self, routed):
+        session, _ = routed
+        replica = session.replicas[0]
+        seed = sessionmaker(bind=replica)()
+        seed.add(Interaction(from_profile_id=1, to_profile_id=2, type="like"))
+        seed.commit()
+        seed.close()
+
+        assert StatsService.collect_interaction_aggregates(session, [2])[2]["likes_received"] == 0
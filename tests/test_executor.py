@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.executor import BlockingExecutor
+from app.models.database import Base
+
+
+@pytest.fixture
+def executor():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    executor = BlockingExecutor(sessionmaker(bind=engine), max_workers=4, max_queue=8)
+
+    yield executor
+
+    executor.shutdown()
+    engine.dispose()
+
+
+async def max_loop_lag(work, interval=0.01):
+    """Largest delay of a periodic tick while the work runs"""
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal lag
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(lag, time.perf_counter() - started - interval)
+
+    ticker = asyncio.create_task(heartbeat())
+    try:
+        result = await work
+    finally:
+        done.set()
+        await ticker
+    return result, lag
+
+
+class TestBlockingExecutor:
+
+    @pytest.mark.asyncio
+    async def test_call_runs_on_worker_with_thread_session(self, executor):
+        def service_call(session, value):
+            return threading.current_thread().name, session.get_bind().dialect.name, value
+
+        thread_name, dialect, value = await executor.run(service_call, 7)
+
+        assert thread_name.startswith("blocking")
+        assert (dialect, value) == ("sqlite", 7)
+        assert executor.stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_session_is_released_after_each_call(self, executor):
+        sessions = []
+
+        def failing_call(session):
+            sessions.append(session)
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await executor.run(failing_call)
+        await executor.run(lambda session: sessions.append(session))
+
+        assert sessions[0] is not sessions[1]
+        assert executor.stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive_during_slow_calls(self, executor):
+        def slow_query(session):
+            time.sleep(0.2)
+            return True
+
+        results, lag = await max_loop_lag(asyncio.gather(*(executor.run(slow_query) for _ in range(8))))
+
+        assert all(results)
+        assert lag < 0.1
+
+    @pytest.mark.asyncio
+    async def test_queue_depth_is_tracked(self, executor):
+        await asyncio.gather(*(executor.run(lambda session: time.sleep(0.05)) for _ in range(10)))
+
+        stats = executor.stats()
+        assert stats["completed"] == 10
+        assert stats["max_queue_depth"] > 4
+        assert stats["queued"] == 0
+        assert stats["wait_max_ms"] > 0
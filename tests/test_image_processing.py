@@ -0,0 +1,66 @@
+import io
+import pytest
+from PIL import Image
+from app.core.image_processing import ImageProcessingError, process_photo
+
+VARIANTS = {"main": 1280, "medium": 640, "small": 200}
+
+
+def make_photo(size=(3000, 2000), image_format="JPEG", mode="RGB", orientation=None):
+    image = Image.new(mode, size, (200, 100, 50, 0) if mode == "RGBA" else (200, 100, 50))
+    output = io.BytesIO()
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        exif[0x010F] = "Camera"
+        image.save(output, image_format, exif=exif.tobytes())
+    else:
+        image.save(output, image_format)
+    return output.getvalue()
+
+
+def decode(variant):
+    return Image.open(io.BytesIO(variant["data"]))
+
+
+class TestImageProcessing:
+
+    def test_variants_are_bounded_and_keep_aspect_ratio(self):
+        variants = process_photo(make_photo(), VARIANTS, "jpeg", 85)
+
+        sizes = {name: (variant["width"], variant["height"]) for name, variant in variants.items()}
+        assert sizes == {"main": (1280, 853), "medium": (640, 427), "small": (200, 133)}
+        for variant in variants.values():
+            assert decode(variant).size == (variant["width"], variant["height"])
+            assert variant["content_type"] == "image/jpeg" and variant["extension"] == "jpg"
+
+    def test_small_originals_are_not_upscaled(self):
+        variants = process_photo(make_photo((300, 400)), VARIANTS, "jpeg", 85)
+
+        assert (variants["main"]["width"], variants["main"]["height"]) == (300, 400)
+        assert (variants["small"]["width"], variants["small"]["height"]) == (150, 200)
+
+    def test_jpeg_is_progressive_without_exif(self):
+        variants = process_photo(make_photo(orientation=1), VARIANTS, "jpeg", 85)
+
+        image = decode(variants["main"])
+        assert image.info.get("progressive") or image.info.get("progression")
+        assert "exif" not in image.info
+        assert not image.getexif()
+
+    def test_orientation_is_applied_before_exif_is_dropped(self):
+        variants = process_photo(make_photo((400, 200), orientation=6), VARIANTS, "jpeg", 85)
+
+        assert (variants["main"]["width"], variants["main"]["height"]) == (200, 400)
+
+    def test_webp_with_transparency_is_flattened(self):
+        variants = process_photo(make_photo((100, 100), "PNG", "RGBA"), VARIANTS, "webp", 80)
+
+        image = decode(variants["small"])
+        assert image.format == "WEBP" and image.mode == "RGB"
+        assert image.getpixel((50, 50)) == pytest.approx((255, 255, 255), abs=2)
+        assert variants["small"]["content_type"] == "image/webp"
+
+    def test_not_an_image(self):
+        with pytest.raises(ImageProcessingError):
+            process_photo(b"definitely not a photo", VARIANTS, "jpeg", 85)
@@ -0,0 +1,360 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.services import matching_service as matching_module
+from app.services.matching_service import MatchingService
+from app.services.rating_service import RatingService
+from app.services.inbox_service import InboxService
+from app.models import *
+from tests.test_rating_service import create_profiles
+
+
+def make_matching_service(redis_client, monkeypatch, scheduled=None):
+    service = MatchingService()
+    service.redis_client = redis_client
+    monkeypatch.setattr(matching_module.preload_profiles, "delay",
+                        lambda user_id: scheduled.append(user_id) if scheduled is not None else None)
+    return service
+
+
+class TestSwipeDeck:
+
+    def test_empty_deck_is_filled_synchronously(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 40)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer = profiles[0]
+        viewer.preferred_gender = viewer.preferred_age_min = viewer.preferred_age_max = None
+        isolated_session.commit()
+        service = make_matching_service(redis_client, monkeypatch)
+
+        expected = [p["id"] for p in RatingService.get_ranked_page(isolated_session, viewer.id, 30)["profiles"]]
+        first = service.next_from_deck(isolated_session, viewer.user_id)
+
+        assert len(expected) == 30
+        assert first == expected[0]
+        assert redis_client.get_deck(viewer.user_id) == expected[1:]
+
+    def test_swipes_pop_in_order_without_ranking(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 10)
+        viewer = profiles[0]
+        service = make_matching_service(redis_client, monkeypatch)
+        redis_client.push_deck(viewer.user_id, [profiles[3].id, profiles[5].id])
+        monkeypatch.setattr(RatingService, "get_ranked_page",
+                            lambda *args, **kwargs: pytest.fail("swipe served from deck must not rank"))
+
+        assert service.next_from_deck(isolated_session, viewer.user_id) == profiles[3].id
+        assert service.next_from_deck(isolated_session, viewer.user_id) == profiles[5].id
+
+    def test_low_water_schedules_single_refill(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 20)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer = profiles[0]
+        scheduled = []
+        service = make_matching_service(redis_client, monkeypatch, scheduled)
+        redis_client.push_deck(viewer.user_id, [p.id for p in profiles[1:6]])
+
+        service.next_from_deck(isolated_session, viewer.user_id)
+        service.next_from_deck(isolated_session, viewer.user_id)
+
+        assert scheduled == [viewer.user_id]
+
+        service.refill_deck(isolated_session, viewer.user_id, size=10)
+        queued = redis_client.get_deck(viewer.user_id)
+        assert len(queued) == len(set(queued))
+        assert viewer.id not in queued
+
+    def test_refills_continue_after_cursor(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 40)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer = profiles[0]
+        viewer.preferred_gender = viewer.preferred_age_min = viewer.preferred_age_max = None
+        isolated_session.commit()
+        service = make_matching_service(redis_client, monkeypatch)
+        ranking = [p["id"] for p in RatingService.get_ranked_page(isolated_session, viewer.id, 100)["profiles"]]
+
+        first = service.refill_deck(isolated_session, viewer.user_id, size=10)
+        for _ in first:
+            redis_client.pop_deck(viewer.user_id)
+        second = service.refill_deck(isolated_session, viewer.user_id, size=10)
+
+        assert first + second == ranking[:20]
+
+    def test_refill_reads_pools_and_seen_filter(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 40)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer = profiles[0]
+        viewer.preferred_gender = viewer.preferred_age_min = viewer.preferred_age_max = None
+        isolated_session.commit()
+        service = make_matching_service(redis_client, monkeypatch)
+        service.candidate_pool.rebuild(isolated_session)
+        ranking = [p["id"] for p in RatingService.get_ranked_page(isolated_session, viewer.id, 100)["profiles"]]
+        service.skip_profile(isolated_session, viewer.id, ranking[0])
+        service.like_profile(isolated_session, viewer.id, ranking[2])
+        redis_client.push_deck(viewer.user_id, [ranking[1]])
+        monkeypatch.setattr(RatingService, "get_ranked_page",
+                            lambda *args, **kwargs: pytest.fail("refill with built pools must not page SQL"))
+
+        refilled = service.refill_deck(isolated_session, viewer.user_id, size=6)
+
+        assert refilled == ranking[3:8]
+        assert service.seen_filter.is_built(viewer.id)
+        assert redis_client.get_deck(viewer.user_id) == [ranking[1]] + refilled
+
+    def test_refill_caches_the_new_cards(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 10)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer = profiles[0]
+        viewer.preferred_gender = viewer.preferred_age_min = viewer.preferred_age_max = None
+        isolated_session.commit()
+        service = make_matching_service(redis_client, monkeypatch)
+
+        refilled = service.refill_deck(isolated_session, viewer.user_id, size=5)
+        counter = count_statements(isolated_session)
+        cards = [service.profile_service.get_profile(isolated_session, profile_id) for profile_id in refilled]
+
+        assert len(refilled) == 5
+        assert [card["id"] for card in cards] == refilled
+        assert counter["statements"] == 0
+
+    def test_helpers_are_built_once_per_client(self, redis_client, monkeypatch):
+        service = make_matching_service(redis_client, monkeypatch)
+        helpers = (service.seen_filter, service.candidate_pool, service.profile_service)
+
+        assert (service.seen_filter, service.candidate_pool, service.profile_service) == helpers
+        assert service.profile_service.redis_client is redis_client
+
+        service.redis_client = other_client = type(redis_client)()
+        assert service.seen_filter is not helpers[0]
+        assert service.profile_service.redis_client is other_client
+
+    def test_only_the_background_refill_releases_the_lock(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 10)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer = profiles[0]
+        scheduled = []
+        service = make_matching_service(redis_client, monkeypatch, scheduled)
+        monkeypatch.setattr(matching_module, "get_matching_service", lambda: service)
+        monkeypatch.setattr(matching_module, "Session", lambda: isolated_session)
+
+        assert service.schedule_deck_refill(viewer.user_id)
+        service.next_from_deck(isolated_session, viewer.user_id)
+        assert not service.schedule_deck_refill(viewer.user_id)
+
+        matching_module.preload_profiles(viewer.user_id)
+        assert service.schedule_deck_refill(viewer.user_id)
+        assert scheduled == [viewer.user_id, viewer.user_id]
+
+    def test_already_seen_profiles_are_skipped(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 10)
+        viewer = profiles[0]
+        service = make_matching_service(redis_client, monkeypatch)
+        redis_client.push_deck(viewer.user_id, [profiles[1].id, profiles[2].id])
+        service.skip_profile(isolated_session, viewer.id, profiles[1].id)
+
+        assert service.next_from_deck(isolated_session, viewer.user_id) == profiles[2].id
+
+    def test_seen_refill_is_not_served(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 5)
+        viewer = profiles[0]
+        service = make_matching_service(redis_client, monkeypatch)
+        for other in profiles[1:4]:
+            service.skip_profile(isolated_session, viewer.id, other.id)
+        refill_ids = [p.id for p in profiles[1:4]]
+
+        def stale_refill(session, user_id):
+            redis_client.push_deck(user_id, refill_ids)
+            return refill_ids
+
+        monkeypatch.setattr(service, "refill_deck", stale_refill)
+        assert service.next_from_deck(isolated_session, viewer.user_id) is None
+
+        # Deck not stored: the refill is served directly, still without seen profiles
+        monkeypatch.setattr(service, "refill_deck", lambda session, user_id: refill_ids + [profiles[4].id])
+        assert service.next_from_deck(isolated_session, viewer.user_id) == profiles[4].id
+
+    def test_profile_changes_clear_deck(self, redis_client):
+        redis_client.push_deck(1, [2, 3])
+        redis_client.delete_profile_list(1)
+
+        assert redis_client.get_deck(1) == []
+
+
+def create_matches(session, viewer, others):
+    for index, other in enumerate(others):
+        match = Match(profile_id_1=viewer.id if index % 2 else other.id,
+                      profile_id_2=other.id if index % 2 else viewer.id,
+                      status="active", created_at=datetime(2024, 1, 1) + timedelta(minutes=index))
+        session.add(match)
+        session.flush()
+        InboxService.add_match(session, match)
+        for minute in range(index % 3):
+            message = Message(match_id=match.id, sender_id=other.id, content=f"message {minute}",
+                              created_at=match.created_at + timedelta(seconds=minute + 1))
+            session.add(message)
+            session.flush()
+            InboxService.record_message(session, message)
+        session.add(Photo(profile_id=other.id, s3_path=f"photos/{other.id}/a.jpg", is_main=False))
+        session.add(Photo(profile_id=other.id, s3_path=f"photos/{other.id}/main.jpg", is_main=True))
+    session.commit()
+
+
+def count_statements(session):
+    counter = {"statements": 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    event.listen(session.get_bind(), "before_cursor_execute", _count)
+    return counter
+
+
+class TestMatchListing:
+
+    def test_listing_returns_summary_photo_and_last_message(self, isolated_session):
+        profiles = create_profiles(isolated_session, 4)
+        viewer = profiles[0]
+        create_matches(isolated_session, viewer, profiles[1:])
+
+        matches = MatchingService().get_matches(isolated_session, viewer.id)
+
+        assert [m["other_profile"]["id"] for m in matches] == [p.id for p in reversed(profiles[1:])]
+        newest = matches[0]
+        assert newest["last_message"]["content"] == "message 1"
+        assert newest["main_photo"]["s3_path"] == f"photos/{profiles[3].id}/main.jpg"
+        assert newest["other_profile"]["username"] == "user3"
+        assert matches[-1]["last_message"] is None
+
+    def test_round_trips_do_not_grow_with_matches(self, isolated_session):
+        profiles = create_profiles(isolated_session, 60)
+        viewer = profiles[0]
+        matching_service = MatchingService()
+        counter = count_statements(isolated_session)
+
+        viewer_id = viewer.id
+
+        create_matches(isolated_session, viewer, profiles[1:4])
+        counter["statements"] = 0
+        assert len(matching_service.get_matches(isolated_session, viewer_id)) == 3
+        few = counter["statements"]
+
+        create_matches(isolated_session, viewer, profiles[4:])
+        counter["statements"] = 0
+        assert len(matching_service.get_matches(isolated_session, viewer_id)) == 59
+        assert counter["statements"] == few == 1
+
+    def test_cursor_pages_cover_all_matches(self, isolated_session):
+        profiles = create_profiles(isolated_session, 12)
+        viewer = profiles[0]
+        create_matches(isolated_session, viewer, profiles[1:])
+        matching_service = MatchingService()
+
+        paged = []
+        cursor = None
+        while True:
+            page = matching_service.get_matches_page(isolated_session, viewer.id, limit=4, cursor=cursor)
+            paged.extend(m["match_id"] for m in page["matches"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert paged == [m["match_id"] for m in matching_service.get_matches(isolated_session, viewer.id)]
+        assert matching_service.count_matches(isolated_session, viewer.id) == 11
+
+    def test_messages_move_match_to_top_and_count_unread(self, isolated_session):
+        profiles = create_profiles(isolated_session, 4)
+        viewer = profiles[0]
+        create_matches(isolated_session, viewer, profiles[1:])
+        matching_service = MatchingService()
+        oldest = matching_service.get_matches(isolated_session, viewer.id)[-1]
+
+        result = matching_service.send_message(isolated_session, oldest["match_id"], profiles[1].id, "привет")
+        assert result["success"]
+
+        matches = matching_service.get_matches(isolated_session, viewer.id)
+        assert matches[0]["match_id"] == oldest["match_id"]
+        assert matches[0]["unread_count"] == 1
+        assert matches[0]["last_message"]["content"] == "привет"
+        assert not matches[0]["last_message"]["is_read"]
+        other_side = matching_service.get_matches(isolated_session, profiles[1].id)[0]
+        assert other_side["unread_count"] == 0
+        assert not other_side["last_message"]["is_read"]
+
+        assert matching_service.mark_messages_read(isolated_session, oldest["match_id"], viewer.id)
+        assert matching_service.get_matches(isolated_session, viewer.id)[0]["unread_count"] == 0
+        assert matching_service.get_matches(isolated_session, viewer.id)[0]["last_message"]["is_read"]
+        assert matching_service.get_matches(isolated_session, profiles[1].id)[0]["last_message"]["is_read"]
+
+    def test_send_message_rejects_non_participants(self, isolated_session):
+        profiles = create_profiles(isolated_session, 4)
+        create_matches(isolated_session, profiles[0], profiles[1:2])
+        match_id = MatchingService().get_matches(isolated_session, profiles[0].id)[0]["match_id"]
+
+        assert not MatchingService().send_message(isolated_session, match_id, profiles[3].id, "hi")["success"]
+
+    def test_like_match_and_archiving_update_inbox(self, isolated_session, redis_client):
+        first, second = create_profiles(isolated_session, 2)
+        matching_service = MatchingService()
+        matching_service.redis_client = redis_client
+
+        matching_service.like_profile(isolated_session, first.id, second.id)
+        result = matching_service.like_profile(isolated_session, second.id, first.id)
+
+        assert [m["match_id"] for m in matching_service.get_matches(isolated_session, first.id)] == [result["match_id"]]
+        assert matching_service.count_matches(isolated_session, second.id) == 1
+
+        InboxService.set_status(isolated_session, [result["match_id"]], "archived")
+        isolated_session.commit()
+        assert matching_service.get_matches(isolated_session, first.id) == []
+
+
+class TestMatchArchiving:
+
+    def test_archives_stale_matches_in_batches(self, isolated_session):
+        profiles = create_profiles(isolated_session, 10)
+        viewer = profiles[0]
+        create_matches(isolated_session, viewer, profiles[1:])
+        matches = isolated_session.query(Match).order_by(Match.id).all()
+        matches[0].initiated_chat = True
+        matches[1].created_at = datetime(2030, 1, 1)
+        isolated_session.commit()
+        commits = []
+        event.listen(isolated_session, "after_commit", lambda session: commits.append(1))
+
+        result = MatchingService().archive_inactive_matches(isolated_session, datetime(2025, 1, 1), batch_size=3)
+
+        assert result == {"archived_count": 7, "batches": 3}
+        assert len(commits) == 3
+        statuses = dict(isolated_session.query(Match.id, Match.status).all())
+        assert statuses[matches[0].id] == statuses[matches[1].id] == "active"
+        assert MatchingService().count_matches(isolated_session, viewer.id) == 2
+
+    def test_chat_started_during_batch_keeps_inbox_row(self, isolated_session):
+        profiles = create_profiles(isolated_session, 4)
+        viewer = profiles[0]
+        create_matches(isolated_session, viewer, profiles[1:])
+        started_id = isolated_session.query(Match.id).order_by(Match.id).first()[0]
+        flipped = []
+
+        def start_chat_after_select(conn, cursor, statement, parameters, context, executemany):
+            if not flipped and statement.startswith("SELECT matches.id"):
+                flipped.append(started_id)
+                conn.exec_driver_sql("UPDATE matches SET initiated_chat = 1 WHERE id = ?", (started_id,))
+
+        event.listen(isolated_session.get_bind(), "after_cursor_execute", start_chat_after_select)
+        result = MatchingService().archive_inactive_matches(isolated_session, datetime(2025, 1, 1))
+        event.remove(isolated_session.get_bind(), "after_cursor_execute", start_chat_after_select)
+
+        assert flipped and result["archived_count"] == 2
+        inbox = dict(isolated_session.query(MatchInbox.match_id, MatchInbox.status).filter_by(profile_id=viewer.id))
+        assert inbox[started_id] == "active"
+        assert [m["match_id"] for m in MatchingService().get_matches(isolated_session, viewer.id)] == [started_id]
+
+    def test_rerun_archives_nothing(self, isolated_session):
+        profiles = create_profiles(isolated_session, 4)
+        create_matches(isolated_session, profiles[0], profiles[1:])
+        matching_service = MatchingService()
+
+        assert matching_service.archive_inactive_matches(isolated_session, datetime(2025, 1, 1))["archived_count"] == 3
+        assert matching_service.archive_inactive_matches(isolated_session, datetime(2025, 1, 1)) == {
+            "archived_count": 0, "batches": 0
+        }
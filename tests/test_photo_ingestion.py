@@ -0,0 +1,127 @@
+import pytest
+from app.core import config
+from app.core.redis_client import DIRTY_PROFILES_KEY
+from app.services import profile_service as profile_module
+from app.services.profile_service import ProfileService
+from app.services.user_service import UserService
+from app.models import *
+from tests.test_rating_service import create_profiles
+from tests.test_profile_cache import StubS3Client
+from tests.test_image_processing import make_photo
+
+
+class RecordingS3Client(StubS3Client):
+    def __init__(self):
+        self.uploads = []
+        self.deleted = []
+
+    def upload_photo_variants(self, variants):
+        self.uploads.append(variants)
+        return {name: f"photos/{len(self.uploads)}/{name}.jpg" for name in variants}
+
+    def delete_photo(self, file_path):
+        self.deleted.append(file_path)
+        return True
+
+
+@pytest.fixture
+def ingestion(monkeypatch, isolated_session, redis_client, profile_summary_cache):
+    service = ProfileService(redis_client, RecordingS3Client())
+    queued = []
+    monkeypatch.setattr(profile_module.ingest_photo, "delay", queued.append)
+    monkeypatch.setattr(profile_module, "get_profile_service", lambda: service)
+    monkeypatch.setattr(profile_module, "Session", lambda: isolated_session)
+    profile = create_profiles(isolated_session, 1)[0]
+    return service, profile, queued
+
+
+class TestPhotoIngestion:
+
+    def test_photo_is_recorded_pending_and_queued(self, isolated_session, ingestion):
+        service, profile, queued = ingestion
+        photo_count = profile.photo_count
+
+        result = service.record_photo(isolated_session, profile.id, "file-1", "unique-1", is_main=True)
+
+        assert result["success"] and result["created"] and result["queued"]
+        assert result["status"] == "pending"
+        assert queued == [result["photo_id"]]
+        assert service.s3_client.uploads == []
+        summary = UserService.get_user_profile(isolated_session, profile.user.telegram_id)
+        assert [photo["status"] for photo in summary["photos"]] == ["pending"]
+        assert summary["photo_count"] == photo_count
+
+    def test_same_file_is_recorded_once(self, isolated_session, ingestion):
+        service, profile, queued = ingestion
+        first = service.record_photo(isolated_session, profile.id, "file-1", "unique-1")
+        service.ingest_photo(isolated_session, first["photo_id"], download=lambda file_id: make_photo())
+
+        again = service.record_photo(isolated_session, profile.id, "file-1-resent", "unique-1", is_main=True)
+
+        assert again["photo_id"] == first["photo_id"]
+        assert (again["created"], again["queued"], again["status"]) == (False, False, "ready")
+        assert isolated_session.query(Photo).filter_by(profile_id=profile.id).count() == 1
+        assert isolated_session.query(Photo).one().is_main
+
+    def test_ingestion_uploads_and_refreshes_rating(self, isolated_session, ingestion, redis_client):
+        service, profile, _ = ingestion
+        photo_count = profile.photo_count
+        photo_id = service.record_photo(isolated_session, profile.id, "file-1", "unique-1")["photo_id"]
+        downloads = []
+
+        result = service.ingest_photo(isolated_session, photo_id, download=lambda file_id: downloads.append(file_id) or make_photo())
+        repeated = service.ingest_photo(isolated_session, photo_id, download=downloads.append)
+
+        assert result == {"success": True, "photo_id": photo_id, "s3_path": "photos/1/main.jpg"}
+        assert repeated["skipped"] and downloads == ["file-1"]
+        assert service.get_photo_status(isolated_session, photo_id)["status"] == "ready"
+        photo = isolated_session.get(Photo, photo_id)
+        assert (photo.medium_s3_path, photo.small_s3_path) == ("photos/1/medium.jpg", "photos/1/small.jpg")
+        assert (photo.width, photo.height) == (1280, 853)
+        assert service.get_photos(isolated_session, profile.id)[0]["variants"]["small"].endswith("/small.jpg")
+        isolated_session.refresh(profile)
+        assert profile.photo_count == photo_count + 1
+        assert redis_client.client.sismember(DIRTY_PROFILES_KEY, profile.id)
+
+    def test_invalid_image_fails_without_retry(self, isolated_session, ingestion):
+        service, profile, _ = ingestion
+        photo_id = service.record_photo(isolated_session, profile.id, "file-1", "unique-1")["photo_id"]
+
+        result = service.ingest_photo(isolated_session, photo_id, download=lambda file_id: b"not an image")
+
+        assert (result["success"], result["retryable"]) == (False, False)
+        assert service.get_photo_status(isolated_session, photo_id)["status"] == "failed"
+        assert service.s3_client.uploads == []
+
+    def test_failed_photo_is_not_cached_as_pending(self, isolated_session, ingestion):
+        service, profile, _ = ingestion
+        telegram_id = profile.user.telegram_id
+        photo_id = service.record_photo(isolated_session, profile.id, "file-1", "unique-1")["photo_id"]
+        assert service.get_profile(isolated_session, profile.id)["photos"][0]["status"] == "pending"
+        assert UserService.get_user_profile(isolated_session, telegram_id)["photos"][0]["status"] == "pending"
+
+        assert service.mark_photo_failed(isolated_session, photo_id)
+
+        assert service.get_profile(isolated_session, profile.id)["photos"][0]["status"] == "failed"
+        assert UserService.get_user_profile(isolated_session, telegram_id)["photos"][0]["status"] == "failed"
+
+    def test_task_retries_then_marks_photo_failed(self, isolated_session, ingestion, monkeypatch):
+        service, profile, _ = ingestion
+        profile_id = profile.id
+        photo_id = service.record_photo(isolated_session, profile_id, "file-1", "unique-1")["photo_id"]
+        attempts = []
+
+        def unavailable(file_id):
+            attempts.append(file_id)
+            raise ConnectionError("Telegram is unavailable")
+
+        monkeypatch.setattr(profile_module, "download_telegram_file", unavailable)
+
+        profile_module.ingest_photo.apply(args=[photo_id])
+
+        status = service.get_photo_status(isolated_session, photo_id)
+        assert len(attempts) == status["attempts"] == config.PHOTO_INGEST_MAX_RETRIES + 1
+        assert status["status"] == "failed"
+
+        retried = service.record_photo(isolated_session, profile_id, "file-1", "unique-1")
+        assert (retried["status"], retried["queued"]) == ("pending", True)
@@ -0,0 +1,106 @@
+import pytest
+from app.core.profile_cache import ProfileSummaryCache
+from app.services.profile_service import ProfileService
+from app.services.user_service import UserService
+from app.models import *
+from tests.test_rating_service import create_profiles
+from tests.test_matching_service import count_statements
+from tests.test_image_processing import make_photo
+
+
+class StubS3Client:
+    def upload_photo(self, photo_data):
+        return "photos/stub.jpg"
+
+    def upload_photo_variants(self, variants):
+        return {name: f"photos/stub/{name}.{variant['extension']}" for name, variant in variants.items()}
+
+    def get_photo_url(self, s3_path):
+        return f"http://s3/{s3_path}"
+
+
+@pytest.fixture
+def profile_service(redis_client):
+    return ProfileService(redis_client, StubS3Client())
+
+
+class TestProfileSummaryCache:
+
+    def test_repeat_lookups_skip_database(self, isolated_session, profile_summary_cache):
+        profile = create_profiles(isolated_session, 1)[0]
+        telegram_id = profile.user.telegram_id
+        counter = count_statements(isolated_session)
+
+        first = UserService.get_user_profile(isolated_session, telegram_id)
+        queries = counter["statements"]
+        second = UserService.get_user_profile(isolated_session, telegram_id)
+
+        assert first == second and first["profile_id"] == profile.id
+        assert queries == 3
+        assert counter["statements"] == queries
+        stats = profile_summary_cache.stats()
+        assert (stats["misses"], stats["local_hits"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+    def test_redis_serves_other_processes(self, isolated_session, profile_summary_cache):
+        profile = create_profiles(isolated_session, 1)[0]
+        telegram_id = profile.user.telegram_id
+        expected = UserService.get_user_profile(isolated_session, telegram_id)
+
+        profile_summary_cache.clear_local()
+
+        assert UserService.get_user_profile(isolated_session, telegram_id) == expected
+        assert profile_summary_cache.stats()["redis_hits"] == 1
+
+    def test_local_entries_expire_and_are_bounded(self, redis_client):
+        cache = ProfileSummaryCache(redis_client, local_ttl=60, local_size=2)
+        for telegram_id in (1, 2, 3):
+            cache.set(telegram_id, {"user_id": telegram_id})
+
+        assert cache.stats()["local_size"] == 2
+        assert cache.get(1) == {"user_id": 1}
+        assert cache.stats()["redis_hits"] == 1
+
+        expiring = ProfileSummaryCache(redis_client, local_ttl=0)
+        expiring.set(4, {"user_id": 4})
+        assert expiring.get(4) == {"user_id": 4}
+        assert expiring.stats()["local_hits"] == 0
+
+    def test_callers_get_their_own_copy(self, redis_client):
+        cache = ProfileSummaryCache(redis_client)
+        cache.set(1, {"photos": []})
+
+        cache.get(1)["photos"].append("changed")
+
+        assert cache.get(1) == {"photos": []}
+
+    def test_profile_writes_invalidate_summary(self, isolated_session, profile_service, profile_summary_cache):
+        user = UserService.get_or_create_user(isolated_session, 4242, "cached")
+        assert UserService.get_user_profile(isolated_session, 4242) == {"has_profile": False, "user_id": user.id}
+
+        profile = profile_service.create_profile(isolated_session, user.id, {
+            "name": "Анна", "age": 25, "gender": "Женский", "location": "Москва"
+        })
+        assert UserService.get_user_profile(isolated_session, 4242)["name"] == "Анна"
+
+        profile_service.update_profile(isolated_session, profile.id, {"name": "Мария"})
+        assert UserService.get_user_profile(isolated_session, 4242)["name"] == "Мария"
+
+        profile_service.add_photo(isolated_session, profile.id, make_photo(), is_main=True)
+        summary = UserService.get_user_profile(isolated_session, 4242)
+        assert summary["photo_count"] == 1 and len(summary["photos"]) == 1
+        assert profile_summary_cache.stats()["invalidations"] == 3
+
+    def test_reader_cannot_cache_summary_loaded_before_a_write(self, isolated_session, profile_service,
+                                                               profile_summary_cache):
+        profile = create_profiles(isolated_session, 1)[0]
+        telegram_id = profile.user.telegram_id
+        cached, generation = profile_summary_cache.lookup(telegram_id)
+        stale = UserService._load_user_profile(isolated_session, telegram_id)
+
+        profile_service.update_profile(isolated_session, profile.id, {"name": "Мария"})
+        profile_summary_cache.set(telegram_id, stale, generation)
+
+        assert cached is None
+        assert profile_summary_cache.get(telegram_id) is None
+        assert UserService.get_user_profile(isolated_session, telegram_id)["name"] == "Мария"
+
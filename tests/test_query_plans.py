@@ -0,0 +1,134 @@
+import os
+import re
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models import *
+from app.models.database import Base
+from app.services.candidate_pool_service import CandidatePoolService
+from app.services.matching_service import MatchingService
+from app.services.rating_service import RatingService
+from app.services.stats_service import StatsService
+from tests.test_rating_service import create_profiles, create_activity
+
+# Tables that grow with user activity; a full scan of any of them on a request path is a regression
+HOT_TABLES = ("interactions", "matches", "messages", "photos", "profile_stats", "match_inbox")
+
+
+@contextmanager
+def captured_statements(engine):
+    """Collect the SELECT/UPDATE/DELETE statements and parameters issued on the engine"""
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+
+
+def full_scans(engine, statement, parameters):
+    """Plan lines that read a hot table without an index"""
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET enable_seqscan = off")
+            plan = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+            pattern = re.compile(r"Seq Scan on (\w+)")
+        else:
+            plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            pattern = re.compile(r"^SCAN (\w+)(?!.*INDEX)|AUTOMATIC .*INDEX ON (\w+)")
+
+    offending = []
+    for line in plan:
+        match = pattern.search(line)
+        if match and any(table and table.startswith(HOT_TABLES) for table in match.groups()):
+            offending.append(line)
+    return offending
+
+
+def assert_indexed(engine, statements):
+    assert statements, "no statements were captured"
+    regressions = []
+    for statement, parameters in statements:
+        for line in full_scans(engine, statement, parameters):
+            regressions.append(f"{line}\n    in: {' '.join(statement.split())}")
+    assert not regressions, "queries fall back to full scans:\n" + "\n".join(regressions)
+
+
+@pytest.fixture
+def plan_session():
+    """Session on EXPLAIN_DATABASE_URL (e.g. a local Postgres) or a SQLite stand-in"""
+    database_url = os.getenv("EXPLAIN_DATABASE_URL", "sqlite://")
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    yield session
+
+    session.close()
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def populated(plan_session, redis_client):
+    profiles = create_profiles(plan_session, 40)
+    create_activity(plan_session, profiles, interactions=200, matches=20)
+    RatingService.update_ratings_bulk(plan_session)
+    CandidatePoolService(redis_client).rebuild(plan_session)
+
+    matching_service = MatchingService()
+    matching_service.redis_client = redis_client
+    return plan_session, profiles, matching_service
+
+
+class TestQueryPlans:
+
+    def test_harness_detects_full_scan(self, plan_session):
+        engine = plan_session.get_bind()
+        with captured_statements(engine) as statements:
+            plan_session.query(Interaction).filter(Interaction.created_at.isnot(None)).all()
+
+        assert full_scans(engine, *statements[0])
+
+    def test_matching_service_queries_use_indexes(self, populated, monkeypatch):
+        session, profiles, matching_service = populated
+        viewer, other, third = profiles[:3]
+        monkeypatch.setattr(matching_service, "schedule_deck_refill", lambda user_id: False)
+
+        with captured_statements(session.get_bind()) as statements:
+            matching_service.like_profile(session, viewer.id, other.id)
+            matching_service.like_profile(session, other.id, viewer.id)
+            matching_service.skip_profile(session, viewer.id, third.id)
+            matching_service.get_matches(session, viewer.id)
+            matching_service.get_next_profiles(session, viewer.user_id)
+            matching_service.next_from_deck(session, viewer.user_id)
+
+            match = session.query(Match).filter_by(profile_id_1=other.id, profile_id_2=viewer.id).first()
+            matching_service.mark_chat_initiated(session, match.id)
+            matching_service.send_message(session, match.id, viewer.id, "привет")
+            matching_service.mark_messages_read(session, match.id, other.id)
+            matching_service.get_matches_page(session, other.id, limit=5)
+
+        assert_indexed(session.get_bind(), statements)
+
+    def test_rating_service_queries_use_indexes(self, populated):
+        session, profiles, matching_service = populated
+        viewer = profiles[0]
+
+        with captured_statements(session.get_bind()) as statements:
+            RatingService.get_ranked_profiles(session, viewer.id, 10, use_pool=False)
+            page = RatingService.get_ranked_page(session, viewer.id, 5)
+            RatingService.get_ranked_page(session, viewer.id, 5, page["next_cursor"])
+            RatingService.interacted_among(session, viewer.id, [p.id for p in profiles[1:10]])
+            RatingService.update_profile_rating(session, profiles[1].id)
+            StatsService.increment(session, profiles[2].id, total_views=1)
+            StatsService.collect_interaction_aggregates(session, [p.id for p in profiles[:5]])
+
+        assert_indexed(session.get_bind(), statements)
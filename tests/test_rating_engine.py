@@ -0,0 +1,72 @@
+import numpy as np
+from hypothesis import given, settings, strategies as st
+from app.services.rating_engine import RatingEngine
+from app.services.rating_service import RatingService
+from app.models import *
+from tests.test_rating_service import create_profiles, create_activity
+
+profile_inputs = st.tuples(
+    st.floats(min_value=0.0, max_value=1.0, allow_nan=False),
+    st.integers(min_value=0, max_value=20),
+    st.booleans(),
+    st.integers(min_value=0, max_value=10_000),
+    st.integers(min_value=0, max_value=10_000),
+    st.integers(min_value=0, max_value=10_000),
+    st.integers(min_value=0, max_value=10_000)
+)
+
+
+def scalar_ratings(completeness, photo_count, has_preferences, likes, views, matches, chats):
+    primary = RatingService.primary_rating_from_inputs(completeness, photo_count, has_preferences)
+    behavioral = RatingService.behavioral_rating_from_counts(likes, views, matches, chats)
+    return primary, behavioral, RatingService.calculate_combined_rating(primary, behavioral)
+
+
+class TestRatingEngine:
+
+    @settings(max_examples=200, deadline=None)
+    @given(st.lists(profile_inputs, min_size=1, max_size=50))
+    def test_compute_matches_scalar_formulas_exactly(self, rows):
+        columns = list(zip(*rows))
+        inputs = {
+            "profile_completeness": np.array(columns[0], dtype=np.float64),
+            "photo_count": np.array(columns[1], dtype=np.int64),
+            "has_preferences": np.array(columns[2], dtype=bool),
+            "likes_received": np.array(columns[3], dtype=np.int64),
+            "total_views": np.array(columns[4], dtype=np.int64),
+            "matches_count": np.array(columns[5], dtype=np.int64),
+            "initiated_chats": np.array(columns[6], dtype=np.int64)
+        }
+
+        ratings = RatingEngine.compute(inputs)
+
+        for index, row in enumerate(rows):
+            primary, behavioral, combined = scalar_ratings(*row)
+            assert ratings["primary_rating"][index] == primary
+            assert ratings["behavioral_rating"][index] == behavioral
+            assert ratings["combined_rating"][index] == combined
+
+    def test_load_inputs_matches_per_profile_queries(self, isolated_session):
+        profiles = create_profiles(isolated_session, 25)
+        create_activity(isolated_session, profiles, interactions=200, matches=30)
+
+        inputs = RatingEngine.load_inputs(isolated_session)
+        ratings = RatingEngine.compute(inputs)
+
+        assert inputs["profile_id"].tolist() == sorted(p.id for p in profiles)
+        for index, profile_id in enumerate(inputs["profile_id"].tolist()):
+            primary = RatingService.calculate_primary_rating(isolated_session, profile_id)
+            behavioral = RatingService.calculate_behavioral_rating(isolated_session, profile_id)
+            assert ratings["primary_rating"][index] == primary
+            assert ratings["behavioral_rating"][index] == behavioral
+            assert ratings["combined_rating"][index] == RatingService.calculate_combined_rating(primary, behavioral)
+
+    def test_load_inputs_for_subset(self, isolated_session):
+        profiles = create_profiles(isolated_session, 10)
+        create_activity(isolated_session, profiles, interactions=80, matches=10)
+        subset = [profiles[7].id, profiles[2].id]
+
+        inputs = RatingEngine.load_inputs(isolated_session, subset)
+
+        assert inputs["profile_id"].tolist() == sorted(subset)
+        assert len(inputs["total_views"]) == 2
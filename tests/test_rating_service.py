@@ -0,0 +1,223 @@
+import random
+import pytest
+from app.services import rating_service as rating_module
+from app.services.rating_service import RatingService, collect_rating_shards
+from app.services.matching_service import MatchingService
+from app.models import *
+
+
+def create_profiles(session, count, seed=42):
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(count):
+        user = User(telegram_id=10_000 + i, username=f"user{i}")
+        session.add(user)
+        session.flush()
+
+        profile = Profile(
+            user_id=user.id,
+            name=f"User {i}",
+            age=rng.randint(18, 60),
+            gender=rng.choice(["Мужской", "Женский"]),
+            location=rng.choice(["Москва", "Казань"]),
+            preferred_age_min=rng.choice([None, 18, 25]),
+            preferred_age_max=rng.choice([None, 40, 60]),
+            preferred_gender=rng.choice([None, "Мужской", "Женский"]),
+            profile_completeness=rng.random(),
+            photo_count=rng.randint(0, 5)
+        )
+        session.add(profile)
+        profiles.append(profile)
+    session.commit()
+    return profiles
+
+
+def create_activity(session, profiles, interactions=300, matches=40, seed=42):
+    rng = random.Random(seed)
+    ids = [p.id for p in profiles]
+    for _ in range(interactions):
+        from_id, to_id = rng.sample(ids, 2)
+        session.add(Interaction(from_profile_id=from_id, to_profile_id=to_id,
+                                type=rng.choice(["like", "like", "skip"])))
+    for _ in range(matches):
+        first_id, second_id = rng.sample(ids, 2)
+        session.add(Match(profile_id_1=first_id, profile_id_2=second_id,
+                          initiated_chat=rng.random() < 0.5))
+    session.commit()
+
+
+class TestRatingService:
+
+    def test_bulk_update_matches_per_profile_update(self, isolated_session):
+        profiles = create_profiles(isolated_session, 30)
+        create_activity(isolated_session, profiles)
+
+        expected = {p.id: RatingService.update_profile_rating(isolated_session, p.id) for p in profiles}
+
+        isolated_session.query(Rating).update({
+            "primary_rating": 0.0,
+            "behavioral_rating": 0.0,
+            "combined_rating": 0.0
+        })
+        isolated_session.commit()
+
+        result = RatingService.update_ratings_bulk(isolated_session, chunk_size=7)
+
+        assert result == {"updated_count": 30, "total": 30, "failed_ids": []}
+        for rating in isolated_session.query(Rating).all():
+            assert rating.primary_rating == expected[rating.profile_id]["primary_rating"]
+            assert rating.behavioral_rating == expected[rating.profile_id]["behavioral_rating"]
+            assert rating.combined_rating == expected[rating.profile_id]["combined_rating"]
+
+    def test_bulk_update_creates_missing_ratings(self, isolated_session):
+        profiles = create_profiles(isolated_session, 5)
+
+        result = RatingService.update_ratings_bulk(isolated_session, [p.id for p in profiles[:3]])
+
+        assert result == {"updated_count": 3, "total": 3, "failed_ids": []}
+        rated_ids = {r.profile_id for r in isolated_session.query(Rating).all()}
+        assert rated_ids == {p.id for p in profiles[:3]}
+
+    def test_matching_actions_mark_profiles_dirty(self, isolated_session, redis_client):
+        first, second, third = create_profiles(isolated_session, 3)
+        matching_service = MatchingService()
+        matching_service.redis_client = redis_client
+
+        matching_service.like_profile(isolated_session, first.id, second.id)
+        matching_service.skip_profile(isolated_session, first.id, third.id)
+        matching_service.like_profile(isolated_session, second.id, first.id)
+
+        assert sorted(redis_client.pop_dirty_profiles(10)) == sorted([first.id, second.id, third.id])
+        assert redis_client.pop_dirty_profiles(10) == []
+
+    def test_refresh_dirty_ratings_recalculates_only_dirty_profiles(self, isolated_session, redis_client):
+        profiles = create_profiles(isolated_session, 6)
+        create_activity(isolated_session, profiles, interactions=40, matches=5)
+        dirty = [profiles[1].id, profiles[4].id]
+        redis_client.mark_profiles_dirty(dirty)
+
+        result = RatingService.refresh_dirty_ratings(isolated_session, redis_client, batch_size=1)
+
+        assert result == {"refreshed_count": 2, "batches": 2}
+        assert sorted(r.profile_id for r in isolated_session.query(Rating).all()) == sorted(dirty)
+        assert redis_client.pop_dirty_profiles(10) == []
+
+    def test_failed_dirty_writes_are_returned_to_the_set(self, isolated_session, redis_client, monkeypatch):
+        profiles = create_profiles(isolated_session, 6)
+        ids = sorted(p.id for p in profiles)
+        write_ratings = RatingService._write_ratings
+        failures = []
+
+        def flaky_write(session, profile_ids, ratings):
+            if failures:
+                failures.pop()
+                raise RuntimeError("deadlock detected")
+            return write_ratings(session, profile_ids, ratings)
+
+        monkeypatch.setattr(RatingService, "_write_ratings", staticmethod(flaky_write))
+        failures.append(1)
+        bulk = RatingService.update_ratings_bulk(isolated_session, ids, chunk_size=3)
+        assert bulk == {"updated_count": 3, "total": 6, "failed_ids": ids[:3]}
+
+        redis_client.mark_profiles_dirty(ids)
+        failures.append(1)
+        assert RatingService.refresh_dirty_ratings(isolated_session, redis_client) == {"refreshed_count": 0, "batches": 1}
+        assert RatingService.refresh_dirty_ratings(isolated_session, redis_client) == {"refreshed_count": 6, "batches": 1}
+        assert redis_client.pop_dirty_profiles(10) == []
+
+    def test_schedule_rating_refresh_falls_back_to_synchronous_update(self, isolated_session):
+        profile = create_profiles(isolated_session, 1)[0]
+
+        class UnavailableRedis:
+            def mark_profiles_dirty(self, profile_ids):
+                return False
+
+        RatingService.schedule_rating_refresh(isolated_session, UnavailableRedis(), [profile.id])
+
+        assert isolated_session.query(Rating).filter_by(profile_id=profile.id).count() == 1
+
+    def test_build_shard_ranges_covers_id_space(self):
+        assert RatingService.build_shard_ranges(1, 10, 4) == [(1, 5), (5, 9), (9, 11)]
+        assert RatingService.build_shard_ranges(7, 7, 100) == [(7, 8)]
+
+    def test_update_ratings_range_only_touches_shard(self, isolated_session):
+        profiles = create_profiles(isolated_session, 8)
+        ids = sorted(p.id for p in profiles)
+
+        result = RatingService.update_ratings_range(isolated_session, ids[2], ids[5])
+
+        assert result == {"updated_count": 3, "total": 3, "failed_ids": []}
+        assert sorted(r.profile_id for r in isolated_session.query(Rating).all()) == ids[2:5]
+
+    def test_shard_reports_failed_chunks(self, isolated_session, monkeypatch):
+        profiles = create_profiles(isolated_session, 4)
+        ids = sorted(p.id for p in profiles)
+
+        def failing_write(session, profile_ids, ratings):
+            raise RuntimeError("deadlock detected")
+
+        monkeypatch.setattr(RatingService, "_write_ratings", staticmethod(failing_write))
+        monkeypatch.setattr(rating_module, "Session", lambda: isolated_session)
+
+        shard = rating_module.update_ratings_shards([[ids[0], ids[-1] + 1]])[0]
+
+        assert (shard["updated_count"], shard["total"], shard["failed_count"]) == (0, 4, 4)
+        assert collect_rating_shards([[shard]], 0.0)["failed_shards"] == 1
+
+    def test_collect_rating_shards_aggregates_lanes(self):
+        lane_results = [
+            [{"start_id": 1, "end_id": 5, "duration": 1.5, "updated_count": 4, "total": 4, "failed_count": 0}],
+            [{"start_id": 5, "end_id": 9, "duration": 2.0, "updated_count": 1, "total": 3, "failed_count": 2},
+             {"start_id": 9, "end_id": 11, "duration": 0.5, "updated_count": 0, "total": 0, "failed_count": 0,
+              "error": "boom"}]
+        ]
+
+        summary = collect_rating_shards(lane_results, 0.0)
+
+        assert summary["shards"] == 3
+        assert summary["failed_shards"] == 2
+        assert summary["failed_count"] == 2
+        assert summary["updated_count"] == 5
+        assert summary["total"] == 7
+        assert summary["shard_time_total"] == 4.0
+        assert summary["shard_time_max"] == 2.0
+
+    def test_keyset_pages_cover_ranking_without_overlap(self, isolated_session):
+        profiles = create_profiles(isolated_session, 50)
+        create_activity(isolated_session, profiles, interactions=200, matches=10)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer = profiles[0]
+
+        full = RatingService.get_ranked_page(isolated_session, viewer.id, 100)
+        assert full["next_cursor"] is None
+
+        paged = []
+        cursor = None
+        while True:
+            page = RatingService.get_ranked_page(isolated_session, viewer.id, 7, cursor)
+            paged.extend(p["id"] for p in page["profiles"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert paged == [p["id"] for p in full["profiles"]]
+
+    def test_keyset_orders_ties_by_profile_id(self, isolated_session):
+        profiles = create_profiles(isolated_session, 6)
+        for profile in profiles:
+            isolated_session.add(Rating(profile_id=profile.id, combined_rating=10.0))
+        isolated_session.commit()
+        viewer = profiles[0]
+        viewer.preferred_gender = viewer.preferred_age_min = viewer.preferred_age_max = None
+        isolated_session.commit()
+
+        first = RatingService.get_ranked_page(isolated_session, viewer.id, 2)
+        second = RatingService.get_ranked_page(isolated_session, viewer.id, 2, first["next_cursor"])
+
+        ids = [p["id"] for p in first["profiles"] + second["profiles"]]
+        assert ids == sorted((p.id for p in profiles[1:]), reverse=True)[:4]
+
+    def test_invalid_cursor_is_rejected(self):
+        with pytest.raises(ValueError):
+            RatingService.decode_cursor("not-a-cursor")
+        assert RatingService.decode_cursor(RatingService.encode_cursor(12.5, 3)) == (12.5, 3)
@@ -0,0 +1,129 @@
+import redis
+from app.core import config
+from app.core.redis_client import RedisClient, close_connection_pools
+from app.services import profile_service as profile_module
+from app.services.matching_service import MatchingService, AsyncMatchingService, get_matching_service
+from app.services.profile_service import ProfileService, get_profile_service
+from app.services.user_service import UserService
+from app.models import *
+from tests.test_rating_service import create_profiles
+from tests.test_profile_cache import profile_service
+
+
+def count_round_trips(redis_client):
+    """Count requests sent to Redis; a pipeline or multi-key command is one"""
+    counter = {"round_trips": 0}
+    pool = redis_client.client.connection_pool
+    base = pool.connection_class
+
+    class CountingConnection(base):
+        def send_packed_command(self, command, check_health=True):
+            counter["round_trips"] += 1
+            return super().send_packed_command(command, check_health)
+
+    pool.connection_class = CountingConnection
+    pool.reset()
+    # Leave the connection handshake out of the count
+    redis_client.client.ping()
+    counter["round_trips"] = 0
+    return counter
+
+
+class TestRedisBatching:
+
+    def test_cache_and_get_many_profiles(self, redis_client):
+        counter = count_round_trips(redis_client)
+
+        redis_client.cache_profiles({1: {"id": 1}, 2: {"id": 2}, 3: {"id": 3}}, ttl=60)
+        cached = redis_client.get_cached_profiles([3, 4, 1])
+
+        assert cached == {3: {"id": 3}, 1: {"id": 1}}
+        assert counter["round_trips"] == 2
+        assert 0 < redis_client.client.ttl("profile:2") <= 60
+
+    def test_invalidate_drops_all_keys_at_once(self, redis_client):
+        redis_client.cache_profile(1, {"id": 1})
+        redis_client.set_profile_list(10, [{"id": 1}])
+        redis_client.push_deck(10, [1, 2])
+        redis_client.set_deck_cursor(10, "cursor")
+        redis_client.cache_user_profile(100, {"user_id": 10})
+        counter = count_round_trips(redis_client)
+
+        assert redis_client.invalidate(profile_ids=[1], user_ids=[10], telegram_ids=[100])
+
+        assert counter["round_trips"] == 1
+        assert redis_client.client.keys("*") == [b"user_profile:100:gen"]
+
+    def test_get_profiles_batches_misses(self, isolated_session, profile_service, redis_client):
+        profiles = create_profiles(isolated_session, 4)
+        ids = [profile.id for profile in profiles]
+        profile_service.get_profile(isolated_session, ids[0])
+        counter = count_round_trips(redis_client)
+
+        result = profile_service.get_profiles(isolated_session, ids + [999])
+
+        assert list(result) == ids
+        assert result[ids[1]]["name"] == profiles[1].name
+        assert counter["round_trips"] == 2
+        assert profile_service.get_profiles(isolated_session, ids) == result
+
+    def test_profile_update_invalidates_cached_profile(self, isolated_session, profile_service,
+                                                       redis_client, profile_summary_cache):
+        profile = create_profiles(isolated_session, 1)[0]
+        UserService.get_user_profile(isolated_session, profile.user.telegram_id)
+        assert profile_service.get_profile(isolated_session, profile.id)["name"] == profile.name
+        counter = count_round_trips(redis_client)
+
+        profile_service.update_profile(isolated_session, profile.id, {"name": "Новое имя"})
+
+        assert counter["round_trips"] == 2
+        assert profile_service.get_profile(isolated_session, profile.id)["name"] == "Новое имя"
+        assert UserService.get_user_profile(isolated_session, profile.user.telegram_id)["name"] == "Новое имя"
+
+    def test_match_invalidates_both_lists_in_one_round_trip(self, isolated_session, redis_client, monkeypatch):
+        first, second = create_profiles(isolated_session, 2)
+        service = MatchingService()
+        service.redis_client = redis_client
+        service.like_profile(isolated_session, second.id, first.id)
+        for profile in (first, second):
+            redis_client.set_profile_list(profile.user_id, [{"id": 0}])
+        deletes = []
+        monkeypatch.setattr(redis_client, "invalidate",
+                            lambda **keys: deletes.append(keys) or True)
+
+        assert service.like_profile(isolated_session, first.id, second.id)["is_match"]
+
+        assert len(deletes) == 1
+        assert sorted(deletes[0]["user_ids"]) == sorted([first.user_id, second.user_id])
+
+
+class TestSharedClients:
+
+    def test_clients_share_one_pool_per_url(self):
+        first, second = RedisClient(), RedisClient()
+        other = RedisClient(url="redis://localhost:6379/1")
+
+        pool = first.client.connection_pool
+        assert pool is second.client.connection_pool
+        assert pool is not other.client.connection_pool
+        assert isinstance(pool, redis.BlockingConnectionPool)
+        assert pool.max_connections == config.REDIS_MAX_CONNECTIONS
+        assert pool.connection_kwargs["health_check_interval"] == config.REDIS_HEALTH_CHECK_INTERVAL
+
+        close_connection_pools()
+        assert RedisClient().client.connection_pool is not pool
+
+    def test_services_are_process_wide(self):
+        assert get_matching_service() is get_matching_service()
+        assert AsyncMatchingService().matching_service is get_matching_service()
+        assert get_profile_service() is get_profile_service()
+
+    def test_s3_client_is_created_on_first_use(self, monkeypatch):
+        created = []
+        monkeypatch.setattr(profile_module, "get_s3_client", lambda: created.append(1) or "s3")
+
+        service = ProfileService()
+        assert created == []
+
+        assert service.s3_client == service.s3_client == "s3"
+        assert created == [1]
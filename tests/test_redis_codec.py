@@ -0,0 +1,67 @@
+import json
+import pickle
+import pytest
+from app.core.codec import COMPRESSORS, FORMAT_VERSION, SERIALIZERS, Codec, CodecError
+from app.core.redis_client import RedisClient
+
+PROFILES = [
+    {
+        "id": profile_id,
+        "name": f"Анна {profile_id}",
+        "age": 25,
+        "bio": "Люблю путешествия и кино " * 5,
+        "interests": None,
+        "rating": {"primary": 7.5, "behavioral": 3.25, "combined": 5.375}
+    }
+    for profile_id in range(50)
+]
+
+
+class TestCodec:
+
+    @pytest.mark.parametrize("serializer", sorted(SERIALIZERS))
+    @pytest.mark.parametrize("compression", sorted(COMPRESSORS))
+    def test_round_trip(self, serializer, compression):
+        codec = Codec(serializer, compression, compression_threshold=256)
+
+        encoded = codec.encode(PROFILES)
+
+        assert encoded[0] == FORMAT_VERSION
+        assert codec.decode(encoded) == PROFILES
+        assert Codec("json", "none").decode(encoded) == PROFILES
+
+    def test_small_values_are_not_compressed(self):
+        codec = Codec("json", "zstd", compression_threshold=1024)
+
+        small, large = codec.encode(PROFILES[0]), codec.encode(PROFILES)
+
+        assert small[1] & 0x0F == 0
+        assert large[1] & 0x0F == COMPRESSORS["zstd"][0]
+        assert len(large) < len(json.dumps(PROFILES, ensure_ascii=False).encode())
+
+    def test_unavailable_formats_fall_back(self):
+        codec = Codec("yaml", "brotli")
+
+        assert (codec.serializer, codec.compression) == ("json", "none")
+
+    def test_legacy_values(self):
+        codec = Codec()
+
+        assert codec.decode(json.dumps(PROFILES[0]).encode()) == PROFILES[0]
+        with pytest.raises(CodecError):
+            codec.decode(pickle.dumps(PROFILES))
+        with pytest.raises(CodecError):
+            codec.decode(bytes((FORMAT_VERSION, 0xF0)) + b"{}")
+
+    def test_redis_client_stores_encoded_values(self, redis_client):
+        redis_client.set_profile_list(1, PROFILES)
+        redis_client.cache_profile(2, PROFILES[0])
+
+        assert redis_client.client.get("profiles:1")[0] == FORMAT_VERSION
+        assert redis_client.get_profile_list(1) == PROFILES
+        assert redis_client.get_cached_profile(2) == PROFILES[0]
+
+    def test_old_pickled_lists_are_treated_as_missing(self, redis_client):
+        redis_client.client.set("profiles:1", pickle.dumps(PROFILES))
+
+        assert redis_client.get_profile_list(1) == []
@@ -0,0 +1,115 @@
+from datetime import datetime
+from app.services.retention_service import RetentionService, add_months, month_start, partition_name
+from app.services.rating_service import RatingService
+from app.services.stats_service import StatsService
+from app.services.matching_service import MatchingService
+from app.models import *
+from tests.test_rating_service import create_profiles, create_activity
+
+
+def age_interactions(session, months_ago):
+    """Move every interaction into the same month some time before now"""
+    old_month = add_months(month_start(datetime.utcnow()), -months_ago)
+    for index, interaction in enumerate(session.query(Interaction).order_by(Interaction.id).all()):
+        interaction.created_at = old_month.replace(day=1 + index % 28)
+    session.commit()
+
+
+class TestRetentionService:
+
+    def test_partition_helpers(self):
+        assert partition_name("interactions", datetime(2024, 3, 17)) == "interactions_y2024m03"
+        assert add_months(datetime(2024, 11, 5), 3) == datetime(2025, 2, 1)
+        assert add_months(datetime(2024, 1, 5), -1) == datetime(2023, 12, 1)
+
+    def test_ensure_partitions_is_noop_without_postgres(self, isolated_session):
+        assert RetentionService.ensure_partitions(isolated_session) == []
+
+    def test_compaction_keeps_ratings_and_removes_raw_skips(self, isolated_session):
+        profiles = create_profiles(isolated_session, 30)
+        create_activity(isolated_session, profiles)
+        age_interactions(isolated_session, months_ago=14)
+        RatingService.update_ratings_bulk(isolated_session)
+        before = {r.profile_id: r.combined_rating for r in isolated_session.query(Rating).all()}
+        aggregates_before = StatsService.collect_interaction_aggregates(isolated_session, [p.id for p in profiles])
+        likes = isolated_session.query(Interaction).filter_by(type="like").count()
+
+        result = RetentionService.rollup_interactions(isolated_session, retention_months=12)
+
+        assert result["compacted_count"] == 300 - likes
+        assert isolated_session.query(Interaction).count() == likes
+        assert isolated_session.query(Interaction).filter_by(type="like").count() == likes
+        assert StatsService.collect_interaction_aggregates(isolated_session, [p.id for p in profiles]) == aggregates_before
+        RatingService.update_ratings_bulk(isolated_session)
+        assert {r.profile_id: r.combined_rating for r in isolated_session.query(Rating).all()} == before
+
+    def test_recent_interactions_are_kept(self, isolated_session):
+        profiles = create_profiles(isolated_session, 10)
+        create_activity(isolated_session, profiles, interactions=50, matches=0)
+        age_interactions(isolated_session, months_ago=2)
+
+        result = RetentionService.rollup_interactions(isolated_session, retention_months=12)
+
+        assert result["compacted_count"] == 0
+        assert isolated_session.query(Interaction).count() == 50
+        assert isolated_session.query(InteractionRollup).count() == 0
+
+    def test_rerun_does_not_double_count(self, isolated_session):
+        profiles = create_profiles(isolated_session, 10)
+        create_activity(isolated_session, profiles, interactions=60, matches=0)
+        age_interactions(isolated_session, months_ago=14)
+        skips = isolated_session.query(Interaction).filter_by(type="skip").count()
+
+        RetentionService.rollup_interactions(isolated_session, retention_months=12)
+        rollups = {(r.profile_id, r.total_views, r.likes_received)
+                   for r in isolated_session.query(InteractionRollup).all()}
+        assert RetentionService.rollup_interactions(isolated_session, retention_months=12)["compacted_count"] == 0
+
+        assert {(r.profile_id, r.total_views, r.likes_received)
+                for r in isolated_session.query(InteractionRollup).all()} == rollups
+        assert sum(total for _, total, _ in rollups) == skips
+
+    def test_late_rows_are_added_to_existing_rollup(self, isolated_session):
+        first, second = create_profiles(isolated_session, 2)
+        old_month = add_months(month_start(datetime.utcnow()), -14)
+        for _ in range(2):
+            isolated_session.add(Interaction(from_profile_id=first.id, to_profile_id=second.id,
+                                             type="skip", created_at=old_month))
+            isolated_session.commit()
+            RetentionService.rollup_interactions(isolated_session, retention_months=12)
+
+        rollup = isolated_session.query(InteractionRollup).one()
+        assert (rollup.profile_id, rollup.total_views, rollup.likes_received) == (second.id, 2, 0)
+
+    def test_like_older_than_window_still_matches(self, isolated_session, redis_client):
+        first, second = create_profiles(isolated_session, 2)
+        matching_service = MatchingService(redis_client)
+        matching_service.like_profile(isolated_session, first.id, second.id)
+        age_interactions(isolated_session, months_ago=14)
+
+        RetentionService.rollup_interactions(isolated_session, retention_months=12)
+        result = matching_service.like_profile(isolated_session, second.id, first.id)
+
+        assert result["is_match"]
+        assert RatingService.interacted_among(isolated_session, first.id, [second.id]) == {second.id}
+
+    def test_compacted_skips_stay_excluded(self, isolated_session, redis_client):
+        viewer, skipped, other = create_profiles(isolated_session, 3)
+        RatingService.update_ratings_bulk(isolated_session)
+        viewer.preferred_gender = viewer.preferred_age_min = viewer.preferred_age_max = None
+        isolated_session.commit()
+        matching_service = MatchingService(redis_client)
+        matching_service.skip_profile(isolated_session, viewer.id, skipped.id)
+        matching_service.skip_profile(isolated_session, viewer.id, skipped.id)
+        age_interactions(isolated_session, months_ago=14)
+
+        RetentionService.rollup_interactions(isolated_session, retention_months=12)
+        matching_service.rebuild_seen_filter(isolated_session, viewer.id)
+
+        assert isolated_session.query(Interaction).count() == 0
+        assert isolated_session.query(SeenProfile).count() == 1
+        assert RatingService.interacted_among(isolated_session, viewer.id, [skipped.id, other.id]) == {skipped.id}
+        ranked = RatingService.get_ranked_page(isolated_session, viewer.id, 10)["profiles"]
+        assert skipped.id not in [profile["id"] for profile in ranked]
+        assert matching_service.seen_filter.might_contain(viewer.id, [skipped.id]) == {skipped.id}
+
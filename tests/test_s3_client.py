@@ -0,0 +1,86 @@
+import pytest
+from app.core import s3_client as s3_module
+from app.core.s3_client import S3Client, get_s3_client
+from app.services.profile_service import ProfileService
+from app.models import *
+from tests.test_rating_service import create_profiles
+
+
+class RecordingS3:
+    def __init__(self, missing_bucket=False, fail_on=None):
+        self.calls = []
+        self.keys = []
+        self.missing_bucket = missing_bucket
+        self.fail_on = fail_on
+
+    def head_bucket(self, **kwargs):
+        self.calls.append("head_bucket")
+        if self.missing_bucket:
+            raise Exception("404")
+
+    def create_bucket(self, **kwargs):
+        self.calls.append("create_bucket")
+
+    def put_object(self, **kwargs):
+        self.calls.append("put_object")
+        if self.fail_on and kwargs["Key"].endswith(self.fail_on):
+            raise Exception("503")
+        self.keys.append(kwargs["Key"])
+
+    def delete_object(self, **kwargs):
+        self.calls.append("delete_object")
+        self.keys.remove(kwargs["Key"])
+
+
+@pytest.fixture
+def no_boto(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("boto3 client created")
+
+    monkeypatch.setattr(s3_module.boto3, "client", fail)
+
+
+class TestS3Client:
+
+    def test_construction_and_urls_do_not_touch_s3(self, no_boto):
+        client = S3Client()
+
+        assert client.get_photo_url("photos/a.jpg").endswith(f"/{client.bucket_name}/photos/a.jpg")
+
+    def test_bucket_is_checked_once_before_first_upload(self):
+        client = S3Client()
+        client._s3 = RecordingS3(missing_bucket=True)
+
+        assert client.upload_photo(b"jpeg").startswith("photos/")
+        assert client.upload_photo(b"jpeg").startswith("photos/")
+
+        assert client._s3.calls == ["head_bucket", "create_bucket", "put_object", "put_object"]
+
+    def test_variants_are_stored_under_one_prefix(self):
+        client = S3Client()
+        client._s3 = RecordingS3()
+        variants = {name: {"data": b"x", "extension": "webp", "content_type": "image/webp"}
+                    for name in ("main", "medium", "small")}
+
+        paths = client.upload_photo_variants(variants)
+
+        prefix = paths["main"].rsplit("/", 1)[0]
+        assert paths == {name: f"{prefix}/{name}.webp" for name in variants}
+        assert client._s3.keys == list(paths.values())
+
+        client._s3 = RecordingS3(fail_on="small.webp")
+        assert client.upload_photo_variants(variants) is None
+        assert client._s3.keys == []
+        assert client._s3.calls.count("delete_object") == 2
+
+    def test_client_is_process_wide(self):
+        assert get_s3_client() is get_s3_client()
+
+    def test_profile_view_never_touches_s3(self, isolated_session, redis_client, no_boto):
+        profile = create_profiles(isolated_session, 1)[0]
+        isolated_session.add(Photo(profile_id=profile.id, s3_path="photos/a.jpg", is_main=True))
+        isolated_session.commit()
+
+        result = ProfileService(redis_client).get_profile(isolated_session, profile.id)
+
+        assert result["photos"][0]["url"].endswith("/photos/a.jpg")
@@ -0,0 +1,97 @@
+from app.core.redis_client import RedisClient
+from app.core.seen_filter import SeenFilter
+from app.services.candidate_pool_service import CandidatePoolService
+from app.services.matching_service import MatchingService
+from app.services.rating_service import RatingService
+from app.models import *
+from tests.test_rating_service import create_profiles, create_activity
+
+
+class TestSeenFilter:
+
+    def test_added_ids_are_always_reported(self, redis_client):
+        seen_filter = SeenFilter(redis_client, size_bits=4096, hash_count=5)
+        seen_filter.add(1, range(100, 400))
+
+        assert seen_filter.might_contain(1, list(range(100, 400))) == set(range(100, 400))
+
+    def test_false_positive_rate_stays_low(self, redis_client):
+        seen_filter = SeenFilter(redis_client)
+        seen_filter.add(1, range(10_000))
+
+        hits = seen_filter.might_contain(1, list(range(100_000, 105_000)))
+        assert len(hits) / 5000 < 0.01
+
+    def test_filters_are_per_viewer(self, redis_client):
+        seen_filter = SeenFilter(redis_client)
+        seen_filter.add(1, [42])
+
+        assert seen_filter.might_contain(2, [42]) == set()
+
+    def test_rebuild_replaces_contents_and_marks_built(self, redis_client):
+        seen_filter = SeenFilter(redis_client)
+        seen_filter.add(1, [5])
+        assert not seen_filter.is_built(1)
+
+        assert seen_filter.rebuild(1, iter([7, 8]), batch_size=1)
+        assert seen_filter.is_built(1)
+        assert seen_filter.might_contain(1, [5, 7, 8]) == {7, 8}
+
+    def test_unavailable_redis_returns_none(self):
+        redis_client = RedisClient()
+        redis_client.client = None
+        seen_filter = SeenFilter(redis_client)
+
+        assert seen_filter.might_contain(1, [1]) is None
+
+    def test_failed_add_marks_filter_for_rebuild(self, isolated_session, redis_client, monkeypatch):
+        first, second = create_profiles(isolated_session, 2)
+        matching_service = MatchingService()
+        matching_service.redis_client = redis_client
+        matching_service.rebuild_seen_filter(isolated_session, first.id)
+        pipeline = redis_client.client.pipeline
+
+        def failing_pipeline(*args, **kwargs):
+            raise ConnectionError("Redis is unavailable")
+
+        monkeypatch.setattr(redis_client.client, "pipeline", failing_pipeline)
+        matching_service.skip_profile(isolated_session, first.id, second.id)
+        monkeypatch.setattr(redis_client.client, "pipeline", pipeline)
+
+        assert not matching_service.seen_filter.is_built(first.id)
+        exclude = matching_service.seen_exclusion(isolated_session, first.id)
+        assert exclude([second.id]) == {second.id}
+
+    def test_matching_actions_record_seen_profiles(self, isolated_session, redis_client):
+        first, second, third = create_profiles(isolated_session, 3)
+        matching_service = MatchingService()
+        matching_service.redis_client = redis_client
+
+        matching_service.like_profile(isolated_session, first.id, second.id)
+        matching_service.skip_profile(isolated_session, first.id, third.id)
+
+        assert matching_service.seen_filter.might_contain(first.id, [second.id, third.id]) == {second.id, third.id}
+
+    def test_next_profiles_exclude_seen_with_pools(self, isolated_session, redis_client):
+        profiles = create_profiles(isolated_session, 60)
+        create_activity(isolated_session, profiles, interactions=400, matches=10)
+        RatingService.update_ratings_bulk(isolated_session)
+        pool = CandidatePoolService(redis_client)
+        pool.rebuild(isolated_session)
+        matching_service = MatchingService()
+        matching_service.redis_client = redis_client
+
+        for viewer in profiles[:15]:
+            exclude = matching_service.seen_exclusion(isolated_session, viewer.id)
+            assert matching_service.seen_filter.is_built(viewer.id)
+
+            with_filter = RatingService.get_ranked_profiles(
+                isolated_session, viewer.id, 5, candidate_pool=pool, exclude=exclude
+            )
+            from_sql = RatingService.get_ranked_profiles(isolated_session, viewer.id, 5, use_pool=False)
+            assert [p["id"] for p in with_filter] == [p["id"] for p in from_sql]
+
+            interacted = {row[0] for row in isolated_session.query(Interaction.to_profile_id).filter_by(
+                from_profile_id=viewer.id
+            ).all()}
+            assert not interacted & {p["id"] for p in with_filter}
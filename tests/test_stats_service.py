@@ -0,0 +1,94 @@
+import pytest
+from app.services.matching_service import MatchingService
+from app.services.rating_service import RatingService
+from app.services.stats_service import StatsService
+from app.models import *
+from tests.test_rating_service import create_profiles, create_activity
+
+
+class TestStatsService:
+
+    def test_collect_interaction_aggregates(self, isolated_session):
+        first, second, third = create_profiles(isolated_session, 3)
+        isolated_session.add_all([
+            Interaction(from_profile_id=second.id, to_profile_id=first.id, type="like"),
+            Interaction(from_profile_id=third.id, to_profile_id=first.id, type="skip"),
+            Match(profile_id_1=first.id, profile_id_2=second.id, initiated_chat=True),
+            Match(profile_id_1=third.id, profile_id_2=first.id, initiated_chat=False)
+        ])
+        isolated_session.commit()
+
+        aggregates = StatsService.collect_interaction_aggregates(isolated_session, [first.id, third.id])
+
+        assert aggregates[first.id] == {
+            "likes_received": 1, "total_views": 2, "matches_count": 2, "initiated_chats": 1
+        }
+        assert aggregates[third.id] == {
+            "likes_received": 0, "total_views": 0, "matches_count": 1, "initiated_chats": 0
+        }
+
+    def test_matching_actions_keep_counters_in_sync(self, isolated_session):
+        first, second, third = create_profiles(isolated_session, 3)
+        matching_service = MatchingService()
+
+        matching_service.like_profile(isolated_session, first.id, second.id)
+        matching_service.skip_profile(isolated_session, third.id, second.id)
+        result = matching_service.like_profile(isolated_session, second.id, first.id)
+        assert result["is_match"] is True
+        assert matching_service.mark_chat_initiated(isolated_session, result["match_id"]) is True
+        assert matching_service.mark_chat_initiated(isolated_session, result["match_id"]) is False
+
+        expected = StatsService.collect_interaction_aggregates(
+            isolated_session, [first.id, second.id, third.id]
+        )
+        for profile in (first, second, third):
+            assert StatsService.get_counters(isolated_session, profile.id) == expected[profile.id]
+
+        assert StatsService.get_counters(isolated_session, second.id) == {
+            "likes_received": 1, "total_views": 2, "matches_count": 1, "initiated_chats": 1
+        }
+
+    def test_missing_counters_are_seeded_from_raw_tables(self, isolated_session):
+        profiles = create_profiles(isolated_session, 10)
+        create_activity(isolated_session, profiles, interactions=60, matches=10)
+        target = profiles[0]
+
+        isolated_session.add(Interaction(from_profile_id=profiles[1].id, to_profile_id=target.id, type="like"))
+        StatsService.increment(isolated_session, target.id, total_views=1, likes_received=1)
+        isolated_session.commit()
+
+        expected = StatsService.collect_interaction_aggregates(isolated_session, [target.id])[target.id]
+        assert StatsService.get_counters(isolated_session, target.id) == expected
+
+    def test_rebuild_counters_overwrites_drift(self, isolated_session):
+        profiles = create_profiles(isolated_session, 12)
+        create_activity(isolated_session, profiles, interactions=80, matches=15)
+        StatsService.rebuild_counters(isolated_session)
+
+        isolated_session.query(ProfileStats).update({"likes_received": 999, "matches_count": 999})
+        isolated_session.commit()
+
+        result = StatsService.rebuild_counters(isolated_session, chunk_size=5)
+
+        assert result == {"rebuilt_count": 12}
+        expected = StatsService.collect_interaction_aggregates(isolated_session, [p.id for p in profiles])
+        for profile in profiles:
+            assert StatsService.get_counters(isolated_session, profile.id) == expected[profile.id]
+
+    def test_behavioral_rating_uses_counters(self, isolated_session):
+        profiles = create_profiles(isolated_session, 15)
+        create_activity(isolated_session, profiles, interactions=100, matches=20)
+        target = profiles[3]
+
+        counts = StatsService.collect_interaction_aggregates(isolated_session, [target.id])[target.id]
+        expected = RatingService.behavioral_rating_from_counts(
+            counts["likes_received"], counts["total_views"], counts["matches_count"], counts["initiated_chats"]
+        )
+
+        assert RatingService.calculate_behavioral_rating(isolated_session, target.id) == pytest.approx(expected)
+
+    def test_increment_rejects_unknown_counter(self, isolated_session):
+        profile = create_profiles(isolated_session, 1)[0]
+
+        with pytest.raises(ValueError):
+            StatsService.increment(isolated_session, profile.id, superlikes=1)